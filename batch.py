@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Decide muchos grupos en lote: algoritmo primero y LLM con cuota y concurrencia acotadas."""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from rich.console import Console
+from rich.table import Table
+
+from decide import TASKS, build_prompt, detect_type, fit_prompt_data, load_participants
+from llm import BatchRunner, CallPolicy, LLMRequest, RateLimiter, get_client, summarize
+from prompt_budget import DEFAULT_MAX_PROMPT_TOKENS, TokenCalibration
+from routing import DEFAULT_THRESHOLD, MIN_CONFIDENCE, load_thresholds, resolve_threshold
+from schemas.records import SchemaError
+from solvers import get_solver
+from solvers.cluster import solve_clusters, split_group
+from solvers.sampling import estimate_complexity
+
+load_dotenv()
+
+console = Console()
+
+
+def plan_group(data_dir: Path, model: str, args,
+               thresholds: dict[str, float]) -> tuple[dict | None, LLMRequest | None]:
+    """
+    Resuelve un grupo algoritmicamente si es simple y confiable; si no, arma su peticion al LLM.
+
+    Args:
+        thresholds: Umbrales ajustados por tipo (routing.py), salvo que se pase --threshold
+
+    Returns:
+        (resultado algoritmico, None) o (None, peticion al LLM)
+    """
+    participants = load_participants(data_dir)
+    decision_type = detect_type(participants)
+    threshold = resolve_threshold(decision_type, args.threshold, thresholds)
+
+    if not args.llm_only:
+        solver = get_solver(decision_type)
+        complexity = estimate_complexity(solver, participants, threshold)
+        if complexity.is_simple(threshold):
+            result = solver.solve(participants)
+            if result.success and result.confidence >= MIN_CONFIDENCE:
+                return {
+                    "id": str(data_dir),
+                    "type": decision_type,
+                    "source": "algoritmo",
+                    "confidence": result.confidence,
+                    "decision": result.decision,
+                }, None
+        elif not args.no_split:
+            split = split_group(solver, decision_type, participants, threshold)
+            if split:
+                solve_clusters(solver, split)
+                if split.success and min(r.confidence for r in split.results) >= MIN_CONFIDENCE:
+                    return {
+                        "id": str(data_dir),
+                        "type": decision_type,
+                        "source": "algoritmo",
+                        "confidence": split.confidence,
+                        "subgroups": [
+                            {"participants": [p.get("nombre") for p in members], "decision": r.decision}
+                            for members, r in zip(split.clusters, split.results)
+                        ],
+                    }, None
+
+    task = TASKS[decision_type]["decide"]
+    data = fit_prompt_data(decision_type, participants, task, max_tokens=args.max_prompt_tokens)
+    if data.truncated:
+        console.print(f"[yellow]{data_dir}: datos recortados por limite de tokens "
+                      f"({', '.join(data.steps)})[/yellow]")
+    prompt = build_prompt(decision_type, participants, task, data=data.text)
+    return None, LLMRequest(id=str(data_dir), prompt=prompt, model=model)
+
+
+def print_summary(summary: dict, algorithmic: int):
+    """Tabla de contabilidad del lote."""
+    table = Table(title="Lote")
+    table.add_column("Metrica", style="cyan")
+    table.add_column("Valor", justify="right")
+    table.add_row("Grupos resueltos por algoritmo", str(algorithmic))
+    table.add_row("Peticiones al LLM", str(summary["requests"]))
+    table.add_row("Errores", str(summary["errors"]))
+    table.add_row("Intentos", str(summary["attempts"]))
+    table.add_row("Tokens de entrada", str(summary["prompt_tokens"]))
+    table.add_row("Tokens de entrada estimados", str(summary["estimated_tokens"]))
+    table.add_row("Tokens de salida", str(summary["output_tokens"]))
+    table.add_row("Espera por cuota", f"{summary['rate_wait']:.1f}s")
+    table.add_row("Latencia p50", f"{summary['latency_p50']:.2f}s")
+    table.add_row("Latencia p95", f"{summary['latency_p95']:.2f}s")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decide muchos grupos en lote")
+    parser.add_argument("dirs", nargs="+", help="Directorios de participantes (uno por grupo)")
+    parser.add_argument("--pro", action="store_true", help="Usar gemini-3-pro-preview")
+    parser.add_argument("--llm-only", action="store_true",
+                        help="Solo usar LLM, ignorar algoritmo")
+    parser.add_argument("--no-split", action="store_true",
+                        help="No dividir grupos heterogeneos en subgrupos antes de usar LLM")
+    parser.add_argument("--threshold", type=float,
+                        help=f"Umbral de complejidad para usar LLM (default: el ajustado para cada tipo "
+                             f"con routing.py fit, o {DEFAULT_THRESHOLD})")
+    parser.add_argument("--rpm", type=float, default=60,
+                        help="Peticiones por minuto al LLM (default: 60)")
+    parser.add_argument("--tpm", type=float, default=250_000,
+                        help="Tokens por minuto al LLM (default: 250000)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Peticiones simultaneas al LLM (default: 4)")
+    parser.add_argument("--queue", type=int, default=16,
+                        help="Tamano de la cola de peticiones pendientes (default: 16)")
+    parser.add_argument("--deadline", type=float,
+                        help="Segundos maximos por llamada al LLM, sumando reintentos")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Reintentos ante errores transitorios del LLM (default: 2)")
+    parser.add_argument("--max-prompt-tokens", type=int, default=DEFAULT_MAX_PROMPT_TOKENS,
+                        help=f"Tokens estimados maximos por prompt; se recortan los datos de participantes "
+                             f"para caber (default: {DEFAULT_MAX_PROMPT_TOKENS}, 0 = sin limite)")
+    parser.add_argument("--base-url",
+                        help="Endpoint alternativo de Gemini (ej. un servidor local de pruebas)")
+    parser.add_argument("--out", default="batch_results.jsonl",
+                        help="Archivo JSONL con un resultado por grupo (default: batch_results.jsonl)")
+
+    args = parser.parse_args()
+
+    model = "gemini-3-pro-preview" if args.pro else "gemini-3-flash-preview"
+
+    thresholds = load_thresholds()
+    results = []
+    requests = []
+    for directory in args.dirs:
+        data_dir = Path(directory)
+        if not data_dir.is_dir() or not any(data_dir.glob("*.json")):
+            console.print(f"[yellow]Advertencia: No hay participantes en {data_dir}, se omite[/yellow]")
+            continue
+        try:
+            result, request = plan_group(data_dir, model, args, thresholds)
+        except SchemaError as e:
+            console.print(f"[yellow]Advertencia: {data_dir}: {e}, se omite[/yellow]")
+            continue
+        if result:
+            results.append(result)
+        else:
+            requests.append(request)
+
+    console.print(f"[cyan]Grupos:[/cyan] {len(results) + len(requests)} "
+                  f"({len(results)} por algoritmo, {len(requests)} al LLM)")
+
+    records = []
+    if requests:
+        api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            console.print("[red]Error: No se encontro GEMINI_API_KEY[/red]")
+            sys.exit(1)
+
+        console.print(f"[cyan]Modelo:[/cyan] {model}")
+        runner = BatchRunner(
+            client=get_client(args.base_url),
+            limiter=RateLimiter(rpm=args.rpm, tpm=args.tpm),
+            policy=CallPolicy(deadline=args.deadline, retries=args.retries),
+            concurrency=args.concurrency,
+            queue_size=args.queue,
+            calibration=TokenCalibration(),
+        )
+        records = asyncio.run(runner.run(requests))
+        runner.calibration.save()
+        for record in records:
+            results.append({"id": record.id, "source": "llm", **record.to_dict()})
+
+    out = Path(args.out)
+    with open(out, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    print_summary(summarize(records), len(results) - len(records))
+    console.print(f"[dim]Resultados guardados en {out}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,44 @@
 import argparse
 import json
 import os
+import random
 import sys
+import time
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google import genai
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
 
+from prompt_budget import (DEFAULT_MAX_PROMPT_TOKENS, PromptData, TokenCalibration, estimate_tokens,
+                           fit_participants)
+from routing import (DEFAULT_THRESHOLD, MIN_CONFIDENCE, SHADOW_RATE, Outcome, log_outcome,
+                     resolve_threshold)
+from schemas.records import SchemaError, plain, record_class
 from solvers import get_solver
+from solvers.cache import CachedSolver, ResultCache, fingerprint
+from solvers.cluster import solve_clusters, split_group
+from solvers.options import budget_method, task_catalog
+from solvers.proposals import format_proposals
+from solvers.sampling import estimate_complexity
+from store import DEFAULT_GROUP, open_store
+from tally import METHOD_LABELS, TALLY_METHODS, count_options, tally
 
 load_dotenv()
 
-# Umbral de complejidad por defecto
-DEFAULT_THRESHOLD = 0.6
-# Confianza minima para aceptar resultado algoritmico
-MIN_CONFIDENCE = 0.7
+OUTPUT_FORMATS = ["text", "json", "ndjson"]
+
+# Rich (y el cliente de Gemini) se importan solo cuando se usan: la salida
+# json/ndjson de una decision algoritmica no los necesita
+console = None
+
+
+def init_console():
+    """Importa Rich y crea la consola de la salida de texto."""
+    global console, Panel, Markdown
+    from rich.console import Console
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+    console = Console()
 
-console = Console()
 
 PROMPTS = {
     "reunion": """Eres un asistente que ayuda a coordinar reuniones sociales en Ciudad de Guatemala.
@@ -162,13 +181,67 @@ Formatea como OPCION 1, OPCION 2, etc."""
 }
 
 
+def split_prompt(decision_type: str, participants: list[dict], task: str,
+                 extra_context: str = "", data: str | None = None) -> tuple[str, str]:
+    """
+    Prompt en dos partes: contexto estatico (instrucciones y datos de participantes)
+    y mensaje de la ronda (votos anteriores y tarea).
+
+    Args:
+        data: Datos ya preparados (fit_prompt_data); por defecto, el JSON completo
+    """
+    head, tail = PROMPTS[decision_type].split("{extra_context}")
+    if data is None:
+        data = json.dumps([plain(p) for p in participants], ensure_ascii=False, indent=2)
+    context = head.format(count=len(participants), data=data)
+    message = ("{extra_context}" + tail).format(extra_context=extra_context, task=task)
+    return context, message
+
+
+def build_prompt(decision_type: str, participants: list[dict], task: str, extra_context: str = "",
+                 data: str | None = None) -> str:
+    """Arma el prompt para Gemini con los datos de participantes."""
+    return "".join(split_prompt(decision_type, participants, task, extra_context, data))
+
+
+def fit_prompt_data(decision_type: str, participants: list[dict], task: str,
+                    extra_context: str = "", max_tokens: int | None = None) -> PromptData:
+    """
+    Datos de participantes recortados para que el prompt completo quepa en max_tokens.
+
+    El resto del prompt (instrucciones, votos y tarea) se descuenta del presupuesto.
+    """
+    factor = TokenCalibration().factor()
+    if not max_tokens:
+        return fit_participants(participants, None, factor)
+    rest = estimate_tokens(build_prompt(decision_type, participants, task, extra_context, data=""), factor)
+    return fit_participants(participants, max(max_tokens - rest, 0), factor)
+
+
 def load_participants(data_dir: Path) -> list[dict]:
-    """Carga todos los archivos JSON de participantes."""
+    """
+    Carga todos los archivos JSON de participantes y los valida con el esquema
+    de su tipo (registros compactos; dicts si el tipo no tiene esquema).
+
+    Raises:
+        SchemaError: Si un archivo no cumple el esquema (indica cual)
+    """
+    files = sorted(data_dir.glob("*.json"))
     participants = []
-    for filepath in sorted(data_dir.glob("*.json")):
+    for filepath in files:
         with open(filepath, encoding="utf-8") as f:
             participants.append(json.load(f))
-    return participants
+
+    record_type = record_class(detect_type(participants))
+    if record_type is None:
+        return participants
+    records = []
+    for filepath, data in zip(files, participants):
+        try:
+            records.append(record_type.validate(data))
+        except SchemaError as e:
+            raise SchemaError(f"{filepath.name}: {e}") from None
+    return records
 
 
 def detect_type(participants: list[dict]) -> str:
@@ -179,45 +252,297 @@ def detect_type(participants: list[dict]) -> str:
     return first.get("tipo", "reunion")
 
 
-def load_votes(round_num: int) -> dict | None:
-    """Carga votos de una ronda si existen."""
-    votes_file = Path(f"votes/round_{round_num}.json")
-    if votes_file.exists():
-        with open(votes_file, encoding="utf-8") as f:
-            return json.load(f)
-    return None
+def save_proposal(store, response: str, decision_type: str, data: dict | None = None) -> int:
+    """Guarda propuesta en la siguiente ronda y retorna su numero."""
+    round_num = store.save_proposal(response, decision_type, data)
+    console.print(f"[dim]Propuesta guardada en {store.proposal_location(round_num)}[/dim]")
+    return round_num
+
+
+def save_algorithmic_proposals(args, store, decision_type: str, proposals: list,
+                               state: dict, fallback: str | None = None) -> int:
+    """Muestra y guarda propuestas algoritmicas (con el estado del solver para --continue)."""
+    content = format_proposals(proposals)
+    title = "Propuestas (Algoritmico - Respaldo)" if fallback else "Propuestas (Algoritmico)"
+    console.print(Panel(Markdown(content), title=title, border_style="yellow" if fallback else "green"))
+
+    data = {"source": "algoritmo", "options": [p.decision for p in proposals], "state": state}
+    if fallback:
+        data["fallback"] = fallback
+    current_round = save_proposal(store, content, decision_type, data)
+    console.print(f"\n[dim]Para votar: uv run python vote.py --round {current_round}"
+                  f"{store_flags(args)}[/dim]")
+    return current_round
+
+
+def algorithmic_fallback(args, store, solver, participants: list[dict], decision_type: str,
+                         algo_result, reason: str):
+    """Resultado algoritmico (marcado como respaldo) cuando el LLM no responde."""
+    console.print(f"[yellow]Advertencia: {reason}; usando resultado algoritmico[/yellow]")
+
+    if args.rounds:
+        proposals = solver.propose(participants, args.rounds)
+        if proposals:
+            save_algorithmic_proposals(args, store, decision_type, proposals,
+                                       solver.partial(participants).to_dict(), fallback=reason)
+            return
+
+    result = algo_result or solver.solve(participants)
+    result.explanation += f"\nRespaldo: {reason}"
+    title = "Decision de Consenso (Algoritmico - Respaldo)"
+    console.print(Panel(result.format_output(), title=title, border_style="yellow"))
+
+
+def load_algorithmic_round(store) -> tuple[int, dict, dict] | None:
+    """Ultima ronda, si sus opciones vienen del algoritmo y ya tiene votos."""
+    prev_round = store.latest_round()
+    proposal = store.load_proposal(prev_round) if prev_round else None
+    if not proposal or proposal.get("source") != "algoritmo" or "state" not in proposal:
+        return None
+    votes = store.load_votes(prev_round)
+    if not votes:
+        return None
+    return prev_round, proposal, votes
+
+
+def continue_algorithmically(args, store, participants: list[dict],
+                             prev_round: int, proposal: dict, votes: dict):
+    """
+    Propone la siguiente ronda sin LLM: parte del estado guardado con las
+    opciones (no recalcula los conteos), da doble peso a quienes no votaron
+    por la opcion ganadora y re-pondera las alternativas con el conteo.
+    """
+    state_data = proposal["state"]
+    solver = get_solver(proposal["type"], **state_data["config"])
+    options = proposal["options"]
+
+    result = tally(votes["votes"], len(options), args.tally)
+    console.print(f"[cyan]Continuando desde ronda {prev_round} con votos (algoritmico)[/cyan]")
+    console.print(f"[dim]Ganador ({METHOD_LABELS[args.tally]}): Opcion {result.winner}[/dim]")
+
+    losers = {v["participant"] for v in votes["votes"] if v["choice"] != result.winner}
+    state = solver.reweight_state(
+        solver.load_state(state_data),
+        [p for p in participants if p.get("nombre") in losers]
+    )
+
+    proposals = solver.refine_state(state, options, result.ranking, args.rounds or len(options))
+    if not proposals:
+        console.print("[yellow]Advertencia: No se encontraron opciones algoritmicas[/yellow]")
+        return
 
+    save_algorithmic_proposals(args, store, proposal["type"], proposals, state_data)
 
-def save_proposal(round_num: int, response: str, decision_type: str):
-    """Guarda propuesta de una ronda."""
-    proposals_dir = Path("proposals")
-    proposals_dir.mkdir(exist_ok=True)
 
-    proposal = {
-        "round": round_num,
-        "type": decision_type,
-        "content": response
-    }
+def solve_by_subgroups(args, solver, participants: list[dict], decision_type: str) -> bool:
+    """
+    Divide un grupo heterogeneo en subgrupos simples y resuelve cada uno algoritmicamente.
 
-    filepath = proposals_dir / f"round_{round_num}.json"
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(proposal, f, ensure_ascii=False, indent=2)
+    Returns:
+        True si se mostro una decision por subgrupo
+    """
+    split = split_group(solver, decision_type, participants, args.threshold, args.max_subgroups)
+    if split is None:
+        if args.verbose:
+            console.print("[dim]No se encontro una division en subgrupos simples[/dim]")
+        return False
+
+    console.print(f"\n[cyan]Dividiendo en {len(split.clusters)} subgrupos compatibles...[/cyan]")
+    solve_clusters(solver, split)
+    if args.verbose:
+        for i, (members, complexity) in enumerate(zip(split.clusters, split.complexities), start=1):
+            console.print(f"[dim]Subgrupo {i}: {len(members)} participantes, "
+                          f"complejidad {complexity.score:.2f}[/dim]")
+
+    if not split.success or min(r.confidence for r in split.results) < MIN_CONFIDENCE:
+        console.print("[dim]Subgrupos con baja confianza[/dim]")
+        return False
+
+    title = "Decision de Consenso por Subgrupos (Algoritmico)"
+    console.print(Panel(split.format_output(), title=title, border_style="green"))
+    return True
+
+
+def shadow_solve(solver, participants: list[dict], outcome: Outcome | None):
+    """
+    Con probabilidad SHADOW_RATE mide el algoritmo en un caso que va al LLM.
+
+    Solo alimenta el registro de enrutamiento (routing.py fit), para saber si
+    un umbral mas alto habria bastado; el resultado sirve de respaldo.
+    """
+    if outcome is None or random.random() >= SHADOW_RATE:
+        return None
+    t = time.perf_counter()
+    result = solver.solve(participants)
+    outcome.record_algorithm(result, time.perf_counter() - t, shadow=SHADOW_RATE)
+    return result
+
+
+def log_route(outcome: Outcome | None, source: str):
+    """Registra como se resolvio la decision (no se registran las rondas)."""
+    if outcome is not None:
+        outcome.source = source
+        log_outcome(outcome)
+
+
+def make_solver(args, decision_type: str):
+    """Solver configurado con los flags (memoizado salvo --no-cache)."""
+    solver = get_solver(
+        decision_type,
+        voting_method=args.voting,
+        budget_method=args.budget,
+        matching_method=args.matching,
+        tasks_file=args.tasks,
+        local_search_time=args.local_search,
+        counting_method=args.counting,
+        counting_error=args.counting_error,
+        kemeny_time_limit=args.kemeny_time
+    )
+    if not args.no_cache:
+        solver = CachedSolver(solver, ResultCache())
+    return solver
+
+
+def decide_structured(args, participants: list[dict], decision_type: str) -> dict:
+    """
+    Decision del enfoque hibrido como datos, sin formatear ni mostrar nada.
+
+    Mismo orden que la salida de texto: algoritmo si el problema es simple,
+    subgrupos si el grupo esta dividido y Gemini si no queda otra (con el
+    algoritmo como respaldo si el LLM no responde).
+
+    Raises:
+        ValueError: Si se necesita el LLM y no hay API key
+    """
+    started = time.perf_counter()
+    timings = {}
+    record = {"type": decision_type, "participants": len(participants)}
+    solver = None
+    algo_result = None
+    outcome = Outcome(type=decision_type, threshold=args.threshold)
+
+    def done(**fields) -> dict:
+        timings["total"] = time.perf_counter() - started
+        log_route(outcome, "respaldo" if "fallback" in fields else fields["source"])
+        return {**record, **fields, "timings": timings}
+
+    if not args.llm_only:
+        solver = make_solver(args, decision_type)
+        record["config"] = solver.config()
 
-    console.print(f"[dim]Propuesta guardada en {filepath}[/dim]")
+        t = time.perf_counter()
+        complexity = estimate_complexity(solver, participants, args.threshold)
+        timings["complexity"] = time.perf_counter() - t
+        record["complexity"] = complexity.to_dict()
+        outcome.complexity, outcome.factors = complexity.score, complexity.factors
 
+        if complexity.is_simple(args.threshold) or args.algo_only:
+            t = time.perf_counter()
+            algo_result = solver.solve(participants)
+            timings["solve"] = time.perf_counter() - t
+            outcome.record_algorithm(algo_result, timings["solve"])
+            if algo_result.success and (algo_result.confidence >= MIN_CONFIDENCE or args.algo_only):
+                return done(source="algoritmo", decision=algo_result.decision,
+                            confidence=algo_result.confidence)
+        else:
+            t = time.perf_counter()
+            algo_result = shadow_solve(solver, participants, outcome)
+            if algo_result:
+                timings["shadow"] = time.perf_counter() - t
+            if not args.no_split:
+                t = time.perf_counter()
+                split = split_group(solver, decision_type, participants, args.threshold, args.max_subgroups)
+                if split:
+                    solve_clusters(solver, split)
+                timings["split"] = time.perf_counter() - t
+                if split and split.success and min(r.confidence for r in split.results) >= MIN_CONFIDENCE:
+                    return done(source="subgrupos", confidence=split.confidence, subgroups=[
+                        {
+                            "participants": [p.get("nombre") for p in members],
+                            "complexity": cx.to_dict(),
+                            "decision": result.decision,
+                            "confidence": result.confidence,
+                        }
+                        for members, cx, result in zip(split.clusters, split.complexities, split.results)
+                    ])
+
+    if not (os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")):
+        raise ValueError("No se encontro GEMINI_API_KEY")
+
+    from llm import CallPolicy, LLMTimeout, LLMUnavailable, generate
+    model_name = "gemini-3-pro-preview" if args.pro else "gemini-3-flash-preview"
+    task = TASKS[decision_type]["decide"]
+    prompt_data = fit_prompt_data(decision_type, participants, task, max_tokens=args.max_prompt_tokens)
+    prompt = build_prompt(decision_type, participants, task, data=prompt_data.text)
+    policy = CallPolicy(deadline=args.deadline, hedge_percentile=args.hedge, retries=args.retries)
+    try:
+        text, stats = generate(model_name, prompt, policy)
+    except LLMUnavailable as e:
+        if solver is None:
+            raise
+        reason = f"el LLM no respondio en {args.deadline:g}s" if isinstance(e, LLMTimeout) else str(e)
+        result = algo_result or solver.solve(participants)
+        return done(source="algoritmo", decision=result.decision, confidence=result.confidence,
+                    fallback=reason)
+
+    timings["llm"] = stats.latency
+    outcome.record_llm(stats)
+    return done(source="llm", model=model_name, text=text, llm={
+        "attempts": stats.attempts,
+        "hedges": stats.hedges,
+        "prompt_tokens": stats.prompt_tokens,
+        "estimated_tokens": stats.estimated_tokens,
+        "output_tokens": stats.output_tokens,
+        "truncation": prompt_data.steps,
+    })
+
+
+def emit(record: dict, output: str):
+    """Escribe un resultado en stdout: json indentado o una sola linea (ndjson)."""
+    indent = 2 if output == "json" else None
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, indent=indent) + "\n")
+
+
+def run_structured(args):
+    """Salida --output json/ndjson: solo la decision estructurada, sin Rich ni textos."""
+    data_dir = Path("data")
+    try:
+        participants = load_participants(data_dir) if data_dir.exists() else []
+    except SchemaError as e:
+        emit({"error": str(e)}, args.output)
+        sys.exit(1)
+    if not participants:
+        emit({"error": "No hay archivos JSON en 'data/'"}, args.output)
+        sys.exit(1)
 
-def get_current_round() -> int:
-    """Determina la ronda actual basado en propuestas existentes."""
-    proposals_dir = Path("proposals")
-    if not proposals_dir.exists():
-        return 1
+    decision_type = detect_type(participants)
+    args.threshold = resolve_threshold(decision_type, args.threshold)
+    try:
+        record = decide_structured(args, participants, decision_type)
+    except Exception as e:
+        emit({"error": str(e)}, args.output)
+        sys.exit(1)
+    emit(record, args.output)
 
-    existing = list(proposals_dir.glob("round_*.json"))
-    if not existing:
-        return 1
 
-    rounds = [int(f.stem.split("_")[1]) for f in existing]
-    return max(rounds) + 1
+def load_conversation(store, model_name: str, participants: list[dict], prev_round: int):
+    """Conversacion guardada del grupo, si sigue a la ronda anterior con los mismos datos y modelo."""
+    from llm import Conversation
+    data = store.load_conversation()
+    if not data:
+        return None
+    conversation = Conversation.from_dict(data)
+    if (conversation.round != prev_round or conversation.model != model_name
+            or conversation.fingerprint != fingerprint(participants)):
+        return None
+    return conversation
+
+
+def store_flags(args) -> str:
+    """Flags de almacenamiento a repetir en los comandos sugeridos."""
+    if args.store == "json":
+        return ""
+    return f" --store {args.store} --group {args.group}"
 
 
 def main():
@@ -230,31 +555,90 @@ def main():
                         help="Solo usar algoritmo, no LLM")
     parser.add_argument("--llm-only", action="store_true",
                         help="Solo usar LLM, ignorar algoritmo")
-    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
-                        help=f"Umbral de complejidad para usar LLM (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--threshold", type=float,
+                        help=f"Umbral de complejidad para usar LLM (default: el ajustado para el tipo "
+                             f"con routing.py fit, o {DEFAULT_THRESHOLD})")
     parser.add_argument("--verbose", "-v", action="store_true",
                         help="Mostrar metricas de complejidad")
+    parser.add_argument("--output", choices=OUTPUT_FORMATS, default="text",
+                        help="Salida: text (default), json o ndjson (una linea) para pipelines")
+    parser.add_argument("--deadline", type=float,
+                        help="Segundos maximos para el LLM; al agotarse usa el resultado algoritmico")
+    parser.add_argument("--hedge", type=float, metavar="PERCENTIL",
+                        help="Duplicar la peticion al LLM si tarda mas que este percentil de latencia (ej. 95)")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Reintentos ante errores transitorios del LLM (default: 2)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="No reutilizar resultados algoritmicos guardados en .cache/")
+    parser.add_argument("--no-split", action="store_true",
+                        help="No dividir grupos heterogeneos en subgrupos antes de usar LLM")
+    parser.add_argument("--max-subgroups", type=int, default=3,
+                        help="Maximo de subgrupos al dividir un grupo heterogeneo (default: 3)")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json",
+                        help="Almacenamiento de rondas: json (default) o sqlite (consensus.db)")
+    parser.add_argument("--group", default=DEFAULT_GROUP,
+                        help="Grupo de rondas (solo con --store sqlite)")
+    parser.add_argument("--max-prompt-tokens", type=int, default=DEFAULT_MAX_PROMPT_TOKENS,
+                        help=f"Tokens estimados maximos del prompt; se recortan los datos de participantes "
+                             f"para caber (default: {DEFAULT_MAX_PROMPT_TOKENS}, 0 = sin limite)")
+    parser.add_argument("--no-conversation", action="store_true",
+                        help="Reenviar todos los datos en cada ronda en vez de continuar la conversacion")
+    parser.add_argument("--cache-ttl", type=int, default=3600,
+                        help="Segundos que Gemini guarda el contexto de una conversacion (default: 3600)")
+    parser.add_argument("--tally", choices=TALLY_METHODS, default="schulze",
+                        help="Conteo de los votos de la ronda anterior con --continue (default: schulze)")
 
     # Opciones de teoria de juegos
-    parser.add_argument("--voting", choices=["plurality", "borda"], default="plurality",
-                        help="Metodo de votacion: plurality (default) o borda")
-    parser.add_argument("--budget", choices=["minimum", "median"], default="minimum",
-                        help="Metodo de presupuesto: minimum (default) o median")
+    parser.add_argument("--voting", choices=["plurality", "borda", "kemeny"], default="plurality",
+                        help="Metodo de votacion: plurality (default), borda o kemeny")
+    parser.add_argument("--budget", type=budget_method, default="minimum",
+                        help="Metodo de presupuesto: minimum (default), median o percentile:P")
     parser.add_argument("--matching", choices=["greedy", "gale-shapley"], default="greedy",
                         help="Metodo de matching: greedy (default) o gale-shapley")
+    parser.add_argument("--tasks", type=task_catalog,
+                        help="Catalogo de tareas del proyecto en JSON (horas y dependencias; "
+                             "default: catalogo predefinido)")
+    parser.add_argument("--local-search", type=float, default=0.0, metavar="SEGUNDOS",
+                        help="Segundos de busqueda local para mejorar la asignacion de tareas "
+                             "(default: 0, sin busqueda local)")
+    parser.add_argument("--counting", choices=["exact", "approx"], default="exact",
+                        help="Conteo de votos: exact (default) o approx (top-k en memoria fija)")
+    parser.add_argument("--counting-error", type=float, default=0.01,
+                        help="Error relativo maximo del conteo aproximado (default: 0.01)")
+    parser.add_argument("--kemeny-time", type=float, default=1.0,
+                        help="Segundos maximos de busqueda Kemeny por categoria (default: 1.0)")
 
     args = parser.parse_args()
 
+    if args.output != "text":
+        if args.rounds or args.continue_round:
+            parser.error(f"--output {args.output} no soporta --rounds ni --continue")
+        run_structured(args)
+        return
+
+    init_console()
+
+    try:
+        store = open_store(args.store, args.group)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+    # Continuar una ronda con opciones algoritmicas no necesita LLM
+    algo_round = None
+    if args.continue_round and not args.llm_only:
+        algo_round = load_algorithmic_round(store)
+
     # Verificar API key (solo requerida si no es --algo-only)
     api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key and not args.algo_only:
+    if not api_key and not args.algo_only and not algo_round:
         console.print("[red]Error: No se encontro GEMINI_API_KEY[/red]")
         console.print("[dim]Crea un archivo .env con: GEMINI_API_KEY=tu_api_key[/dim]")
         console.print("[dim]O usa --algo-only para resolver sin LLM[/dim]")
         sys.exit(1)
 
     model_name = "gemini-3-pro-preview" if args.pro else "gemini-3-flash-preview"
-    if not args.algo_only:
+    if not args.algo_only and not algo_round:
         console.print(f"[cyan]Modelo:[/cyan] {model_name}")
 
     # Cargar participantes
@@ -264,12 +648,17 @@ def main():
         console.print("[dim]Ejecuta primero: python generate_data.py[/dim]")
         return
 
-    participants = load_participants(data_dir)
+    try:
+        participants = load_participants(data_dir)
+    except SchemaError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
     if not participants:
         console.print("[red]Error: No hay archivos JSON en 'data/'[/red]")
         return
 
     decision_type = detect_type(participants)
+    args.threshold = resolve_threshold(decision_type, args.threshold)
     console.print(f"[cyan]Tipo:[/cyan] {decision_type}")
     console.print(f"[cyan]Participantes:[/cyan] {len(participants)}")
 
@@ -289,52 +678,86 @@ def main():
             extra = ""
         console.print(f"  - {nombre} ({extra})")
 
+    if algo_round:
+        continue_algorithmically(args, store, participants, *algo_round)
+        return
+
     # --- ENFOQUE HIBRIDO: Algoritmo primero, luego LLM ---
     use_llm = args.llm_only
     algo_result = None
+    solver = None
+    # Las rondas (--rounds/--continue) no entran al registro de enrutamiento
+    outcome = None if args.rounds or args.continue_round else Outcome(type=decision_type,
+                                                                     threshold=args.threshold)
 
     if not args.llm_only:
-        solver = get_solver(
-            decision_type,
-            voting_method=args.voting,
-            budget_method=args.budget,
-            matching_method=args.matching
-        )
-        complexity = solver.evaluate_complexity(participants)
+        solver = make_solver(args, decision_type)
+        complexity = estimate_complexity(solver, participants, args.threshold)
+        if outcome:
+            outcome.complexity, outcome.factors = complexity.score, complexity.factors
 
         if args.verbose:
-            console.print(f"\n[cyan]Complejidad:[/cyan] {complexity.score:.2f}")
+            console.print(f"\n[cyan]Complejidad:[/cyan] {complexity.score:.2f} "
+                          f"(umbral {args.threshold:.2f})")
             for factor in complexity.factors:
                 console.print(f"  - {factor}")
 
+        # Modo iterativo: proponer k opciones distintas sin LLM si es posible
+        if args.rounds and (complexity.is_simple(args.threshold) or args.algo_only):
+            console.print(f"\n[cyan]Buscando {args.rounds} opciones algoritmicas...[/cyan]")
+            proposals = solver.propose(participants, args.rounds)
+
+            if args.verbose:
+                cached = " (desde cache)" if getattr(solver, "last_hit", False) else ""
+                console.print(f"[dim]{len(proposals)} opcion(es) distintas{cached}[/dim]")
+
+            if proposals and (proposals[0].confidence >= MIN_CONFIDENCE or args.algo_only):
+                if len(proposals) < args.rounds:
+                    console.print(f"[yellow]Solo hay {len(proposals)} opcion(es) suficientemente "
+                                  f"distintas[/yellow]")
+                save_algorithmic_proposals(args, store, decision_type, proposals,
+                                           solver.partial(participants).to_dict())
+                return
+            elif args.algo_only:
+                console.print("[yellow]Advertencia: No se encontraron opciones algoritmicas[/yellow]")
+                return
+            console.print("[dim]Opciones algoritmicas con baja confianza, usando LLM...[/dim]")
+            use_llm = True
+
         # Intentar resolver algoritmicamente si la complejidad es baja
-        if complexity.is_simple(args.threshold) or args.algo_only:
+        elif complexity.is_simple(args.threshold) or args.algo_only:
             console.print("\n[cyan]Intentando resolver algoritmicamente...[/cyan]")
+            t = time.perf_counter()
             algo_result = solver.solve(participants)
+            if outcome:
+                outcome.record_algorithm(algo_result, time.perf_counter() - t)
 
             if args.verbose:
-                console.print(f"[dim]Confianza: {algo_result.confidence:.0%}[/dim]")
+                cached = " (desde cache)" if getattr(solver, "last_hit", False) else ""
+                console.print(f"[dim]Confianza: {algo_result.confidence:.0%}{cached}[/dim]")
 
             if algo_result.success and algo_result.confidence >= MIN_CONFIDENCE:
                 # Exito con algoritmo
                 title = "Decision de Consenso (Algoritmico)"
                 console.print(Panel(algo_result.format_output(), title=title, border_style="green"))
-
-                if args.rounds:
-                    current_round = get_current_round()
-                    save_proposal(current_round, algo_result.format_output(), decision_type)
-                    console.print(f"\n[dim]Para votar: uv run python vote.py --round {current_round}[/dim]")
+                log_route(outcome, "algoritmo")
                 return
             elif args.algo_only:
                 # Forzado a solo algoritmo pero falló
                 console.print("[yellow]Advertencia: Algoritmo con baja confianza[/yellow]")
                 title = "Decision de Consenso (Algoritmico - Baja Confianza)"
                 console.print(Panel(algo_result.format_output(), title=title, border_style="yellow"))
+                log_route(outcome, "algoritmo")
                 return
             else:
                 console.print("[dim]Confianza baja, usando LLM como fallback...[/dim]")
                 use_llm = True
         else:
+            algo_result = shadow_solve(solver, participants, outcome)
+            if (not args.no_split and not args.rounds
+                    and solve_by_subgroups(args, solver, participants, decision_type)):
+                log_route(outcome, "subgrupos")
+                return
             console.print(f"[dim]Complejidad alta ({complexity.score:.2f}), usando LLM...[/dim]")
             use_llm = True
 
@@ -344,58 +767,99 @@ def main():
             console.print("[red]Error: Se necesita GEMINI_API_KEY para este caso complejo[/red]")
             sys.exit(1)
 
+        from llm import CallPolicy, Conversation, LLMTimeout, LLMUnavailable, generate
+
         # Construir prompt
-        data_json = json.dumps(participants, ensure_ascii=False, indent=2)
         extra_context = ""
+        conversation = None
 
         # Modo iterativo: continuar con votos
         if args.continue_round:
-            current_round = get_current_round()
-            prev_round = current_round - 1
-            votes = load_votes(prev_round)
+            prev_round = store.latest_round()
+            votes = store.load_votes(prev_round)
 
             if votes:
+                proposal = store.load_proposal(prev_round)
+                num_options = count_options(proposal) if proposal else 1
+                result = tally(votes["votes"], num_options, args.tally)
                 extra_context = f"""
 VOTOS DE LA RONDA ANTERIOR:
 {json.dumps(votes, ensure_ascii=False, indent=2)}
 
-Considera estos votos para refinar tu decision."""
+CONTEO DE LA RONDA ANTERIOR:
+{result.format_output()}
+
+Considera estos votos y su conteo para refinar tu decision."""
                 console.print(f"[cyan]Continuando desde ronda {prev_round} con votos[/cyan]")
+                if not args.no_conversation:
+                    conversation = load_conversation(store, model_name, participants, prev_round)
+                    if conversation:
+                        console.print("[dim]Conversacion previa: solo se envian los votos nuevos[/dim]")
 
         # Determinar tarea
         if args.rounds:
             task = TASKS[decision_type]["propose"].format(num_options=args.rounds)
-            current_round = get_current_round()
+            current_round = store.latest_round() + 1
             console.print(f"[cyan]Ronda {current_round}: Proponiendo {args.rounds} opciones[/cyan]")
         else:
             task = TASKS[decision_type]["decide"]
 
-        prompt_template = PROMPTS[decision_type]
-        prompt = prompt_template.format(
-            count=len(participants),
-            data=data_json,
-            extra_context=extra_context,
-            task=task
-        )
+        # Las rondas conversan con Gemini: el contexto se envia (o cachea) una vez
+        if conversation is None and (args.rounds or args.continue_round) and not args.no_conversation:
+            conversation = Conversation(model=model_name, fingerprint=fingerprint(participants))
+
+        prompt_data = fit_prompt_data(decision_type, participants, task, extra_context,
+                                      args.max_prompt_tokens)
+        if prompt_data.truncated:
+            console.print(f"[yellow]Datos recortados por limite de tokens: "
+                          f"{', '.join(prompt_data.steps)}[/yellow]")
 
         console.print("\n[cyan]Consultando a Gemini...[/cyan]\n")
 
-        # Llamar a Gemini
-        client = genai.Client()
-        response = client.models.generate_content(
-            model=model_name,
-            contents=prompt
-        )
+        # Llamar a Gemini con deadline, hedging y reintentos
+        policy = CallPolicy(deadline=args.deadline, hedge_percentile=args.hedge, retries=args.retries)
+        try:
+            if conversation:
+                context, message = split_prompt(decision_type, participants, task, extra_context,
+                                                prompt_data.text)
+                text, stats = conversation.send(context, message, policy, args.cache_ttl)
+            else:
+                prompt = build_prompt(decision_type, participants, task, extra_context, prompt_data.text)
+                text, stats = generate(model_name, prompt, policy)
+        except LLMUnavailable as e:
+            reason = (f"el LLM no respondio en {args.deadline:g}s" if isinstance(e, LLMTimeout)
+                      else str(e))
+            if solver is None:
+                console.print(f"[red]Error: {reason}[/red]")
+                sys.exit(1)
+            algorithmic_fallback(args, store, solver, participants, decision_type, algo_result, reason)
+            log_route(outcome, "respaldo")
+            return
+
+        if args.verbose:
+            console.print(f"[dim]LLM: {stats.latency:.1f}s, {stats.attempts} intento(s), "
+                          f"{stats.hedges} peticion(es) de respaldo, "
+                          f"{stats.prompt_tokens}+{stats.output_tokens} tokens "
+                          f"({stats.cached_tokens} desde cache, {stats.estimated_tokens} de entrada "
+                          f"estimados)[/dim]")
+
+        if outcome:
+            outcome.record_llm(stats)
+            log_route(outcome, "llm")
 
         # Mostrar resultado
         title = "Propuestas" if args.rounds else "Decision de Consenso (LLM)"
-        console.print(Panel(Markdown(response.text), title=title, border_style="green"))
+        console.print(Panel(Markdown(text), title=title, border_style="green"))
 
         # Guardar propuesta si es modo iterativo
         if args.rounds:
-            current_round = get_current_round()
-            save_proposal(current_round, response.text, decision_type)
-            console.print(f"\n[dim]Para votar: uv run python vote.py --round {current_round}[/dim]")
+            current_round = save_proposal(store, text, decision_type, {"source": "llm"})
+            console.print(f"\n[dim]Para votar: uv run python vote.py --round {current_round}"
+                          f"{store_flags(args)}[/dim]")
+            if conversation:
+                conversation.round = current_round
+        if conversation:
+            store.save_conversation(conversation.to_dict())
 
 
 if __name__ == "__main__":
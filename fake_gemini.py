@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita generateContent de la API de Gemini, para probar
+batch.py y decide.py sin API key ni cuota real, y chequeo del BatchRunner
+(limite de cuota, reintentos y deadline) contra ese servidor.
+
+    python fake_gemini.py serve --port 8080 --delay 0.2 --failures 1
+    python batch.py grupos/* --llm-only --base-url http://127.0.0.1:8080
+
+    python fake_gemini.py check
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Un prompt con esta marca recibe un 400 (error no reintentable)
+INVALID_MARKER = "INVALIDO"
+
+
+class FakeGemini(ThreadingHTTPServer):
+    """
+    Servidor falso: cada prompt falla con 503 sus primeras `failures`
+    peticiones y despues responde; cada respuesta tarda `delay` segundos.
+    Registra el instante de llegada de cada peticion.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, delay: float = 0.0, failures: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.delay = delay
+        self.failures = failures
+        self.arrivals: list[float] = []
+        self.seen: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeGemini":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeGemini
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente corto por deadline
+
+    def do_POST(self):
+        size = int(self.headers.get("content-length", 0))
+        body = json.loads(self.rfile.read(size) or b"{}")
+        prompt = "".join(part.get("text", "") for content in body.get("contents", [])
+                         for part in content.get("parts", []))
+        with self.server.lock:
+            self.server.arrivals.append(time.monotonic())
+            count = self.server.seen[prompt] = self.server.seen.get(prompt, 0) + 1
+
+        time.sleep(self.server.delay)
+        if INVALID_MARKER in prompt:
+            return self._send(400, {"error": {"code": 400, "message": "prompt invalido",
+                                              "status": "INVALID_ARGUMENT"}})
+        if count <= self.server.failures:
+            return self._send(503, {"error": {"code": 503, "message": "sobrecargado",
+                                              "status": "UNAVAILABLE"}})
+        self._send(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": f"OPCION 1: {prompt[:40]}"}]}}],
+            "usageMetadata": {"promptTokenCount": max(size // 4, 1), "candidatesTokenCount": 20},
+        })
+
+
+def _run_batch(server: FakeGemini, prompts: list[str], policy, rpm: float | None = None) -> tuple[list, float]:
+    from llm import BatchRunner, LLMRequest, RateLimiter, get_client
+
+    runner = BatchRunner(
+        client=get_client(server.url),
+        limiter=RateLimiter(rpm=rpm),
+        policy=policy,
+        concurrency=4,
+    )
+    requests = [LLMRequest(id=str(i), prompt=prompt, model="fake") for i, prompt in enumerate(prompts)]
+    start = time.monotonic()
+    records = asyncio.run(runner.run(requests))
+    return sorted(records, key=lambda r: int(r.id)), time.monotonic() - start
+
+
+def check_rate_limit() -> tuple[bool, str]:
+    """Con rpm=60 pasan 60 de inmediato y las siguientes a 1 por segundo."""
+    from llm import CallPolicy
+
+    server = FakeGemini().start()
+    records, _ = _run_batch(server, [f"cuota {i}" for i in range(63)], CallPolicy(retries=0), rpm=60)
+    server.shutdown()
+    spread = server.arrivals[-1] - server.arrivals[0]
+    ok = all(r.error is None for r in records) and len(server.arrivals) == 63 and spread >= 2.5
+    return ok, f"63 peticiones con rpm=60: las ultimas 3 llegaron {spread:.1f}s despues de la primera"
+
+
+def check_retries() -> tuple[bool, str]:
+    """503 se reintenta hasta responder; 400 no se reintenta."""
+    from llm import CallPolicy
+
+    server = FakeGemini(failures=2).start()
+    policy = CallPolicy(retries=2, backoff_base=0.01)
+    records, _ = _run_batch(server, ["reintento a", "reintento b", f"{INVALID_MARKER} c"], policy)
+    server.shutdown()
+    retried, invalid = records[:2], records[2]
+    ok = (all(r.error is None and r.attempts == 3 for r in retried)
+          and invalid.error is not None and invalid.attempts == 1)
+    return ok, (f"503 x2: {[r.attempts for r in retried]} intentos y respuesta; "
+                f"400: {invalid.attempts} intento y error")
+
+
+def check_deadline() -> tuple[bool, str]:
+    """El deadline cubre todos los intentos, no cada uno."""
+    from llm import CallPolicy
+
+    server = FakeGemini(delay=0.3, failures=100).start()
+    policy = CallPolicy(deadline=0.5, retries=5, backoff_base=0.01)
+    records, elapsed = _run_batch(server, ["siempre falla"], policy)
+    server.shutdown()
+    record = records[0]
+    ok = record.error is not None and record.attempts <= 2 and elapsed < 1.0
+    return ok, f"deadline 0.5s, 5 reintentos: {record.attempts} intento(s) en {elapsed:.2f}s"
+
+
+def cmd_check(args):
+    from rich.console import Console
+    from rich.table import Table
+
+    # El cliente exige una API key aunque el servidor no la use
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    console = Console()
+    table = Table(title="BatchRunner contra servidor falso")
+    table.add_column("Chequeo", style="cyan")
+    table.add_column("Resultado")
+    table.add_column("Detalle")
+    failed = False
+    for name, check in [("Cuota (RPM)", check_rate_limit), ("Reintentos", check_retries),
+                        ("Deadline", check_deadline)]:
+        ok, detail = check()
+        failed |= not ok
+        table.add_row(name, "[green]OK[/green]" if ok else "[red]FALLA[/red]", detail)
+    console.print(table)
+    sys.exit(1 if failed else 0)
+
+
+def cmd_serve(args):
+    server = FakeGemini(args.port, args.delay, args.failures)
+    print(f"Servidor falso de Gemini en {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de Gemini")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="Levantar el servidor falso")
+    serve.add_argument("--port", type=int, default=8080, help="Puerto (default: 8080)")
+    serve.add_argument("--delay", type=float, default=0.0, help="Segundos por respuesta (default: 0)")
+    serve.add_argument("--failures", type=int, default=0,
+                       help="Respuestas 503 antes de responder cada prompt (default: 0)")
+    serve.set_defaults(func=cmd_serve)
+
+    check = subparsers.add_parser("check", help="Chequear cuota, reintentos y deadline del BatchRunner")
+    check.set_defaults(func=cmd_check)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+"""
+Llamadas a Gemini: cliente compartido, deadline, peticiones de respaldo (hedging),
+reintentos, conversaciones entre rondas con cache de contexto, limite de cuota
+(RPM/TPM) y cola asincrona para lotes.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from google import genai
+from google.genai import errors, types
+
+from prompt_budget import TokenCalibration, estimate_tokens
+from solvers.sketches import QuantileSketch
+
+LATENCY_FILE = Path(".cache/llm_latency.json")
+# Latencias minimas registradas antes de usar su percentil para el hedging
+MIN_LATENCY_SAMPLES = 5
+# Tokens de respuesta reservados por peticion antes de conocer el uso real
+EXPECTED_OUTPUT_TOKENS = 1024
+# Margen antes de que expire la cache de contexto para no usarla al borde
+CACHE_EXPIRY_MARGIN = 60
+
+_clients: dict[tuple, genai.Client] = {}
+
+
+class LLMUnavailable(Exception):
+    """El LLM no respondio (errores agotaron los reintentos)."""
+
+
+class LLMTimeout(LLMUnavailable):
+    """El LLM no respondio antes del deadline."""
+
+
+@dataclass
+class CallPolicy:
+    """Politica de latencia de una llamada al LLM."""
+    deadline: float | None = None  # Segundos totales (None = sin limite)
+    hedge_percentile: float | None = None  # Duplicar la peticion tras este percentil de latencia
+    retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+
+
+@dataclass
+class CallStats:
+    """Como se resolvio una llamada."""
+    latency: float = 0.0
+    attempts: int = 0
+    hedges: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    estimated_tokens: int = 0  # Tokens de entrada estimados antes de enviar
+
+
+def get_client(base_url: str | None = None, timeout: float | None = None) -> genai.Client:
+    """
+    Cliente de Gemini compartido por el proceso (reutiliza conexiones HTTP).
+
+    Args:
+        base_url: Endpoint alternativo (default: GEMINI_BASE_URL o el de Google);
+            permite probar contra un servidor local falso
+        timeout: Timeout HTTP en segundos
+    """
+    base_url = base_url or os.getenv("GEMINI_BASE_URL")
+    key = (base_url, timeout)
+    if key not in _clients:
+        http_options = {}
+        if base_url:
+            http_options["base_url"] = base_url
+        if timeout is not None:
+            http_options["timeout"] = int(timeout * 1000)
+        _clients[key] = genai.Client(http_options=http_options or None)
+    return _clients[key]
+
+
+def _usage(response) -> tuple[int, int]:
+    """Tokens de entrada y salida reportados por la respuesta (0 si no vienen)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+def _record_tokens(stats: CallStats, prompt: str):
+    """Guarda la estimacion de tokens de entrada junto a los reportados para afinar el estimador."""
+    calibration = TokenCalibration()
+    raw = estimate_tokens(prompt)
+    stats.estimated_tokens = estimate_tokens(prompt, calibration.factor())
+    if stats.prompt_tokens:
+        calibration.record(raw, stats.prompt_tokens)
+
+
+def backoff_delay(policy: "CallPolicy", attempt: int) -> float:
+    """Backoff exponencial con jitter completo."""
+    return random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** attempt))
+
+
+class LatencyHistory:
+    """Latencias de llamadas exitosas, resumidas en un sketch de cuantiles en disco."""
+
+    def __init__(self, path: Path = LATENCY_FILE):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.sketch = QuantileSketch.from_dict(json.load(f))
+        except (OSError, json.JSONDecodeError, KeyError):
+            self.sketch = QuantileSketch()
+
+    def percentile(self, p: float) -> float | None:
+        """Percentil p (0-100) en segundos, o None si aun hay pocas muestras."""
+        if self.sketch.count < MIN_LATENCY_SAMPLES:
+            return None
+        return self.sketch.quantile(p / 100)
+
+    def record(self, latency: float):
+        self.sketch.add(latency)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.sketch.to_dict(), f)
+        os.replace(tmp, self.path)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Errores de cliente (4xx) no se reintentan, salvo timeout y cuota (408, 429)."""
+    if isinstance(error, errors.ClientError):
+        return error.code in (408, 429)
+    return True
+
+
+def _submit(fn: Callable) -> Future:
+    """Ejecuta fn en un hilo daemon: una peticion colgada no impide terminar el proceso."""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _remaining(deadline: float | None) -> float | None:
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def _hedged_attempt(fn: Callable, hedge_delay: float | None, deadline: float | None,
+                    stats: CallStats):
+    """
+    Un intento: lanza la peticion y, si tarda mas que hedge_delay, una copia.
+    Retorna la primera respuesta exitosa; si todas fallan, relanza el ultimo error.
+    """
+    started = {_submit(fn): time.monotonic()}
+    pending = set(started)
+    hedge_at = None if hedge_delay is None else time.monotonic() + hedge_delay
+    stats.attempts += 1
+    error = None
+
+    while pending:
+        timeout = _remaining(deadline)
+        if hedge_at is not None:
+            until_hedge = max(hedge_at - time.monotonic(), 0.0)
+            timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                stats.latency = time.monotonic() - started[future]
+                return future.result()
+            error = future.exception()
+
+        if deadline is not None and time.monotonic() >= deadline:
+            raise LLMTimeout("El LLM no respondio antes del deadline") from error
+        if hedge_at is not None and time.monotonic() >= hedge_at and pending:
+            hedge = _submit(fn)
+            started[hedge] = time.monotonic()
+            pending.add(hedge)
+            stats.hedges += 1
+            hedge_at = None
+
+    raise error
+
+
+def call_with_policy(fn: Callable, policy: CallPolicy,
+                     history: LatencyHistory | None = None) -> tuple[object, CallStats]:
+    """
+    Llama a fn respetando la politica de latencia.
+
+    Args:
+        fn: Funcion sin argumentos que hace la peticion
+        policy: Deadline, hedging y reintentos
+        history: Latencias previas para calcular el retraso del hedging
+
+    Returns:
+        (respuesta, estadisticas de la llamada)
+
+    Raises:
+        LLMTimeout: Si se agota el deadline
+        LLMUnavailable: Si los errores agotan los reintentos
+    """
+    deadline = None if policy.deadline is None else time.monotonic() + policy.deadline
+    hedge_delay = None
+    if policy.hedge_percentile is not None and history is not None:
+        hedge_delay = history.percentile(policy.hedge_percentile)
+
+    stats = CallStats()
+    for attempt in range(policy.retries + 1):
+        try:
+            response = _hedged_attempt(fn, hedge_delay, deadline, stats)
+        except LLMTimeout:
+            raise
+        except Exception as e:
+            if not is_retryable(e) or attempt == policy.retries:
+                raise LLMUnavailable(f"El LLM fallo tras {stats.attempts} intento(s): {e}") from e
+            delay = backoff_delay(policy, attempt)
+            remaining = _remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                raise LLMTimeout("El LLM no respondio antes del deadline") from e
+            time.sleep(delay)
+            continue
+
+        if history is not None:
+            history.record(stats.latency)
+        return response, stats
+
+
+def generate(model: str, prompt: str, policy: CallPolicy) -> tuple[str, CallStats]:
+    """Genera una respuesta de Gemini bajo la politica de latencia y retorna su texto."""
+    # El timeout HTTP corta la conexion aunque el hilo siga esperando
+    client = get_client(timeout=policy.deadline)
+
+    response, stats = call_with_policy(
+        lambda: client.models.generate_content(model=model, contents=prompt),
+        policy,
+        LatencyHistory(),
+    )
+    stats.prompt_tokens, stats.output_tokens = _usage(response)
+    _record_tokens(stats, prompt)
+    return response.text, stats
+
+
+# --- Conversacion entre rondas ---
+
+@dataclass
+class Conversation:
+    """
+    Conversacion de un grupo con Gemini a lo largo de las rondas.
+
+    El contexto (instrucciones y datos de participantes) no se guarda: se
+    reconstruye de los datos y `fingerprint` verifica que no cambiaron. Si el
+    modelo lo soporta, el contexto vive en una cache de Gemini (`cache_name`) y
+    cada ronda solo envia los turnos y el mensaje nuevo.
+    """
+    model: str
+    fingerprint: str
+    round: int = 0  # Ronda cuya propuesta es la ultima respuesta
+    turns: list[dict] = field(default_factory=list)  # {"role": "user"|"model", "text": ...}
+    cache_name: str | None = None
+    cache_expires: float | None = None  # Epoch en segundos
+    caching: bool = True  # False si el backend rechazo la cache (ej. contexto muy corto)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Conversation":
+        return cls(**data)
+
+    def _cache_valid(self) -> bool:
+        return (self.cache_name is not None and self.cache_expires is not None
+                and self.cache_expires - CACHE_EXPIRY_MARGIN > time.time())
+
+    def _ensure_cache(self, client: genai.Client, context: str, ttl: int):
+        """Crea la cache del contexto si no hay una vigente (una sola vez si no se soporta)."""
+        if not self.caching or self._cache_valid():
+            return
+        try:
+            cache = client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(system_instruction=context, ttl=f"{ttl}s"),
+            )
+        except errors.ClientError:
+            # Modelo sin cache o contexto bajo el minimo de tokens: no volver a intentar
+            self.caching = False
+            self.cache_name = self.cache_expires = None
+            return
+        except Exception:
+            # Error transitorio: esta ronda va sin cache
+            self.cache_name = self.cache_expires = None
+            return
+        self.cache_name = cache.name
+        self.cache_expires = cache.expire_time.timestamp() if cache.expire_time else time.time() + ttl
+
+    def send(self, context: str, message: str, policy: CallPolicy,
+             cache_ttl: int = 3600) -> tuple[str, CallStats]:
+        """
+        Envia un mensaje nuevo con los turnos anteriores y lo agrega a la conversacion.
+
+        Args:
+            context: Instrucciones y datos de participantes (estaticos)
+            message: Mensaje de esta ronda (tarea, o votos y conteo)
+            policy: Deadline, hedging y reintentos
+            cache_ttl: Segundos de vida de la cache de contexto
+
+        Raises:
+            LLMTimeout, LLMUnavailable: Como call_with_policy
+        """
+        client = get_client(timeout=policy.deadline)
+        self._ensure_cache(client, context, cache_ttl)
+
+        contents = [
+            types.Content(role=turn["role"], parts=[types.Part(text=turn["text"])])
+            for turn in self.turns + [{"role": "user", "text": message}]
+        ]
+
+        def call(cached: bool):
+            if cached:
+                config = types.GenerateContentConfig(cached_content=self.cache_name)
+            else:
+                config = types.GenerateContentConfig(system_instruction=context)
+            return call_with_policy(
+                lambda: client.models.generate_content(model=self.model, contents=contents, config=config),
+                policy,
+                LatencyHistory(),
+            )
+
+        try:
+            response, stats = call(self.cache_name is not None)
+        except LLMUnavailable as e:
+            # La cache pudo expirar o borrarse en el servidor: reintentar sin ella
+            if self.cache_name is None or not isinstance(e.__cause__, errors.ClientError):
+                raise
+            self.cache_name = self.cache_expires = None
+            response, stats = call(False)
+
+        stats.prompt_tokens, stats.output_tokens = _usage(response)
+        usage = getattr(response, "usage_metadata", None)
+        stats.cached_tokens = (usage.cached_content_token_count or 0) if usage else 0
+        _record_tokens(stats, "".join([context, *(turn["text"] for turn in self.turns), message]))
+
+        text = response.text or ""
+        self.turns.append({"role": "user", "text": message})
+        self.turns.append({"role": "model", "text": text})
+        return text, stats
+
+
+# --- Lotes: limite de cuota y cola asincrona ---
+
+class TokenBucket:
+    """Cubeta de tokens que se rellena a tasa constante (capacidad = un minuto de cuota)."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Segundos hasta que haya `amount` tokens (una peticion enorme espera la cubeta llena)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float):
+        """Consume tokens; el saldo puede quedar negativo (deuda que frena las siguientes)."""
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Limite de peticiones y tokens por minuto compartido por todos los workers."""
+
+    def __init__(self, rpm: float | None = None, tpm: float | None = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> float:
+        """Espera cuota para una peticion de ~tokens tokens; retorna los segundos esperados."""
+        started = time.monotonic()
+        async with self._lock:  # En orden de llegada
+            while True:
+                delay = max(
+                    self.requests.delay(1) if self.requests else 0.0,
+                    self.tokens.delay(tokens) if self.tokens else 0.0,
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+        return time.monotonic() - started
+
+    def settle(self, estimated: int, actual: int):
+        """Ajusta la cuota de tokens con el uso real (devuelve o cobra la diferencia)."""
+        if self.tokens:
+            self.tokens.take(actual - estimated)
+
+
+@dataclass
+class LLMRequest:
+    """Una peticion de un lote."""
+    id: str
+    prompt: str
+    model: str
+
+
+@dataclass
+class RequestRecord:
+    """Contabilidad de una peticion de un lote."""
+    id: str
+    model: str
+    text: str = ""
+    error: str | None = None
+    attempts: int = 0
+    queue_wait: float = 0.0  # En cola hasta que un worker la tomo
+    rate_wait: float = 0.0  # Esperando cuota
+    latency: float = 0.0  # Del envio a la respuesta exitosa
+    estimated_tokens: int = 0  # De entrada, estimados antes de enviar
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class BatchRunner:
+    """
+    Ejecuta muchas peticiones con un cliente compartido, concurrencia acotada y
+    sin pasarse de la cuota: una cola asincrona acotada alimenta `concurrency`
+    workers, y cada peticion reserva cuota (RPM y TPM estimados) antes de enviarse.
+    """
+    client: genai.Client
+    limiter: RateLimiter
+    policy: CallPolicy = field(default_factory=CallPolicy)
+    concurrency: int = 4
+    queue_size: int = 16
+    calibration: TokenCalibration | None = None  # Registra estimado vs real (guardar al final)
+
+    async def run(self, requests: Iterable[LLMRequest]) -> list[RequestRecord]:
+        """Procesa las peticiones y retorna su contabilidad (en orden de finalizacion)."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        records = []
+
+        async def producer():
+            for request in requests:
+                await queue.put((request, time.monotonic()))
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                request, enqueued = item
+                records.append(await self._call(request, time.monotonic() - enqueued))
+
+        await asyncio.gather(producer(), *(worker() for _ in range(self.concurrency)))
+        return records
+
+    async def _call(self, request: LLMRequest, queue_wait: float) -> RequestRecord:
+        raw = estimate_tokens(request.prompt)
+        prompt_tokens = estimate_tokens(request.prompt, self.calibration.factor()) if self.calibration else raw
+        estimated = prompt_tokens + EXPECTED_OUTPUT_TOKENS
+        record = RequestRecord(id=request.id, model=request.model, queue_wait=queue_wait,
+                               estimated_tokens=prompt_tokens)
+
+        # El deadline cubre la llamada completa (todos los intentos y sus esperas)
+        # y corre desde el primer envio
+        deadline = None
+        for attempt in range(self.policy.retries + 1):
+            record.rate_wait += await self.limiter.acquire(estimated)
+            if deadline is None and self.policy.deadline is not None:
+                deadline = time.monotonic() + self.policy.deadline
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                self.limiter.settle(estimated, 0)
+                record.error = str(LLMTimeout("El LLM no respondio antes del deadline"))
+                return record
+            record.attempts += 1
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self.client.aio.models.generate_content(model=request.model, contents=request.prompt),
+                    timeout=remaining,
+                )
+            except Exception as e:
+                # La peticion fallida no consumio tokens de salida
+                self.limiter.settle(estimated, prompt_tokens)
+                if isinstance(e, asyncio.TimeoutError):
+                    e = LLMTimeout("El LLM no respondio antes del deadline")
+                if isinstance(e, LLMTimeout) or not is_retryable(e) or attempt == self.policy.retries:
+                    record.error = str(e)
+                    return record
+                delay = backoff_delay(self.policy, attempt)
+                remaining = _remaining(deadline)
+                if remaining is not None and delay >= remaining:
+                    record.error = str(LLMTimeout("El LLM no respondio antes del deadline"))
+                    return record
+                await asyncio.sleep(delay)
+                continue
+
+            record.latency = time.monotonic() - started
+            record.prompt_tokens, record.output_tokens = _usage(response)
+            actual = record.prompt_tokens + record.output_tokens
+            if self.calibration:
+                self.calibration.add(raw, record.prompt_tokens)
+            self.limiter.settle(estimated, actual or estimated)
+            record.text = response.text or ""
+            return record
+        return record
+
+
+def summarize(records: list[RequestRecord]) -> dict:
+    """Totales de un lote: peticiones, errores, tokens, latencias y espera por cuota."""
+    latencies = QuantileSketch()
+    for r in records:
+        if r.error is None:
+            latencies.add(r.latency)
+    return {
+        "requests": len(records),
+        "errors": sum(1 for r in records if r.error is not None),
+        "attempts": sum(r.attempts for r in records),
+        "prompt_tokens": sum(r.prompt_tokens for r in records),
+        "estimated_tokens": sum(r.estimated_tokens for r in records if r.error is None),
+        "output_tokens": sum(r.output_tokens for r in records),
+        "rate_wait": sum(r.rate_wait for r in records),
+        "latency_p50": latencies.quantile(0.5) if latencies else 0.0,
+        "latency_p95": latencies.quantile(0.95) if latencies else 0.0,
+    }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Asigna las tareas de muchos proyectos con un solo equipo y horas compartidas.
+
+Los proyectos se leen de un JSON {proyecto: catalogo}, donde cada catalogo es
+la lista de tareas (mismo formato que --tasks de decide.py) o la ruta a un
+archivo con ella. El estado de la subasta se guarda en .cache/portfolio.json:
+la siguiente corrida solo vuelve a asignar los proyectos que cambiaron.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from decide import load_participants
+from schemas.records import SchemaError
+from solvers.portfolio import Portfolio, solve_portfolio
+from solvers.schedule import load_catalog, parse_catalog
+
+STATE_FILE = Path(".cache/portfolio.json")
+
+console = Console()
+
+
+def load_projects(path: Path) -> dict:
+    """
+    Catalogos de tareas de cada proyecto.
+
+    Las rutas de catalogo son relativas al archivo de proyectos.
+
+    Raises:
+        ValueError: Si el archivo o algun catalogo no es valido (indica el proyecto)
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path}: {e}") from None
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: se esperaba un objeto {{proyecto: tareas}}")
+
+    projects = {}
+    for name, catalog in data.items():
+        try:
+            if isinstance(catalog, str):
+                projects[name], _ = load_catalog(path.parent / catalog)
+            elif isinstance(catalog, list):
+                projects[name] = parse_catalog(catalog)
+            else:
+                raise ValueError("se esperaba una lista de tareas o la ruta a un catalogo")
+        except ValueError as e:
+            raise ValueError(f"proyecto '{name}': {e}") from None
+    return projects
+
+
+def load_state(path: Path) -> Portfolio | None:
+    """Estado de la corrida anterior (None si no hay o no se puede leer)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return Portfolio.from_dict(json.load(f))
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def save_state(portfolio: Portfolio, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(portfolio.to_dict(), f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def show(portfolio: Portfolio, projects: dict, elapsed: float, verbose: bool):
+    table = Table(title="Portafolio de proyectos")
+    table.add_column("Proyecto", style="cyan")
+    table.add_column("Tareas", justify="right")
+    table.add_column("Asignadas", justify="right")
+    table.add_column("Horas", justify="right")
+    table.add_column("Sin asignar")
+    for name, tasks in projects.items():
+        assigned = portfolio.assignments[name]
+        table.add_row(name, str(len(tasks)), str(len(assigned)),
+                      f"{sum(tasks[t].hours for t in assigned):g}",
+                      ", ".join(portfolio.unassigned[name]) or "-")
+    console.print(table)
+
+    if verbose:
+        people = Table(title="Horas por persona")
+        people.add_column("Persona", style="cyan")
+        people.add_column("Asignadas", justify="right")
+        people.add_column("Disponibles", justify="right")
+        people.add_column("Precio por hora", justify="right")
+        for name in sorted(portfolio.hours):
+            people.add_row(name, f"{portfolio.hours[name]:g}", f"{portfolio.capacity[name]:g}",
+                           f"{portfolio.prices[name]:.2f}")
+        console.print(people)
+
+    total = sum(len(tasks) for tasks in projects.values())
+    assigned = sum(len(a) for a in portfolio.assignments.values())
+    console.print(f"[cyan]Tareas asignadas:[/cyan] {assigned} de {total}")
+    console.print(f"[cyan]Valor:[/cyan] {portfolio.value:g} (cota superior {portfolio.bound:.1f}, "
+                  f"a lo sumo {portfolio.gap:.1%} del optimo)")
+    reuse = f", {portfolio.reused} tareas conservadas de la corrida anterior" if portfolio.reused else ""
+    console.print(f"[dim]{elapsed:.2f}s, {portfolio.bids} pujas{reuse}[/dim]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asignar tareas de muchos proyectos con un equipo compartido")
+    parser.add_argument("projects", help="JSON {proyecto: lista de tareas o ruta a un catalogo}")
+    parser.add_argument("--data", default="data",
+                        help="Directorio de participantes del equipo (default: data)")
+    parser.add_argument("--state", default=str(STATE_FILE),
+                        help=f"Estado para reanudar la proxima corrida (default: {STATE_FILE})")
+    parser.add_argument("--cold", action="store_true",
+                        help="Resolver desde cero, sin el estado de la corrida anterior")
+    parser.add_argument("--out", help="Archivo JSON con las asignaciones {proyecto: {tarea: persona}}")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Mostrar horas y precio de cada persona")
+
+    args = parser.parse_args()
+
+    data_dir = Path(args.data)
+    if not data_dir.is_dir() or not any(data_dir.glob("*.json")):
+        console.print(f"[red]Error: No hay participantes en {data_dir}[/red]")
+        sys.exit(1)
+    try:
+        projects = load_projects(Path(args.projects))
+        participants = load_participants(data_dir)
+    except (ValueError, SchemaError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+    state = Path(args.state)
+    warm = None if args.cold else load_state(state)
+    start = time.perf_counter()
+    try:
+        portfolio = solve_portfolio(participants, projects, warm)
+    except (ValueError, SchemaError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    console.print(f"[cyan]Proyectos:[/cyan] {len(projects)}")
+    console.print(f"[cyan]Participantes:[/cyan] {len(participants)}")
+    show(portfolio, projects, elapsed, args.verbose)
+    save_state(portfolio, state)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(portfolio.assignments, f, ensure_ascii=False, indent=2)
+        console.print(f"[dim]Asignaciones guardadas en {args.out}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Estimacion local de tokens del prompt y recorte de los datos de participantes a un presupuesto."""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from schemas.records import plain
+from solvers.sketches import QuantileSketch
+
+TOKEN_FILE = Path(".cache/llm_tokens.json")
+# Llamadas registradas antes de corregir el estimador con su razon real/estimado
+MIN_TOKEN_SAMPLES = 5
+# Tokens maximos del prompt por defecto (muy por debajo del contexto de Gemini)
+DEFAULT_MAX_PROMPT_TOKENS = 100_000
+# Campos que identifican a un participante (no cuentan para agrupar perfiles)
+IDENTITY_FIELDS = ("nombre",)
+
+# Palabras, numeros, tramos de espacios y tramos de signos
+_PIECES = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]+")
+
+
+def estimate_tokens(text: str, factor: float = 1.0) -> int:
+    """
+    Estimacion local de tokens, sin llamar a la API.
+
+    Cada palabra cuenta un token cada 4 letras, cada digito un token, cada
+    tramo de signos un token cada 2 y cada tramo de espacios (indentacion
+    incluida) un token. `factor` corrige la estimacion con lo medido en
+    llamadas reales (TokenCalibration).
+    """
+    tokens = 0
+    for match in _PIECES.finditer(text):
+        piece = match.group()
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += len(piece)
+        elif piece[0].isspace():
+            tokens += 1
+        else:
+            tokens += (len(piece) + 1) // 2
+    return round(tokens * factor) + 1
+
+
+class TokenCalibration:
+    """Razon entre tokens reales y estimados, resumida en un sketch de cuantiles en disco."""
+
+    def __init__(self, path: Path = TOKEN_FILE):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.sketch = QuantileSketch.from_dict(json.load(f))
+        except (OSError, json.JSONDecodeError, KeyError):
+            self.sketch = QuantileSketch()
+
+    def factor(self) -> float:
+        """Mediana de real/estimado, o 1.0 si aun hay pocas llamadas registradas."""
+        if self.sketch.count < MIN_TOKEN_SAMPLES:
+            return 1.0
+        return self.sketch.quantile(0.5)
+
+    def add(self, estimated: int, actual: int):
+        """Registra una llamada (estimado sin corregir, tokens de entrada reportados)."""
+        if estimated > 0 and actual > 0:
+            self.sketch.add(actual / estimated)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.sketch.to_dict(), f)
+        os.replace(tmp, self.path)
+
+    def record(self, estimated: int, actual: int):
+        self.add(estimated, actual)
+        self.save()
+
+
+@dataclass
+class PromptData:
+    """Datos de participantes listos para el prompt y como se recortaron."""
+    text: str
+    tokens: int  # Estimados
+    steps: list[str] = field(default_factory=list)  # Recortes aplicados, en orden
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.steps)
+
+
+def _dumps(data, compact: bool) -> str:
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def common_fields(participants: list[dict]) -> dict:
+    """Campos con el mismo valor en todos los participantes (no aportan al decidir)."""
+    if len(participants) < 2:
+        return {}
+    first, *rest = participants
+    return {
+        key: value for key, value in first.items()
+        if key not in IDENTITY_FIELDS and all(key in p and p[key] == value for p in rest)
+    }
+
+
+def group_profiles(participants: list[dict], skip: dict) -> list[dict]:
+    """
+    Agrupa participantes con el mismo perfil (todo salvo el nombre).
+
+    Returns:
+        Perfiles {"cantidad", "nombres", ...campos} del mas al menos repetido
+        (empates en orden de aparicion), sin los campos de `skip` ni los vacios
+    """
+    groups: dict[str, dict] = {}
+    for p in participants:
+        profile = {k: v for k, v in p.items()
+                   if k not in skip and k not in IDENTITY_FIELDS and not _is_empty(v)}
+        key = json.dumps(profile, ensure_ascii=False, sort_keys=True)
+        if key not in groups:
+            groups[key] = {"cantidad": 0, "nombres": [], **profile}
+        groups[key]["cantidad"] += 1
+        if p.get("nombre"):
+            groups[key]["nombres"].append(p["nombre"])
+    for group in groups.values():
+        if not group["nombres"]:
+            del group["nombres"]
+    return sorted(groups.values(), key=lambda g: -g["cantidad"])
+
+
+def fit_participants(participants: list[dict], max_tokens: int | None,
+                     factor: float = 1.0) -> PromptData:
+    """
+    Datos de participantes para el prompt dentro de max_tokens (estimados).
+
+    Aplica solo los recortes necesarios, del que no pierde informacion al que si:
+    1. JSON sin indentacion
+    2. Campos iguales para todos una sola vez (en "comun") y sin campos vacios
+    3. Perfiles identicos una sola vez, con su cantidad y los nombres
+    4. Muestra de los perfiles mas repetidos (los que mas participantes representan)
+
+    Args:
+        participants: Datos completos de participantes
+        max_tokens: Presupuesto para los datos (None = sin limite)
+        factor: Correccion del estimador (TokenCalibration.factor())
+
+    Returns:
+        Los datos a enviar; sin recortes es el mismo JSON indentado de siempre
+    """
+    participants = [plain(p) for p in participants]
+    text = _dumps(participants, compact=False)
+    tokens = estimate_tokens(text, factor)
+    if max_tokens is None or tokens <= max_tokens:
+        return PromptData(text, tokens)
+
+    steps = ["JSON sin indentacion"]
+    text = _dumps(participants, compact=True)
+    tokens = estimate_tokens(text, factor)
+    if tokens <= max_tokens:
+        return PromptData(text, tokens, steps)
+
+    common = common_fields(participants)
+    profiles = group_profiles(participants, common)
+    notes = []
+    if common:
+        steps.append(f"{len(common)} campo(s) comunes agrupados")
+        notes.append("los campos iguales para todos estan una sola vez en 'comun'")
+    if len(profiles) < len(participants):
+        steps.append(f"{len(participants)} participantes en {len(profiles)} perfiles distintos")
+        notes.append("los participantes con el mismo perfil estan una sola vez, con su "
+                     "'cantidad' y sus 'nombres'")
+    else:
+        notes.append("cada perfil es un participante ('cantidad' 1)")
+
+    def build(shown: int) -> tuple[str, int]:
+        extra = []
+        if shown < len(profiles):
+            represented = sum(g["cantidad"] for g in profiles[:shown])
+            extra.append(f"se muestran los {shown} perfiles mas repetidos de {len(profiles)} "
+                         f"({represented} de {len(participants)} participantes); el resto se omitio")
+        data = {
+            "nota": "Datos resumidos por limite de tokens: " + "; ".join(notes + extra) + ".",
+            "comun": common,
+            "perfiles": profiles[:shown],
+        }
+        text = _dumps(data, compact=True)
+        return text, estimate_tokens(text, factor)
+
+    text, tokens = build(len(profiles))
+    if tokens <= max_tokens:
+        return PromptData(text, tokens, steps)
+
+    # Mayor cantidad de perfiles que cabe (al menos uno)
+    low, high = 1, len(profiles) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if build(middle)[1] <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    text, tokens = build(low)
+    steps.append(f"muestra de {low} de {len(profiles)} perfiles")
+    return PromptData(text, tokens, steps)
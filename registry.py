@@ -0,0 +1,74 @@
+"""Registros de tipos de decision que importan cada modulo recien al pedirlo."""
+
+import importlib
+from collections.abc import Callable, Iterator, Mapping
+from importlib.metadata import EntryPoint, entry_points
+
+
+def import_string(spec: str):
+    """Importa "modulo" o "modulo:atributo"."""
+    module_name, _, attr = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr) if attr else module
+
+
+class LazyRegistry(Mapping):
+    """
+    Tipo de decision -> objeto registrado, importado solo al pedir ese tipo.
+
+    Los tipos propios se registran como "modulo:atributo"; los de terceros, como
+    entry points del grupo indicado (ej. en su pyproject.toml):
+
+        [project.entry-points."consensus.solvers"]
+        mi_tipo = "mi_paquete.solver:MiSolver"
+
+    Los entry points solo se buscan al pedir un tipo que no es propio o al
+    listar todos los tipos; un tipo propio no puede ser reemplazado.
+    """
+
+    def __init__(self, group: str, builtins: dict[str, str], adapt: Callable | None = None):
+        """
+        Args:
+            group: Grupo de entry points de los plugins
+            builtins: Tipos propios: nombre -> "modulo:atributo"
+            adapt: Transforma el objeto importado antes de guardarlo
+        """
+        self.group = group
+        self._specs: dict[str, str | EntryPoint] = dict(builtins)
+        self._adapt = adapt
+        self._loaded: dict[str, object] = {}
+        self._plugins_loaded = False
+
+    def _load_plugins(self):
+        if self._plugins_loaded:
+            return
+        for entry_point in entry_points(group=self.group):
+            self._specs.setdefault(entry_point.name, entry_point)
+        self._plugins_loaded = True
+
+    def __getitem__(self, name: str):
+        if name not in self._loaded:
+            if name not in self._specs:
+                self._load_plugins()
+            spec = self._specs[name]
+            value = spec.load() if isinstance(spec, EntryPoint) else import_string(spec)
+            self._loaded[name] = self._adapt(value) if self._adapt else value
+        return self._loaded[name]
+
+    def __contains__(self, name) -> bool:
+        if name not in self._specs:
+            self._load_plugins()
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        self._load_plugins()
+        return iter(self._specs)
+
+    def __len__(self) -> int:
+        self._load_plugins()
+        return len(self._specs)
+
+    def register(self, name: str, spec: str):
+        """Registra (o reemplaza) un tipo en tiempo de ejecucion."""
+        self._specs[name] = spec
+        self._loaded.pop(name, None)
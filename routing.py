@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Enrutamiento algoritmo/LLM: registro de resultados y umbrales de complejidad por tipo.
+
+Cada decision agrega una linea a .cache/routing.jsonl con la complejidad, lo
+que logro el algoritmo, lo que costo el LLM y que resultado se entrego.
+`python routing.py fit` ajusta con ese registro el umbral de cada tipo que
+minimiza el costo esperado (latencia + tokens) sin bajar la calidad: un
+resultado algoritmico solo se acepta con confianza >= MIN_CONFIDENCE, asi que
+el umbral decide cuando vale la pena intentarlo. decide.py y batch.py cargan
+los umbrales ajustados al arrancar.
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+# Umbral de complejidad por defecto (sin umbral ajustado para el tipo)
+DEFAULT_THRESHOLD = 0.6
+# Confianza minima para aceptar resultado algoritmico
+MIN_CONFIDENCE = 0.7
+
+OUTCOME_LOG = Path(".cache/routing.jsonl")
+THRESHOLDS_FILE = Path(".cache/routing_thresholds.json")
+# Fraccion de los casos enviados al LLM en que igual se mide el algoritmo, para
+# saber si un umbral mas alto habria bastado
+SHADOW_RATE = 0.1
+# Decisiones medidas de un tipo antes de reemplazar el umbral por defecto
+MIN_ROUTING_SAMPLES = 20
+# Segundos de latencia que equivalen a 1000 tokens al comparar costos
+TOKEN_WEIGHT = 0.5
+
+
+@dataclass
+class Outcome:
+    """Una decision: que se intento, cuanto costo y que se entrego."""
+    type: str
+    complexity: float | None = None
+    factors: list[str] = field(default_factory=list)
+    threshold: float | None = None
+    algo_confidence: float | None = None  # None = no se intento el algoritmo
+    algo_success: bool | None = None
+    algo_time: float = 0.0
+    shadow: float | None = None  # Probabilidad de medir el algoritmo solo para el registro
+    llm_latency: float | None = None  # None = no se llamo al LLM
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    source: str = ""  # algoritmo, subgrupos, llm o respaldo
+    timestamp: float = field(default_factory=time.time)
+
+    def record_algorithm(self, result, elapsed: float, shadow: float | None = None):
+        self.algo_confidence = result.confidence
+        self.algo_success = result.success
+        self.algo_time = elapsed
+        self.shadow = shadow
+
+    def record_llm(self, stats):
+        self.llm_latency = stats.latency
+        self.prompt_tokens = stats.prompt_tokens
+        self.output_tokens = stats.output_tokens
+
+
+def log_outcome(outcome: Outcome, path: Path = OUTCOME_LOG):
+    """Agrega la decision al registro (una linea JSON, escrita en una sola llamada)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(asdict(outcome), ensure_ascii=False) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def read_outcomes(path: Path = OUTCOME_LOG) -> list[Outcome]:
+    """Decisiones registradas (se ignoran lineas corruptas)."""
+    outcomes = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    outcomes.append(Outcome(**json.loads(line)))
+                except (json.JSONDecodeError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return outcomes
+
+
+def load_thresholds(path: Path = THRESHOLDS_FILE) -> dict[str, float]:
+    """Umbrales ajustados por tipo ({} si nunca se ajustaron)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {t: fit["threshold"] for t, fit in json.load(f).items()}
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def resolve_threshold(decision_type: str, explicit: float | None = None,
+                      thresholds: dict[str, float] | None = None) -> float:
+    """Umbral a usar: el de --threshold, si no el ajustado para el tipo, si no el default."""
+    if explicit is not None:
+        return explicit
+    if thresholds is None:
+        thresholds = load_thresholds()
+    return thresholds.get(decision_type, DEFAULT_THRESHOLD)
+
+
+def llm_cost(outcome: Outcome, token_weight: float = TOKEN_WEIGHT) -> float:
+    tokens = outcome.prompt_tokens + outcome.output_tokens
+    return outcome.llm_latency + token_weight * tokens / 1000
+
+
+@dataclass
+class ThresholdFit:
+    """Umbral ajustado de un tipo y el costo esperado por decision con y sin el."""
+    threshold: float
+    samples: int
+    expected_cost: float
+    default_cost: float
+    llm_cost: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def fit_threshold(outcomes: list[Outcome], min_confidence: float = MIN_CONFIDENCE,
+                  token_weight: float = TOKEN_WEIGHT,
+                  min_samples: int = MIN_ROUTING_SAMPLES) -> ThresholdFit | None:
+    """
+    Umbral de complejidad que minimiza el costo esperado de un tipo.
+
+    Con umbral T, una decision de complejidad c < T paga el algoritmo y, si su
+    confianza no llega a min_confidence, ademas el LLM; con c >= T paga solo el
+    LLM (costo promedio observado). Solo cuentan las decisiones donde se midio
+    el algoritmo; las medidas por muestreo (shadow) pesan 1/probabilidad para
+    representar a todas las que fueron directo al LLM.
+
+    Returns:
+        El ajuste, o None si hay menos de min_samples decisiones medidas o
+        ninguna llamada al LLM para estimar su costo
+    """
+    measured = [o for o in outcomes if o.algo_confidence is not None and o.complexity is not None]
+    llm_calls = [o for o in outcomes if o.llm_latency is not None]
+    if len(measured) < min_samples or not llm_calls:
+        return None
+
+    average_llm = sum(llm_cost(o, token_weight) for o in llm_calls) / len(llm_calls)
+    cases = sorted(
+        (o.complexity, 1 / o.shadow if o.shadow else 1.0,
+         o.algo_time + (0.0 if o.algo_success and o.algo_confidence >= min_confidence else average_llm))
+        for o in measured
+    )
+    total_weight = sum(weight for _, weight, _ in cases)
+
+    def cost(threshold: float) -> float:
+        attempted = [(w, c) for complexity, w, c in cases if complexity < threshold]
+        attempted_weight = sum(w for w, _ in attempted)
+        return (sum(w * c for w, c in attempted)
+                + (total_weight - attempted_weight) * average_llm) / total_weight
+
+    # El costo solo cambia al cruzar una complejidad observada: probar justo encima de cada una
+    candidates = {0.0, DEFAULT_THRESHOLD} | {complexity + 1e-6 for complexity, _, _ in cases}
+    best = min(candidates, key=lambda t: (round(cost(t), 9), abs(t - DEFAULT_THRESHOLD)))
+    return ThresholdFit(
+        threshold=round(best, 6),
+        samples=len(measured),
+        expected_cost=cost(best),
+        default_cost=cost(DEFAULT_THRESHOLD),
+        llm_cost=average_llm,
+    )
+
+
+def fit_all(outcomes: list[Outcome], **kwargs) -> dict[str, ThresholdFit | None]:
+    """Ajuste por tipo de decision."""
+    by_type: dict[str, list[Outcome]] = {}
+    for outcome in outcomes:
+        by_type.setdefault(outcome.type, []).append(outcome)
+    return {t: fit_threshold(items, **kwargs) for t, items in sorted(by_type.items())}
+
+
+def save_thresholds(fits: dict[str, ThresholdFit | None], path: Path = THRESHOLDS_FILE):
+    """Guarda los umbrales ajustados (los tipos sin ajuste vuelven al default)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({t: fit.to_dict() for t, fit in fits.items() if fit}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def cmd_fit(args):
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    outcomes = read_outcomes(Path(args.log))
+    if not outcomes:
+        console.print(f"[yellow]No hay decisiones registradas en {args.log}[/yellow]")
+        return
+
+    fits = fit_all(outcomes, token_weight=args.token_weight, min_samples=args.min_samples)
+    table = Table(title="Umbrales de complejidad")
+    table.add_column("Tipo", style="cyan")
+    table.add_column("Decisiones", justify="right")
+    table.add_column("Umbral", justify="right")
+    table.add_column("Costo esperado", justify="right")
+    table.add_column(f"Con {DEFAULT_THRESHOLD}", justify="right")
+    table.add_column("Costo LLM", justify="right")
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome.type] = counts.get(outcome.type, 0) + 1
+    for decision_type, fit in fits.items():
+        if fit is None:
+            table.add_row(decision_type, str(counts[decision_type]), f"{DEFAULT_THRESHOLD} (default)",
+                          "-", "-", "-")
+        else:
+            table.add_row(decision_type, str(counts[decision_type]), f"{fit.threshold:.2f}",
+                          f"{fit.expected_cost:.2f}", f"{fit.default_cost:.2f}", f"{fit.llm_cost:.2f}")
+    console.print(table)
+
+    if args.dry_run:
+        return
+    save_thresholds(fits, Path(args.out))
+    console.print(f"[dim]Umbrales guardados en {args.out}[/dim]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajustar umbrales de enrutamiento algoritmo/LLM")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fit = subparsers.add_parser("fit", help="Ajustar umbrales por tipo con el registro de decisiones")
+    fit.add_argument("--log", default=str(OUTCOME_LOG),
+                     help=f"Registro de decisiones (default: {OUTCOME_LOG})")
+    fit.add_argument("--out", default=str(THRESHOLDS_FILE),
+                     help=f"Archivo de umbrales (default: {THRESHOLDS_FILE})")
+    fit.add_argument("--token-weight", type=float, default=TOKEN_WEIGHT,
+                     help=f"Segundos equivalentes a 1000 tokens del LLM (default: {TOKEN_WEIGHT})")
+    fit.add_argument("--min-samples", type=int, default=MIN_ROUTING_SAMPLES,
+                     help=f"Decisiones medidas minimas por tipo (default: {MIN_ROUTING_SAMPLES})")
+    fit.add_argument("--dry-run", action="store_true", help="Mostrar el ajuste sin guardarlo")
+    fit.set_defaults(func=cmd_fit)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
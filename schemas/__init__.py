@@ -1,32 +1,25 @@
 """Esquemas para diferentes tipos de decisiones."""
 
-from .reunion import SCHEMA as REUNION_SCHEMA, generate as generate_reunion
-from .viaje import SCHEMA as VIAJE_SCHEMA, generate as generate_viaje
-from .proyecto import SCHEMA as PROYECTO_SCHEMA, generate as generate_proyecto
-from .compra import SCHEMA as COMPRA_SCHEMA, generate as generate_compra
+from registry import LazyRegistry
 
-SCHEMAS = {
-    "reunion": {
-        "schema": REUNION_SCHEMA,
-        "generate": generate_reunion,
-        "description": "Reunion social (fecha, hora, lugar, comida)"
-    },
-    "viaje": {
-        "schema": VIAJE_SCHEMA,
-        "generate": generate_viaje,
-        "description": "Viaje grupal (destino, fechas, presupuesto)"
-    },
-    "proyecto": {
-        "schema": PROYECTO_SCHEMA,
-        "generate": generate_proyecto,
-        "description": "Asignacion de tareas en proyecto"
-    },
-    "compra": {
-        "schema": COMPRA_SCHEMA,
-        "generate": generate_compra,
-        "description": "Compra grupal (productos, presupuesto)"
+
+def _schema_info(module) -> dict:
+    return {
+        "schema": module.SCHEMA,
+        "generate": module.generate,
+        "description": getattr(module, "DESCRIPTION", ""),
     }
-}
+
+
+# Tipo de decision -> {"schema", "generate", "description"}; cada modulo se
+# importa al pedir su tipo. Otros paquetes agregan tipos con entry points del
+# grupo "consensus.schemas" que apunten a un modulo con SCHEMA, generate y DESCRIPTION.
+SCHEMAS = LazyRegistry("consensus.schemas", {
+    "reunion": "schemas.reunion",
+    "viaje": "schemas.viaje",
+    "proyecto": "schemas.proyecto",
+    "compra": "schemas.compra",
+}, adapt=_schema_info)
 
 def get_schema(name: str):
     if name not in SCHEMAS:
@@ -2,9 +2,17 @@
 
 import random
 
+DESCRIPTION = "Compra grupal (productos, presupuesto)"
+
 SCHEMA = {
     "tipo": "compra",
-    "campos": ["nombre", "presupuesto_max", "productos_interes", "marcas_preferidas", "prioridad"]
+    "campos": {
+        "nombre": str,
+        "presupuesto_max": int,
+        "productos_interes": [str],
+        "marcas_preferidas": [str],
+        "prioridad": str,
+    }
 }
 
 NOMBRES = [
@@ -2,9 +2,17 @@
 
 import random
 
+DESCRIPTION = "Asignacion de tareas en proyecto"
+
 SCHEMA = {
     "tipo": "proyecto",
-    "campos": ["nombre", "habilidades", "disponibilidad_horas", "tareas_interes", "tareas_evitar"]
+    "campos": {
+        "nombre": str,
+        "habilidades": [str],
+        "disponibilidad_horas": int,
+        "tareas_interes": [str],
+        "tareas_evitar": [str],
+    }
 }
 
 NOMBRES = [
@@ -0,0 +1,223 @@
+"""
+Validacion de participantes contra el SCHEMA de su tipo y registros compactos.
+
+Cada SCHEMA declara sus campos con un tipo: str, int (cualquier numero), [str]
+(lista de textos) o un dict de subcampos. El esquema se compila una vez a una
+dataclass congelada con __slots__ y cada participante se convierte una sola vez
+al cargarlo: listas a tuplas, textos repetidos compartidos (sys.intern) y campos
+ausentes con su valor vacio ("", 0, ()), asi los solvers leen atributos sin
+defenderse con p.get(campo, []).
+
+Los registros tambien se leen como un dict (p["zona"], p.get("zona")) y
+to_dict() los devuelve a JSON tal como se cargaron.
+"""
+
+import sys
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import field, make_dataclass
+
+from . import SCHEMAS
+
+# Campos obligatorios en todos los tipos
+REQUIRED_FIELDS = ("nombre",)
+
+_TYPE_NAMES = {str: "texto", int: "numero", float: "numero"}
+
+_compiled: dict[str, type] = {}
+
+
+class SchemaError(ValueError):
+    """Un participante no cumple el esquema de su tipo de decision."""
+
+
+class Record(Mapping):
+    """Base de los registros compilados: lectura como dict y serializacion."""
+    __slots__ = ()
+    _key: tuple = ()  # (tipo, subcampo...) para reconstruir la clase al deserializar
+
+    def __getitem__(self, key: str):
+        if key in self.__dataclass_fields__ and key != "extras":
+            return getattr(self, key)
+        for name, value in self.extras:
+            if name == key:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (name for name in self.__dataclass_fields__ if name != "extras")
+        yield from (name for name, _ in self.extras)
+
+    def __len__(self) -> int:
+        return len(self.__dataclass_fields__) - 1 + len(self.extras)
+
+    def to_dict(self) -> dict:
+        """Dict compatible con JSON (tuplas como listas), en el orden del esquema."""
+        return {key: _plain(value) for key, value in self.items()}
+
+    def __reduce__(self):
+        # Las clases se crean en tiempo de ejecucion: pickle (ProcessPool) las
+        # reconstruye en el otro proceso a partir del tipo y los datos
+        return _rebuild, (self._key, self.to_dict())
+
+
+def _plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_plain(v) for v in value]
+    return value
+
+
+def plain(participant: Mapping) -> dict:
+    """El participante como dict de JSON (registro o dict)."""
+    return participant.to_dict() if isinstance(participant, Record) else participant
+
+
+def _rebuild(key: tuple, data: dict) -> Record:
+    record_type = record_class(key[0])
+    for name in key[1:]:
+        record_type = record_type.__dataclass_fields__[name].metadata["record"]
+    return record_type.validate(data)
+
+
+def _describe(spec) -> str:
+    if isinstance(spec, list):
+        return f"lista de {_describe(spec[0])}"
+    if isinstance(spec, dict):
+        return "objeto"
+    return _TYPE_NAMES.get(spec, getattr(spec, "__name__", str(spec)))
+
+
+def _empty(spec):
+    if isinstance(spec, list):
+        return ()
+    if isinstance(spec, dict):
+        return None
+    return {str: "", int: 0, float: 0}.get(spec)
+
+
+def _converter(name: str, spec):
+    """Funcion que valida y convierte el valor de un campo segun su tipo declarado."""
+    def fail(value):
+        raise SchemaError(f"campo '{name}': se esperaba {_describe(spec)}, "
+                          f"no {type(value).__name__}")
+
+    if spec is str:
+        def convert(value):
+            if not isinstance(value, str):
+                fail(value)
+            return sys.intern(value)
+    elif spec in (int, float):
+        def convert(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                fail(value)
+            return value
+    elif isinstance(spec, list):
+        item = _converter(name, spec[0])
+
+        def convert(value):
+            if not isinstance(value, (list, tuple)):
+                fail(value)
+            return tuple(item(v) for v in value)
+    elif isinstance(spec, type) and issubclass(spec, Record):
+        def convert(value):
+            if not isinstance(value, Mapping):
+                fail(value)
+            return spec.validate(value)
+    else:
+        def convert(value):
+            return value  # Campo sin tipo declarado (esquemas de plugins)
+    return convert
+
+
+def compile_schema(decision_type: str, fields: Mapping | Iterable[str],
+                   path: tuple = ()) -> type[Record]:
+    """
+    Compila los campos de un esquema a una clase de registro.
+
+    Args:
+        decision_type: Tipo de decision (valor por defecto de "tipo")
+        fields: {campo: tipo} o lista de campos sin tipo
+        path: Subcampos hasta este objeto (registros anidados)
+
+    Returns:
+        Dataclass congelada con __slots__, con validate(data) para construirla
+    """
+    specs = dict(fields) if isinstance(fields, Mapping) else dict.fromkeys(fields)
+    key = (decision_type, *path)
+
+    definitions = []
+    converters = {}
+    if not path:
+        definitions.append(("tipo", str, field(default=decision_type)))
+        converters["tipo"] = _converter("tipo", str)
+    for name, spec in specs.items():
+        if isinstance(spec, dict):
+            nested = compile_schema(decision_type, spec, path + (name,))
+            default = nested.validate({})
+            definitions.append((name, nested, field(default=default, metadata={"record": nested})))
+            converters[name] = _converter(".".join(path + (name,)), nested)
+        else:
+            definitions.append((name, object, field(default=_empty(spec))))
+            converters[name] = _converter(".".join(path + (name,)), spec)
+    definitions.append(("extras", tuple, field(default=(), repr=False)))
+
+    class_name = "".join(part.title().replace("_", "") for part in key) + "Record"
+    record_type = make_dataclass(class_name, definitions, bases=(Record,),
+                                 frozen=True, slots=True, namespace={"_key": key})
+    record_type.__module__ = __name__
+    required = [name for name in REQUIRED_FIELDS if name in specs and not path]
+
+    def validate(data: Mapping) -> Record:
+        if isinstance(data, record_type):
+            return data
+        if not isinstance(data, Mapping):
+            raise SchemaError(f"se esperaba un objeto, no {type(data).__name__}")
+        for name in required:
+            if data.get(name) is None:
+                raise SchemaError(f"falta el campo '{name}'")
+        values = {}
+        extras = []
+        for name, value in data.items():
+            if name in converters:
+                if value is not None:
+                    values[name] = converters[name](value)
+            else:
+                extras.append((name, value))
+        if not path and values.get("tipo", decision_type) != decision_type:
+            raise SchemaError(f"tipo '{values['tipo']}' distinto de '{decision_type}'")
+        return record_type(**values, extras=tuple(extras))
+
+    record_type.validate = staticmethod(validate)
+    return record_type
+
+
+def record_class(decision_type: str) -> type[Record] | None:
+    """Clase de registro del tipo (compilada una vez), o None si el tipo no tiene esquema."""
+    if decision_type not in _compiled:
+        if decision_type not in SCHEMAS:
+            return None
+        _compiled[decision_type] = compile_schema(decision_type, SCHEMAS[decision_type]["schema"]["campos"])
+    return _compiled[decision_type]
+
+
+def to_records(decision_type: str, participants: Iterable[Mapping]) -> Iterator[Mapping]:
+    """
+    Convierte participantes en registros del tipo, de a uno (sirve para streams).
+
+    Los que ya son registros pasan tal cual; si el tipo no tiene esquema, los
+    dicts tambien.
+
+    Raises:
+        SchemaError: Si un participante no cumple el esquema (indica cual)
+    """
+    record_type = record_class(decision_type)
+    if record_type is None:
+        yield from participants
+        return
+    for i, p in enumerate(participants, start=1):
+        try:
+            yield record_type.validate(p)
+        except SchemaError as e:
+            name = p.get("nombre") if isinstance(p, Mapping) else None
+            raise SchemaError(f"participante {i}{f' ({name})' if name else ''}: {e}") from None
@@ -2,9 +2,17 @@
 
 import random
 
+DESCRIPTION = "Reunion social (fecha, hora, lugar, comida)"
+
 SCHEMA = {
     "tipo": "reunion",
-    "campos": ["nombre", "disponibilidad", "zona", "restricciones_alimentarias", "preferencias_lugar"]
+    "campos": {
+        "nombre": str,
+        "disponibilidad": {"fechas": [str], "horas": [str]},
+        "zona": str,
+        "restricciones_alimentarias": [str],
+        "preferencias_lugar": [str],
+    }
 }
 
 NOMBRES = [
@@ -2,10 +2,19 @@
 
 import random
 
+DESCRIPTION = "Viaje grupal (destino, fechas, presupuesto)"
+
 SCHEMA = {
     "tipo": "viaje",
-    "campos": ["nombre", "fechas_disponibles", "duracion_preferida", "presupuesto_max",
-               "destinos_interes", "actividades", "restricciones"]
+    "campos": {
+        "nombre": str,
+        "fechas_disponibles": [str],
+        "duracion_preferida": str,
+        "presupuesto_max": int,
+        "destinos_interes": [str],
+        "actividades": [str],
+        "restricciones": [str],
+    }
 }
 
 NOMBRES = [
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Resuelve grupos muy grandes por shards: estados parciales combinables (map-reduce)."""
+
+import argparse
+import json
+import sys
+from itertools import chain
+from pathlib import Path
+
+from rich.console import Console
+from rich.panel import Panel
+
+from schemas.records import SchemaError
+from solvers import get_solver
+from solvers.options import budget_method, task_catalog
+
+console = Console()
+
+
+def iter_participants(source: Path):
+    """Lee participantes de un directorio de JSON o de un archivo JSONL (en streaming)."""
+    if source.is_dir():
+        for filepath in sorted(source.glob("*.json")):
+            with open(filepath, encoding="utf-8") as f:
+                yield json.load(f)
+    else:
+        with open(source, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def cmd_partial(args):
+    """Calcula el estado parcial de un shard y lo guarda en JSON."""
+    participants = iter_participants(Path(args.source))
+    first = next(participants, None)
+    if first is None:
+        console.print(f"[red]Error: No hay participantes en {args.source}[/red]")
+        sys.exit(1)
+
+    decision_type = args.type or first.get("tipo", "reunion")
+    solver = get_solver(
+        decision_type,
+        voting_method=args.voting,
+        budget_method=args.budget,
+        matching_method=args.matching,
+        tasks_file=args.tasks,
+        local_search_time=args.local_search,
+        counting_method=args.counting,
+        counting_error=args.counting_error,
+        kemeny_time_limit=args.kemeny_time
+    )
+    try:
+        state = solver.partial(chain([first], participants))
+    except SchemaError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"type": decision_type, "state": state.to_dict()}, f, ensure_ascii=False)
+
+    console.print(f"[green]Shard de {decision_type} guardado en {out}[/green]")
+
+
+def cmd_merge(args):
+    """Combina estados parciales y resuelve el grupo completo."""
+    shards = []
+    for path in args.shards:
+        with open(path, encoding="utf-8") as f:
+            shards.append(json.load(f))
+
+    types = {shard["type"] for shard in shards}
+    if len(types) > 1:
+        console.print(f"[red]Error: Shards de tipos distintos: {', '.join(sorted(types))}[/red]")
+        sys.exit(1)
+    decision_type = types.pop()
+
+    solver = get_solver(decision_type, **shards[0]["state"]["config"])
+    try:
+        state = solver.merge_states(solver.load_state(shard["state"]) for shard in shards)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        sys.exit(1)
+
+    console.print(f"[cyan]Tipo:[/cyan] {decision_type}")
+    console.print(f"[cyan]Shards:[/cyan] {len(shards)}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"type": decision_type, "state": state.to_dict()}, f, ensure_ascii=False)
+        console.print(f"[dim]Estado combinado guardado en {args.out}[/dim]")
+
+    complexity = solver.evaluate_state(state)
+    if args.verbose:
+        console.print(f"\n[cyan]Complejidad:[/cyan] {complexity.score:.2f}")
+        for factor in complexity.factors:
+            console.print(f"  - {factor}")
+
+    result = solver.solve_state(state)
+    border = "green" if result.success else "yellow"
+    console.print(Panel(result.format_output(), title="Decision de Consenso (Shards)", border_style=border))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolver por shards con estados parciales")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    partial = subparsers.add_parser("partial", help="Calcular el estado parcial de un shard")
+    partial.add_argument("source", help="Directorio con JSON de participantes o archivo JSONL")
+    partial.add_argument("--out", "-o", required=True, help="Archivo donde guardar el estado")
+    partial.add_argument("--type", "-t", help="Tipo de decision (default: campo 'tipo' de los datos)")
+    partial.add_argument("--voting", choices=["plurality", "borda", "kemeny"], default="plurality")
+    partial.add_argument("--budget", type=budget_method, default="minimum")
+    partial.add_argument("--matching", choices=["greedy", "gale-shapley"], default="greedy")
+    partial.add_argument("--tasks", type=task_catalog)
+    partial.add_argument("--local-search", type=float, default=0.0)
+    partial.add_argument("--counting", choices=["exact", "approx"], default="exact")
+    partial.add_argument("--counting-error", type=float, default=0.01)
+    partial.add_argument("--kemeny-time", type=float, default=1.0)
+    partial.set_defaults(func=cmd_partial)
+
+    merge = subparsers.add_parser("merge", help="Combinar estados y resolver")
+    merge.add_argument("shards", nargs="+", help="Archivos de estado generados con 'partial'")
+    merge.add_argument("--out", "-o", help="Guardar el estado combinado (para reducir por niveles)")
+    merge.add_argument("--verbose", "-v", action="store_true", help="Mostrar metricas de complejidad")
+    merge.set_defaults(func=cmd_merge)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,91 @@
 """Solvers algoritmicos para consenso."""
 
-from .base import BaseSolver, ComplexityScore, SolverResult
-from .reunion import ReunionSolver
-from .viaje import ViajeSolver
-from .proyecto import ProyectoSolver
-from .compra import CompraSolver
-
-
-def get_solver(
-    decision_type: str,
-    voting_method: str = "plurality",
-    budget_method: str = "minimum",
-    matching_method: str = "greedy"
-) -> BaseSolver:
+import importlib
+import inspect
+
+from registry import LazyRegistry
+
+from .base import BaseSolver, ComplexityScore, PartialState, SolverResult
+
+# Tipo de decision -> clase del solver (el modulo se importa al pedir el tipo).
+# Otros paquetes agregan tipos con entry points del grupo "consensus.solvers".
+SOLVERS = LazyRegistry("consensus.solvers", {
+    "reunion": "solvers.reunion:ReunionSolver",
+    "viaje": "solvers.viaje:ViajeSolver",
+    "proyecto": "solvers.proyecto:ProyectoSolver",
+    "compra": "solvers.compra:CompraSolver",
+})
+
+# Nombres exportados -> modulo que los define (se importan al primer acceso)
+_LAZY_EXPORTS = {
+    "ReunionSolver": ".reunion",
+    "ReunionState": ".reunion",
+    "ViajeSolver": ".viaje",
+    "ViajeState": ".viaje",
+    "ProyectoSolver": ".proyecto",
+    "ProyectoState": ".proyecto",
+    "CompraSolver": ".compra",
+    "CompraState": ".compra",
+    "QuantileSketch": ".sketches",
+    "HeavyHitters": ".sketches",
+    "CountMinSketch": ".sketches",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_solver(decision_type: str, **config) -> BaseSolver:
     """
     Obtiene el solver para un tipo de decision con configuracion especifica.
 
+    Cada solver recibe solo las opciones que acepta su constructor, asi que se
+    puede pasar la configuracion completa de la linea de comandos a cualquier tipo.
+
     Args:
-        decision_type: Tipo de decision (reunion, viaje, proyecto, compra)
-        voting_method: Metodo de votacion ("plurality" o "borda")
-        budget_method: Metodo de presupuesto ("minimum" o "median")
-        matching_method: Metodo de matching ("greedy" o "gale-shapley")
+        decision_type: Tipo de decision (reunion, viaje, proyecto, compra o un plugin)
+        **config: Opciones de los solvers, por ejemplo:
+            voting_method ("plurality", "borda" o "kemeny"),
+            budget_method ("minimum", "median" o "percentile:P"),
+            matching_method ("greedy" o "gale-shapley"), local_search_time,
+            counting_method ("exact" o "approx"), counting_error,
+            kemeny_time_limit
 
     Returns:
         Instancia del solver configurado
+
+    Raises:
+        ValueError: Si no hay solver para el tipo
     """
-    if decision_type == "reunion":
-        return ReunionSolver(voting_method=voting_method)
-    elif decision_type == "viaje":
-        return ViajeSolver(voting_method=voting_method, budget_method=budget_method)
-    elif decision_type == "proyecto":
-        return ProyectoSolver(matching_method=matching_method)
-    elif decision_type == "compra":
-        return CompraSolver(budget_method=budget_method)
-    else:
-        raise ValueError(f"No hay solver para tipo: {decision_type}")
+    try:
+        solver_class = SOLVERS[decision_type]
+    except KeyError:
+        raise ValueError(f"No hay solver para tipo: {decision_type}") from None
+
+    params = inspect.signature(solver_class).parameters
+    accepts_any = any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+    return solver_class(**{k: v for k, v in config.items() if accepts_any or k in params})
 
 
 __all__ = [
     "BaseSolver",
     "ComplexityScore",
+    "PartialState",
     "SolverResult",
     "ReunionSolver",
+    "ReunionState",
     "ViajeSolver",
+    "ViajeState",
     "ProyectoSolver",
+    "ProyectoState",
     "CompraSolver",
+    "CompraState",
+    "QuantileSketch",
+    "HeavyHitters",
+    "CountMinSketch",
+    "SOLVERS",
     "get_solver",
 ]
@@ -1,7 +1,15 @@
 """Interfaces base para los solvers algoritmicos."""
 
+import json
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from functools import reduce
+
+from registry import import_string
+from schemas.records import to_records
+
+from .proposals import rerank_by_votes, select_diverse
 
 
 @dataclass
@@ -13,6 +21,97 @@ class ComplexityScore:
     def is_simple(self, threshold: float = 0.6) -> bool:
         return self.score < threshold
 
+    def to_dict(self) -> dict:
+        return {"score": self.score, "factors": self.factors}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ComplexityScore":
+        return cls(score=data["score"], factors=list(data["factors"]))
+
+
+def _format_arg(value):
+    """Listas y conjuntos se muestran separados por comas."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def render_facts(facts: list[tuple]) -> str:
+    """
+    Arma el texto de explicacion a partir de hechos (plantilla, *args).
+
+    La plantilla es un str para str.format o una funcion que recibe los args y
+    retorna el texto (o None para omitir el hecho).
+
+    Raises:
+        TypeError: Si un hecho es un str suelto (se desarmaria letra por letra)
+    """
+    lines = []
+    for fact in facts:
+        if isinstance(fact, str):
+            raise TypeError(f"hecho sin tupla: {fact!r} (usar ({fact!r},))")
+        template, *args = fact
+        if callable(template):
+            text = template(*args)
+        else:
+            text = template.format(*(_format_arg(a) for a in args))
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def dump_facts(facts: list[tuple]) -> list[dict]:
+    """
+    Hechos serializables a JSON, sin formatearlos.
+
+    Las plantillas str se guardan tal cual y las funciones de modulo como
+    "modulo:nombre". Un hecho con args que no pasan a JSON (sets, contadores
+    aproximados) o con una funcion local se guarda ya formateado.
+    """
+    dumped = []
+    for fact in facts:
+        template, *args = fact
+        if callable(template):
+            name = getattr(template, "__qualname__", "")
+            entry = {"call": f"{template.__module__}:{name}", "args": args}
+            plain_call = name.isidentifier()
+        else:
+            entry = {"format": template, "args": args}
+            plain_call = True
+        try:
+            if plain_call:
+                dumped.append(json.loads(json.dumps(entry, ensure_ascii=False)))
+                continue
+        except (TypeError, ValueError):
+            pass
+        text = render_facts([fact])
+        if text:
+            dumped.append({"format": "{}", "args": [text]})
+    return dumped
+
+
+def load_facts(data: list[dict]) -> list[tuple]:
+    """Hechos guardados con dump_facts."""
+    return [(import_string(entry["call"]) if "call" in entry else entry["format"], *entry["args"])
+            for entry in data]
+
+
+class LazyExplanation:
+    """
+    Descriptor de SolverResult.explanation: si no se asigno un texto, se arma
+    con los hechos (facts) recien al leerlo, asi resolver no formatea nada que
+    nadie vaya a mostrar. Los args de los hechos no deben modificarse despues.
+    """
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return None  # Default del dataclass: sin texto asignado
+        text = obj.__dict__.get("_explanation")
+        return render_facts(obj.facts) if text is None else text
+
+    def __set__(self, obj, value: str | None):
+        obj.__dict__["_explanation"] = value
+
 
 @dataclass
 class SolverResult:
@@ -20,7 +119,8 @@ class SolverResult:
     success: bool
     decision: dict = field(default_factory=dict)
     confidence: float = 0.0  # 0.0 - 1.0
-    explanation: str = ""
+    explanation: str = LazyExplanation()
+    facts: list[tuple] = field(default_factory=list, repr=False, compare=False)
 
     def format_output(self) -> str:
         """Formatea el resultado para mostrar al usuario."""
@@ -45,10 +145,81 @@ class SolverResult:
 
         return "\n".join(lines)
 
+    def to_dict(self) -> dict:
+        """Sin texto asignado guarda los hechos (dump_facts) en lugar de formatear la explicacion."""
+        data = {
+            "success": self.success,
+            "decision": self.decision,
+            "confidence": self.confidence,
+        }
+        text = self.__dict__.get("_explanation")
+        if text is None:
+            data["facts"] = dump_facts(self.facts)
+        else:
+            data["explanation"] = text
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SolverResult":
+        if "facts" in data:
+            return cls(
+                success=data["success"],
+                decision=data["decision"],
+                confidence=data["confidence"],
+                facts=load_facts(data["facts"]),
+            )
+        return cls(
+            success=data["success"],
+            decision=data["decision"],
+            confidence=data["confidence"],
+            explanation=data["explanation"],
+        )
+
+
+class PartialState(ABC):
+    """
+    Estado parcial de un shard de participantes.
+
+    Los estados se combinan con merge (asociativo) y se serializan con
+    to_dict, de modo que cada shard puede calcularse en otro proceso o maquina.
+    """
+
+    @abstractmethod
+    def merge(self, other: "PartialState") -> "PartialState":
+        """Combina otro estado en este (in-place) y lo retorna."""
+        pass
+
+    @abstractmethod
+    def to_dict(self) -> dict:
+        """Serializa el estado a un dict compatible con JSON."""
+        pass
+
+    def _check_config(self, other: "PartialState"):
+        if self.config != other.config:
+            raise ValueError(f"Estados con configuracion distinta: {self.config} vs {other.config}")
+
 
 class BaseSolver(ABC):
     """Clase base para todos los solvers."""
 
+    # Tipo de decision cuyo esquema valida los participantes (None = dicts sin validar)
+    decision_type: str | None = None
+    # Si ningun factor de complejidad baja al agregar participantes (la
+    # complejidad de una muestra acota la del grupo: ver sampling.py)
+    monotone_complexity: bool = False
+
+    def records(self, participants: Iterable[dict]) -> Iterable:
+        """
+        Participantes como registros del esquema (los ya convertidos al cargarlos
+        pasan tal cual), de a uno para no materializar streams.
+
+        Raises:
+            SchemaError: Si un participante no cumple el esquema
+        """
+        if self.decision_type is None:
+            return participants
+        return to_records(self.decision_type, participants)
+
     @abstractmethod
     def evaluate_complexity(self, participants: list[dict]) -> ComplexityScore:
         """Evalua la complejidad del problema."""
@@ -58,3 +229,64 @@ class BaseSolver(ABC):
     def solve(self, participants: list[dict]) -> SolverResult:
         """Intenta resolver el problema."""
         pass
+
+    def config(self) -> dict:
+        """Configuracion del solver (metodos de votacion, presupuesto, etc.; sin atributos privados)."""
+        return {k: v for k, v in vars(self).items() if not k.startswith("_")}
+
+    # --- Solucion por shards (map-reduce) ---
+
+    def partial(self, participants: Iterable[dict]) -> PartialState:
+        """Calcula el estado parcial de un shard en una sola pasada."""
+        raise NotImplementedError(f"{type(self).__name__} no soporta shards")
+
+    def load_state(self, data: dict) -> PartialState:
+        """Reconstruye un estado serializado con to_dict."""
+        raise NotImplementedError(f"{type(self).__name__} no soporta shards")
+
+    def evaluate_state(self, state: PartialState) -> ComplexityScore:
+        """Evalua la complejidad a partir de un estado combinado."""
+        raise NotImplementedError(f"{type(self).__name__} no soporta shards")
+
+    def solve_state(self, state: PartialState) -> SolverResult:
+        """Resuelve a partir de un estado combinado."""
+        raise NotImplementedError(f"{type(self).__name__} no soporta shards")
+
+    def merge_states(self, states: Iterable[PartialState]) -> PartialState:
+        """Combina los estados de todos los shards en uno."""
+        return reduce(lambda a, b: a.merge(b), states)
+
+    # --- Propuestas alternativas (modo iterativo) ---
+
+    def candidates(self, state: PartialState) -> list[SolverResult]:
+        """Decisiones alternativas plausibles, sin ordenar ni filtrar."""
+        raise NotImplementedError(f"{type(self).__name__} no genera propuestas")
+
+    def propose(self, participants: list[dict], k: int) -> list[SolverResult]:
+        """Hasta k decisiones buenas y distintas entre si, de mejor a peor."""
+        return self.propose_state(self.partial(participants), k)
+
+    def propose_state(self, state: PartialState, k: int) -> list[SolverResult]:
+        return select_diverse(self.candidates(state), k)
+
+    # --- Refinamiento entre rondas ---
+
+    def reweight_state(self, state: PartialState, participants: list[dict]) -> PartialState:
+        """
+        Da doble peso a los participantes indicados (los que perdieron la votacion)
+        combinando su estado parcial con el de todo el grupo.
+        """
+        return state.merge(self.partial(participants)) if participants else state
+
+    def refine_state(self, state: PartialState, options: list[dict], ranking: list[int],
+                     k: int) -> list[SolverResult]:
+        """
+        Propuestas de la siguiente ronda a partir del conteo de la anterior.
+
+        Args:
+            state: Estado del grupo (ya re-ponderado)
+            options: Decisiones propuestas en la ronda anterior
+            ranking: Numeros de opcion de mejor a peor segun el conteo
+            k: Numero maximo de propuestas
+        """
+        return select_diverse(rerank_by_votes(self.candidates(state), options, ranking), k)
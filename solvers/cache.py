@@ -0,0 +1,194 @@
+"""Memoizacion de resultados de solvers por huella de los datos de participantes."""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+
+from schemas.records import plain
+
+from .base import BaseSolver, ComplexityScore, PartialState, SolverResult
+
+# Cambiar al modificar la logica de los solvers para invalidar resultados guardados
+CACHE_VERSION = 7
+
+
+def fingerprint(participants: Iterable[dict]) -> str:
+    """
+    Hash estable del conjunto de participantes, independiente del orden.
+
+    Cada registro se serializa con claves ordenadas y se hashea por separado;
+    la huella final hashea la lista ordenada de hashes (conserva duplicados).
+    """
+    digests = sorted(
+        hashlib.sha256(json.dumps(plain(p), sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        for p in participants
+    )
+    h = hashlib.sha256()
+    for digest in digests:
+        h.update(digest.encode("ascii"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache LRU acotada, en memoria y opcionalmente en disco.
+
+    En memoria guarda hasta max_entries resultados; en disco un archivo JSON
+    por clave, desalojando los menos usados (por mtime) al pasar el limite.
+    """
+
+    def __init__(self, directory: Path | None = Path(".cache/results"), max_entries: int = 256):
+        """
+        Args:
+            directory: Directorio para la cache en disco (None = solo memoria)
+            max_entries: Maximo de resultados en memoria y en disco
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        path.touch()  # Marca como usado recientemente para el LRU en disco
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: dict):
+        self._remember(key, value)
+        if self.directory is None:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        self._evict_disk()
+
+    def _remember(self, key: str, value: dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        files = list(self.directory.glob("*.json"))
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime)
+        for f in files[:len(files) - self.max_entries]:
+            f.unlink(missing_ok=True)
+
+
+class CachedSolver(BaseSolver):
+    """
+    Envuelve un solver y memoiza evaluate_complexity, solve y propose.
+
+    La clave combina el tipo de solver, su configuracion y la huella de los
+    participantes, asi que cualquier cambio en datos o metodos recalcula.
+    """
+
+    def __init__(self, solver: BaseSolver, cache: ResultCache):
+        self.solver = solver
+        self.cache = cache
+        self.last_hit = False
+
+    def __getattr__(self, name):
+        # Atributos propios del solver envuelto (voting_method, etc.)
+        if name == "solver":
+            raise AttributeError(name)
+        return getattr(self.solver, name)
+
+    @property
+    def monotone_complexity(self) -> bool:
+        return self.solver.monotone_complexity
+
+    def config(self) -> dict:
+        return self.solver.config()
+
+    # Los metodos de BaseSolver no pasan por __getattr__: se delegan sin memoizar
+
+    def partial(self, participants: Iterable[dict]) -> PartialState:
+        return self.solver.partial(participants)
+
+    def load_state(self, data: dict) -> PartialState:
+        return self.solver.load_state(data)
+
+    def evaluate_state(self, state: PartialState) -> ComplexityScore:
+        return self.solver.evaluate_state(state)
+
+    def solve_state(self, state: PartialState) -> SolverResult:
+        return self.solver.solve_state(state)
+
+    def candidates(self, state: PartialState) -> list[SolverResult]:
+        return self.solver.candidates(state)
+
+    def propose_state(self, state: PartialState, k: int) -> list[SolverResult]:
+        return self.solver.propose_state(state, k)
+
+    def reweight_state(self, state: PartialState, participants: list[dict]) -> PartialState:
+        return self.solver.reweight_state(state, participants)
+
+    def refine_state(self, state: PartialState, options: list[dict], ranking: list[int],
+                     k: int) -> list[SolverResult]:
+        return self.solver.refine_state(state, options, ranking, k)
+
+    def _key(self, operation: str, participants: list[dict]) -> str:
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "solver": type(self.solver).__name__,
+            "config": self.solver.config(),
+            "operation": operation,
+            "participants": fingerprint(participants),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def evaluate_complexity(self, participants: list[dict]) -> ComplexityScore:
+        key = self._key("complexity", participants)
+        cached = self.cache.get(key)
+        self.last_hit = cached is not None
+        if cached is not None:
+            return ComplexityScore.from_dict(cached)
+
+        complexity = self.solver.evaluate_complexity(participants)
+        self.cache.put(key, complexity.to_dict())
+        return complexity
+
+    def solve(self, participants: list[dict]) -> SolverResult:
+        key = self._key("solve", participants)
+        cached = self.cache.get(key)
+        self.last_hit = cached is not None
+        if cached is not None:
+            return SolverResult.from_dict(cached)
+
+        result = self.solver.solve(participants)
+        self.cache.put(key, result.to_dict())
+        return result
+
+    def propose(self, participants: list[dict], k: int) -> list[SolverResult]:
+        key = self._key(f"propose:{k}", participants)
+        cached = self.cache.get(key)
+        self.last_hit = cached is not None
+        if cached is not None:
+            return [SolverResult.from_dict(r) for r in cached["proposals"]]
+
+        proposals = self.solver.propose(participants, k)
+        self.cache.put(key, {"proposals": [r.to_dict() for r in proposals]})
+        return proposals
@@ -0,0 +1,163 @@
+"""Division de grupos heterogeneos en subgrupos compatibles (k-modes sobre Jaccard)."""
+
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from .base import BaseSolver, ComplexityScore, SolverResult
+from .sampling import estimate_complexity
+
+# Con menos participantes, resolver en el proceso actual es mas rapido que repartir
+PARALLEL_MIN_PARTICIPANTS = 200
+# Nombres a mostrar por subgrupo
+MAX_LISTED_NAMES = 10
+
+
+def _budget_band(value) -> str | None:
+    """Banda de presupuesto por potencias de 2 (presupuestos en la misma banda difieren < 2x)."""
+    if not value or value <= 0:
+        return None
+    return f"presupuesto:{int(math.log2(value))}"
+
+
+def profile(decision_type: str, participant: dict) -> frozenset[str]:
+    """
+    Elementos que definen la compatibilidad de un participante ("categoria:valor").
+
+    Proyecto no tiene perfil: la asignacion de tareas es del equipo completo.
+    """
+    if decision_type == "reunion":
+        disponibilidad = participant.get("disponibilidad", {})
+        items = ([f"fecha:{d}" for d in disponibilidad.get("fechas", [])]
+                 + [f"hora:{h}" for h in disponibilidad.get("horas", [])]
+                 + [f"lugar:{lugar}" for lugar in participant.get("preferencias_lugar", [])])
+    elif decision_type == "viaje":
+        items = ([f"fecha:{d}" for d in participant.get("fechas_disponibles", [])]
+                 + [f"destino:{d}" for d in participant.get("destinos_interes", [])]
+                 + [_budget_band(participant.get("presupuesto_max"))])
+    elif decision_type == "compra":
+        items = ([f"producto:{p}" for p in participant.get("productos_interes", [])]
+                 + [f"prioridad:{participant.get('prioridad')}"]
+                 + [_budget_band(participant.get("presupuesto_max"))])
+    else:
+        return frozenset()
+    return frozenset(item for item in items if item)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def k_modes(profiles: list[frozenset], k: int, max_iterations: int = 20) -> list[int]:
+    """
+    Agrupa perfiles en k grupos maximizando la similitud Jaccard con su moda.
+
+    La moda de un grupo son los elementos que comparte al menos la mitad de sus
+    miembros. Las semillas se eligen por punto mas lejano (determinista): el
+    perfil mas grande y luego, cada vez, el menos parecido a las semillas elegidas.
+
+    Returns:
+        Indice de grupo de cada perfil
+    """
+    seeds = [max(range(len(profiles)), key=lambda i: (len(profiles[i]), -i))]
+    while len(seeds) < k:
+        seeds.append(min(
+            (i for i in range(len(profiles)) if i not in seeds),
+            key=lambda i: (max(jaccard(profiles[i], profiles[s]) for s in seeds), i),
+        ))
+    modes = [profiles[s] for s in seeds]
+
+    labels = None
+    for _ in range(max_iterations):
+        new_labels = [max(range(k), key=lambda c: (jaccard(p, modes[c]), -c)) for p in profiles]
+        if new_labels == labels:
+            break
+        labels = new_labels
+
+        for c in range(k):
+            members = [p for p, label in zip(profiles, labels) if label == c]
+            if not members:
+                continue  # Grupo vacio: conserva su moda anterior
+            counts = Counter(item for p in members for item in p)
+            mode = frozenset(item for item, n in counts.items() if n * 2 >= len(members))
+            modes[c] = mode or frozenset(item for item, _ in counts.most_common(1))
+    return labels
+
+
+@dataclass
+class ClusterSplit:
+    """Subgrupos de un grupo y la decision de cada uno."""
+    clusters: list[list[dict]]
+    complexities: list[ComplexityScore]
+    results: list[SolverResult] = field(default_factory=list)
+
+    @property
+    def confidence(self) -> float:
+        """Confianza promedio ponderada por tamano de subgrupo."""
+        total = sum(len(c) for c in self.clusters)
+        return sum(r.confidence * len(c) for r, c in zip(self.results, self.clusters)) / total
+
+    @property
+    def success(self) -> bool:
+        return bool(self.results) and all(r.success for r in self.results)
+
+    def format_output(self) -> str:
+        blocks = []
+        for i, (members, result) in enumerate(zip(self.clusters, self.results), start=1):
+            names = ", ".join(p.get("nombre", "Anonimo") for p in members[:MAX_LISTED_NAMES])
+            if len(members) > MAX_LISTED_NAMES:
+                names += f" y {len(members) - MAX_LISTED_NAMES} mas"
+            blocks.append(f"SUBGRUPO {i} ({len(members)} participantes: {names})\n\n"
+                          f"{result.format_output()}")
+        return "\n\n".join(blocks)
+
+
+def split_group(solver: BaseSolver, decision_type: str, participants: list[dict],
+                threshold: float = 0.6, max_clusters: int = 3,
+                min_size: int = 2) -> ClusterSplit | None:
+    """
+    Busca la menor division del grupo en subgrupos que sean todos simples.
+
+    Prueba k = 2..max_clusters; una division sirve si cada subgrupo tiene al
+    menos min_size participantes y su complejidad queda bajo el umbral.
+
+    Returns:
+        La division (sin resolver) o None si ninguna sirve
+    """
+    profiles = [profile(decision_type, p) for p in participants]
+    if not any(profiles):
+        return None
+
+    for k in range(2, min(max_clusters, len(participants) // min_size) + 1):
+        labels = k_modes(profiles, k)
+        clusters = [[p for p, label in zip(participants, labels) if label == c] for c in range(k)]
+        if any(len(c) < min_size for c in clusters):
+            continue
+        complexities = [estimate_complexity(solver, c, threshold) for c in clusters]
+        if all(cx.is_simple(threshold) for cx in complexities):
+            order = sorted(range(k), key=lambda c: -len(clusters[c]))
+            return ClusterSplit([clusters[c] for c in order], [complexities[c] for c in order])
+    return None
+
+
+def solve_clusters(solver: BaseSolver, split: ClusterSplit, workers: int | None = None) -> ClusterSplit:
+    """
+    Resuelve cada subgrupo con el solver, en procesos separados si el grupo es grande.
+
+    Args:
+        solver: Solver del tipo de decision (debe poder serializarse con pickle)
+        split: Division a resolver
+        workers: Procesos maximos (default: uno por subgrupo, hasta os.cpu_count())
+    """
+    total = sum(len(c) for c in split.clusters)
+    workers = workers or min(len(split.clusters), os.cpu_count() or 1)
+    if workers <= 1 or total < PARALLEL_MIN_PARTICIPANTS:
+        split.results = [solver.solve(c) for c in split.clusters]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            split.results = list(pool.map(solver.solve, split.clusters))
+    return split
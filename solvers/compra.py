@@ -1,47 +1,143 @@
 """Solver algoritmico para compras grupales."""
 
 from collections import Counter
-from statistics import median
-from .base import BaseSolver, ComplexityScore, SolverResult
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from itertools import combinations, product
+from .base import BaseSolver, ComplexityScore, PartialState, SolverResult
+from .sketches import (
+    HeavyHitters, QuantileSketch, counter_from_dict, counter_to_dict, counting_note,
+    intersect, make_counter, merge_counter, parse_percentile,
+)
+
+
+@dataclass
+class CompraState(PartialState):
+    """Estado parcial de un shard de participantes de una compra."""
+    config: dict
+    n: int = 0
+    producto_counter: Counter | HeavyHitters = field(default_factory=Counter)
+    marca_counter: Counter | HeavyHitters = field(default_factory=Counter)
+    prioridad_counter: Counter = field(default_factory=Counter)
+    budgets: QuantileSketch = field(default_factory=QuantileSketch)
+    common_productos: set | None = None  # None = ningun participante aun
+    common_marcas: set | None = None  # Solo participantes con marcas preferidas
+
+    def merge(self, other: "CompraState") -> "CompraState":
+        self._check_config(other)
+        self.n += other.n
+        merge_counter(self.producto_counter, other.producto_counter)
+        merge_counter(self.marca_counter, other.marca_counter)
+        self.prioridad_counter.update(other.prioridad_counter)
+        self.budgets.merge(other.budgets)
+        self.common_productos = intersect(self.common_productos, other.common_productos)
+        self.common_marcas = intersect(self.common_marcas, other.common_marcas)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "config": self.config,
+            "n": self.n,
+            "producto_counter": counter_to_dict(self.producto_counter),
+            "marca_counter": counter_to_dict(self.marca_counter),
+            "prioridad_counter": counter_to_dict(self.prioridad_counter),
+            "budgets": self.budgets.to_dict(),
+            "common_productos": None if self.common_productos is None else sorted(self.common_productos),
+            "common_marcas": None if self.common_marcas is None else sorted(self.common_marcas),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompraState":
+        return cls(
+            config=data["config"],
+            n=data["n"],
+            producto_counter=counter_from_dict(data["producto_counter"]),
+            marca_counter=counter_from_dict(data["marca_counter"]),
+            prioridad_counter=counter_from_dict(data["prioridad_counter"]),
+            budgets=QuantileSketch.from_dict(data["budgets"]),
+            common_productos=intersect(None, data["common_productos"]),
+            common_marcas=intersect(None, data["common_marcas"]),
+        )
 
 
 class CompraSolver(BaseSolver):
     """Resuelve consenso para compras grupales."""
 
-    def __init__(self, budget_method: str = "minimum"):
+    decision_type = "compra"
+    monotone_complexity = True
+
+    def __init__(self, budget_method: str = "minimum", counting_method: str = "exact",
+                 counting_error: float = 0.01):
         """
         Args:
-            budget_method: "minimum" (default) o "median"
+            budget_method: "minimum" (default), "median" o "percentile:P"
+            counting_method: "exact" (default) o "approx" (top-k en memoria fija)
+            counting_error: Error relativo maximo del conteo aproximado
         """
         self.budget_method = budget_method
+        self.counting_method = counting_method
+        self.counting_error = counting_error
 
-    def _calculate_budget(self, participants: list[dict]) -> tuple[int, str]:
+    def _calculate_budget(self, budgets: QuantileSketch) -> tuple[int, tuple]:
         """Calcula el presupuesto segun el metodo configurado."""
-        presupuestos = [p.get("presupuesto_max", 0) for p in participants if p.get("presupuesto_max")]
-        if not presupuestos:
-            return 0, "No hay presupuestos"
+        if not budgets:
+            return 0, ("No hay presupuestos",)
 
-        if self.budget_method == "median":
-            budget = int(median(presupuestos))
-            explanation = f"Presupuesto (mediana): Q{budget}"
+        percentile = parse_percentile(self.budget_method)
+        if percentile is not None:
+            budget = int(budgets.quantile(percentile / 100))
+            label = f"percentil {percentile:g}"
+        elif self.budget_method == "median":
+            budget = int(budgets.quantile(0.5))
+            label = "mediana"
         else:
-            budget = min(presupuestos)
-            explanation = f"Presupuesto (minimo): Q{budget}"
+            return budgets.min_value, ("Presupuesto (minimo): Q{}", budgets.min_value)
+
+        # El sketch es exacto en grupos pequenos; en grupos grandes reporta el error
+        if budgets.is_exact:
+            return budget, ("Presupuesto ({}): Q{}", label, budget)
+        return budget, ("Presupuesto ({}, aprox. +/-{:.1%} de rango): Q{}", label, budgets.rank_error(), budget)
+
+    def partial(self, participants: Iterable[dict]) -> CompraState:
+        """Acumula votos, presupuestos e intersecciones en una sola pasada."""
+        state = CompraState(
+            config=self.config(),
+            producto_counter=make_counter(self.counting_method, self.counting_error),
+            marca_counter=make_counter(self.counting_method, self.counting_error),
+        )
+        for p in self.records(participants):
+            productos = p.productos_interes
+            # Filtrar "sin preferencia"
+            marcas = [m for m in p.marcas_preferidas if m != "sin preferencia"]
 
-        return budget, explanation
+            state.n += 1
+            state.producto_counter.update(productos)
+            state.marca_counter.update(marcas)
+            state.prioridad_counter[p.prioridad] += 1
+            if p.presupuesto_max:
+                state.budgets.add(p.presupuesto_max)
+            state.common_productos = intersect(state.common_productos, productos)
+            if marcas:
+                state.common_marcas = intersect(state.common_marcas, marcas)
+        return state
+
+    def load_state(self, data: dict) -> CompraState:
+        return CompraState.from_dict(data)
 
     def evaluate_complexity(self, participants: list[dict]) -> ComplexityScore:
         """Evalua complejidad basada en disparidad de presupuestos y productos."""
+        return self.evaluate_state(self.partial(participants))
+
+    def evaluate_state(self, state: CompraState) -> ComplexityScore:
         factors = []
         score = 0.0
 
-        if len(participants) < 2:
+        if state.n < 2:
             return ComplexityScore(score=0.0, factors=["Menos de 2 participantes"])
 
         # Disparidad de presupuestos
-        presupuestos = [p.get("presupuesto_max", 0) for p in participants if p.get("presupuesto_max")]
-        if presupuestos:
-            min_p, max_p = min(presupuestos), max(presupuestos)
+        if state.budgets:
+            min_p, max_p = state.budgets.min_value, state.budgets.max_value
             if min_p > 0 and max_p / min_p > 5:
                 score += 0.3
                 factors.append(f"Presupuestos muy dispares (Q{min_p} - Q{max_p})")
@@ -49,8 +145,7 @@ class CompraSolver(BaseSolver):
                 score += 0.1
 
         # Productos en comun
-        all_productos = [set(p.get("productos_interes", [])) for p in participants]
-        common_productos = set.intersection(*all_productos) if all_productos else set()
+        common_productos = state.common_productos or set()
 
         if len(common_productos) == 0:
             score += 0.3
@@ -60,50 +155,75 @@ class CompraSolver(BaseSolver):
             factors.append("Solo 1 producto en comun")
 
         # Prioridades conflictivas
-        prioridades = [p.get("prioridad", "") for p in participants]
-        prioridad_counter = Counter(prioridades)
-        if len(prioridad_counter) > 3:
+        if len(state.prioridad_counter) > 3:
             score += 0.15
             factors.append("Prioridades muy diversas")
 
         # Marcas sin overlap
-        all_marcas = [set(p.get("marcas_preferidas", [])) for p in participants]
-        # Filtrar "sin preferencia"
-        all_marcas = [m - {"sin preferencia"} for m in all_marcas]
-        all_marcas = [m for m in all_marcas if m]
-
-        if all_marcas:
-            common_marcas = set.intersection(*all_marcas) if len(all_marcas) > 1 else all_marcas[0]
-            if len(common_marcas) == 0:
-                score += 0.15
-                factors.append("Sin marcas en comun")
+        if state.common_marcas is not None and len(state.common_marcas) == 0:
+            score += 0.15
+            factors.append("Sin marcas en comun")
 
         if not factors:
             factors.append("Buena alineacion de preferencias")
 
         return ComplexityScore(score=min(score, 1.0), factors=factors)
 
+    def candidates(self, state: CompraState) -> list[SolverResult]:
+        """Conjuntos de 3 productos entre los 5 mas votados, con los 2 criterios principales."""
+        if state.n < 2 or not state.producto_counter:
+            return []
+
+        presupuesto, _ = self._calculate_budget(state.budgets)
+        top_productos = state.producto_counter.most_common(5)
+        marcas_sugeridas = ([m for m, _ in state.marca_counter.most_common(3)]
+                            if state.marca_counter else ["sin preferencia"])
+        prioridades = state.prioridad_counter.most_common(2) or [("calidad", 0)]
+
+        results = []
+        for productos, (prioridad, prior_count) in product(
+                combinations(top_productos, min(3, len(top_productos))), prioridades):
+            producto_ratio = sum(count for _, count in productos) / len(productos) / state.n
+            prior_ratio = prior_count / state.n
+            results.append(SolverResult(
+                success=True,
+                decision={
+                    "Presupuesto por persona": f"Q{presupuesto}",
+                    "Productos prioritarios": [p for p, _ in productos],
+                    "Marcas sugeridas": marcas_sugeridas,
+                    "Criterio de seleccion": prioridad,
+                },
+                confidence=(producto_ratio + prior_ratio) / 2,
+                facts=[("Apoyo promedio a los productos: {:.0%}; criterio {} ({} votos)",
+                        producto_ratio, prioridad, prior_count)],
+            ))
+        return results
+
     def solve(self, participants: list[dict]) -> SolverResult:
         """Resuelve el consenso para una compra grupal."""
-        if len(participants) < 2:
+        return self.solve_state(self.partial(participants))
+
+    def solve_state(self, state: CompraState) -> SolverResult:
+        if state.n < 2:
             return SolverResult(
                 success=False,
                 explanation="Se necesitan al menos 2 participantes"
             )
 
-        explanations = []
-        budget_label = "Mediana" if self.budget_method == "median" else "Minimo"
-        explanations.append(f"Metodo de presupuesto: {budget_label}")
+        facts = []
+        percentile = parse_percentile(self.budget_method)
+        if percentile is not None:
+            budget_label = f"Percentil {percentile:g}"
+        else:
+            budget_label = "Mediana" if self.budget_method == "median" else "Minimo"
+        facts.append(("Metodo de presupuesto: {}", budget_label))
 
         # Presupuesto
-        presupuesto, budget_explanation = self._calculate_budget(participants)
-        explanations.append(budget_explanation)
+        presupuesto, budget_fact = self._calculate_budget(state.budgets)
+        facts.append(budget_fact)
 
         # Productos mas votados
-        producto_counter = Counter()
-        for p in participants:
-            for prod in p.get("productos_interes", []):
-                producto_counter[prod] += 1
+        producto_counter = state.producto_counter
 
         if not producto_counter:
             return SolverResult(success=False, explanation="No hay productos de interes")
@@ -111,31 +231,29 @@ class CompraSolver(BaseSolver):
         # Top productos
         top_productos = producto_counter.most_common(3)
         productos_seleccionados = [p for p, _ in top_productos]
-        explanations.append(f"Productos prioritarios: {', '.join(productos_seleccionados)}")
+        facts.append(("Productos prioritarios: {}", productos_seleccionados))
 
         # Marcas mas comunes (excluyendo "sin preferencia")
-        marca_counter = Counter()
-        for p in participants:
-            for marca in p.get("marcas_preferidas", []):
-                if marca != "sin preferencia":
-                    marca_counter[marca] += 1
+        marca_counter = state.marca_counter
 
         marcas_sugeridas = [m for m, _ in marca_counter.most_common(3)] if marca_counter else ["sin preferencia"]
-        explanations.append(f"Marcas preferidas: {', '.join(marcas_sugeridas)}")
+        facts.append(("Marcas preferidas: {}", marcas_sugeridas))
 
         # Prioridad mas comun
-        prioridad_counter = Counter(p.get("prioridad", "") for p in participants)
+        prioridad_counter = state.prioridad_counter
         best_prioridad, prior_count = prioridad_counter.most_common(1)[0] if prioridad_counter else ("calidad", 0)
-        explanations.append(f"Criterio principal: {best_prioridad} ({prior_count} votos)")
+        facts.append(("Criterio principal: {} ({} votos)", best_prioridad, prior_count))
+
+        facts.append((counting_note, {"productos": producto_counter, "marcas": marca_counter}))
 
         # Calcular confianza
         if top_productos:
             top_count = top_productos[0][1]
-            producto_ratio = top_count / len(participants)
+            producto_ratio = top_count / state.n
         else:
             producto_ratio = 0
 
-        prior_ratio = prior_count / len(participants) if prior_count else 0
+        prior_ratio = prior_count / state.n if prior_count else 0
         confidence = (producto_ratio + prior_ratio) / 2
 
         decision = {
@@ -149,5 +267,5 @@ class CompraSolver(BaseSolver):
             success=True,
             decision=decision,
             confidence=confidence,
-            explanation="\n".join(explanations)
+            facts=facts
         )
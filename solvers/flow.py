@@ -0,0 +1,142 @@
+"""
+Flujo maximo (Dinic) y cota de cobertura de una asignacion con capacidades.
+
+Dinic alterna un BFS que arma el grafo de niveles con DFS que empujan flujo
+bloqueante por caminos mas cortos; O(V^2 E) en general y mucho menos en grafos
+bipartitos como persona-tarea.
+"""
+
+from collections import deque
+from collections.abc import Hashable, Iterable, Mapping
+from dataclasses import dataclass, field
+
+# Flujo por debajo de esto se considera 0 (capacidades en horas con decimales)
+FLOW_TOLERANCE = 1e-9
+
+
+class FlowNetwork:
+    """Red de flujo con nodos 0..n-1 y aristas dirigidas con capacidad."""
+
+    def __init__(self, nodes: int):
+        self.graph: list[list[int]] = [[] for _ in range(nodes)]  # Nodo -> indices de aristas
+        self.to: list[int] = []
+        self.capacity: list[float] = []  # Capacidad residual; la arista i ^ 1 es la inversa
+
+    def add_edge(self, u: int, v: int, capacity: float) -> int:
+        """Agrega u -> v y devuelve su indice (para leer su flujo con flow())."""
+        edge = len(self.to)
+        self.graph[u].append(edge)
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.graph[v].append(edge + 1)
+        self.to.append(u)
+        self.capacity.append(0.0)
+        return edge
+
+    def flow(self, edge: int) -> float:
+        """Flujo que pasa por la arista (la capacidad residual de su inversa)."""
+        return self.capacity[edge ^ 1]
+
+    def _levels(self, source: int, sink: int) -> list[int] | None:
+        level = [-1] * len(self.graph)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for edge in self.graph[u]:
+                v = self.to[edge]
+                if level[v] < 0 and self.capacity[edge] > FLOW_TOLERANCE:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level if level[sink] >= 0 else None
+
+    def _augment(self, source: int, sink: int, level: list[int], next_edge: list[int]) -> float:
+        """Un camino aumentante en el grafo de niveles (DFS iterativo); 0 si no quedan."""
+        path: list[int] = []  # Aristas desde source
+        u = source
+        while True:
+            if u == sink:
+                pushed = min(self.capacity[e] for e in path)
+                for e in path:
+                    self.capacity[e] -= pushed
+                    self.capacity[e ^ 1] += pushed
+                return pushed
+            edges = self.graph[u]
+            while next_edge[u] < len(edges):
+                edge = edges[next_edge[u]]
+                v = self.to[edge]
+                if self.capacity[edge] > FLOW_TOLERANCE and level[v] == level[u] + 1:
+                    break
+                next_edge[u] += 1
+            if next_edge[u] < len(edges):
+                edge = edges[next_edge[u]]
+                path.append(edge)
+                u = self.to[edge]
+                continue
+            # Callejon sin salida: se descarta el nodo y se retrocede
+            if not path:
+                return 0.0
+            level[u] = -1
+            edge = path.pop()
+            u = self.to[edge ^ 1]
+            next_edge[u] += 1
+
+    def max_flow(self, source: int, sink: int) -> float:
+        total = 0.0
+        while (level := self._levels(source, sink)) is not None:
+            next_edge = [0] * len(self.graph)
+            while (pushed := self._augment(source, sink, level, next_edge)) > FLOW_TOLERANCE:
+                total += pushed
+        return total
+
+
+@dataclass
+class Coverage:
+    """Cuanto de la demanda puede cubrirse a lo sumo respetando capacidades y exclusiones."""
+    demand: float  # Horas totales de las tareas
+    covered: float  # Flujo maximo: cota superior de las horas asignables
+    unreachable: list = field(default_factory=list)  # Tareas que nadie puede tomar
+
+    @property
+    def fraction(self) -> float:
+        return self.covered / self.demand if self.demand > 0 else 1.0
+
+    @property
+    def feasible(self) -> bool:
+        """Si la relajacion cubre todo (condicion necesaria para asignar todas las tareas)."""
+        return self.demand - self.covered <= FLOW_TOLERANCE * max(1.0, self.demand)
+
+
+def max_coverage(demands: Mapping[Hashable, float], capacities: Iterable[float],
+                 allowed: Mapping[Hashable, Iterable[int]]) -> Coverage:
+    """
+    Cota de cobertura de una asignacion tareas -> personas con flujo maximo.
+
+    Red: fuente -> tarea (sus horas) -> persona (si puede tomarla) -> sumidero
+    (sus horas disponibles). El flujo puede repartir una tarea entre varias
+    personas, asi que es una cota superior: ninguna asignacion real cubre mas
+    horas, y si no cubre todo, ninguna asigna todas las tareas.
+
+    Args:
+        demands: {tarea: horas}
+        capacities: Horas disponibles de cada persona (por indice)
+        allowed: {tarea: indices de las personas que pueden tomarla}
+    """
+    capacities = list(capacities)
+    tasks = list(demands)
+    source, sink = 0, 1
+    network = FlowNetwork(2 + len(tasks) + len(capacities))
+    person_node = 2 + len(tasks)
+    for i, capacity in enumerate(capacities):
+        network.add_edge(person_node + i, sink, capacity)
+    unreachable = []
+    for t, task in enumerate(tasks):
+        people = list(allowed.get(task, ()))
+        if not people:
+            unreachable.append(task)
+            continue
+        network.add_edge(source, 2 + t, demands[task])
+        for i in people:
+            network.add_edge(2 + t, person_node + i, demands[task])
+    return Coverage(demand=sum(demands.values()), covered=network.max_flow(source, sink),
+                    unreachable=unreachable)
@@ -0,0 +1,178 @@
+"""Agregacion de rankings Kemeny-Young por branch-and-bound con limite de tiempo."""
+
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+
+class PairwiseCounts:
+    """
+    Conteos por pares de las listas de preferencia de los participantes (combinables).
+
+    Las opciones que un participante no lista quedan empatadas debajo de las
+    listadas, asi que basta con guardar cuantas listas mencionan cada opcion y
+    cuantas ponen a una opcion sobre otra cuando listan ambas:
+
+        prefieren a sobre b = menciones(a) - listas con b antes que a
+    """
+
+    def __init__(self):
+        self.mentions: Counter = Counter()
+        self.above: dict[str, Counter] = {}
+
+    def add(self, items: list):
+        self.mentions.update(items)
+        for pos, a in enumerate(items):
+            if pos + 1 < len(items):
+                self.above.setdefault(a, Counter()).update(items[pos + 1:])
+
+    def merge(self, other: "PairwiseCounts") -> "PairwiseCounts":
+        self.mentions.update(other.mentions)
+        for a, row in other.above.items():
+            self.above.setdefault(a, Counter()).update(row)
+        return self
+
+    def prefer(self, a, b) -> int:
+        """Participantes que prefieren a sobre b."""
+        return self.mentions[a] - self.above.get(b, Counter())[a]
+
+    def to_dict(self) -> dict:
+        return {
+            "mentions": dict(self.mentions),
+            "above": {a: dict(row) for a, row in self.above.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PairwiseCounts":
+        counts = cls()
+        counts.mentions = Counter(data["mentions"])
+        counts.above = {a: Counter(row) for a, row in data["above"].items()}
+        return counts
+
+
+@dataclass
+class KemenyResult:
+    """Mejor ranking encontrado y que tan lejos puede estar del optimo."""
+    ranking: list
+    cost: int  # Desacuerdos por pares con los participantes
+    lower_bound: int
+    optimal: bool
+    nodes: int
+
+    @property
+    def gap(self) -> float:
+        """Brecha de optimalidad relativa (0.0 si el ranking es optimo)."""
+        if self.optimal or not self.cost:
+            return 0.0
+        return (self.cost - self.lower_bound) / self.cost
+
+    def __str__(self) -> str:
+        return self.describe()
+
+    def describe(self) -> str:
+        if self.optimal:
+            return f"Kemeny optimo, {self.cost} desacuerdos"
+        return f"Kemeny con limite de tiempo, {self.cost} desacuerdos, brecha <= {self.gap:.1%}"
+
+
+def _ranking_cost(order: list[int], d: list[list[int]]) -> int:
+    """Desacuerdos de un ranking: votantes que prefieren b sobre a con a antes que b."""
+    return sum(d[order[j]][order[i]] for i in range(len(order)) for j in range(i + 1, len(order)))
+
+
+def _improve(order: list[int], d: list[list[int]]) -> list[int]:
+    """Intercambia vecinos mientras la mayoria prefiera el orden inverso."""
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order) - 1):
+            a, b = order[i], order[i + 1]
+            if d[b][a] > d[a][b]:
+                order[i], order[i + 1] = b, a
+                improved = True
+    return order
+
+
+def kemeny_ranking(counts: PairwiseCounts, time_limit: float = 1.0) -> KemenyResult:
+    """
+    Ranking que minimiza los desacuerdos por pares con todos los participantes.
+
+    Branch-and-bound en profundidad sobre prefijos del ranking:
+    - cota superior inicial: ranking Borda mejorado con intercambios de vecinos
+    - cota inferior de las opciones restantes: suma de min(d[a][b], d[b][a])
+    - poda por mayoria: dos opciones adyacentes de un ranking optimo respetan
+      la mayoria por pares, asi que no se extiende un prefijo que la viole
+    - dominancia: un mismo conjunto de opciones colocadas con el mismo ultimo
+      elemento solo se explora con el menor costo visto
+
+    Args:
+        counts: Conteos por pares de las preferencias
+        time_limit: Segundos maximos de busqueda; al agotarse retorna el mejor
+            ranking encontrado con su brecha respecto a la cota inferior
+
+    Returns:
+        KemenyResult con el ranking y si se demostro optimo
+    """
+    items = sorted(counts.mentions, key=lambda x: (-counts.mentions[x], str(x)))
+    n = len(items)
+    d = [[counts.prefer(a, b) if a != b else 0 for b in items] for a in items]
+
+    # Semilla: Borda (victorias por pares) + busqueda local
+    borda = [sum(row) for row in d]
+    best = _improve(sorted(range(n), key=lambda i: -borda[i]), d)
+    best_cost = _ranking_cost(best, d)
+
+    pair_min = [[min(d[a][b], d[b][a]) for b in range(n)] for a in range(n)]
+    root_bound = sum(pair_min[a][b] for a in range(n) for b in range(a + 1, n))
+
+    deadline = time.perf_counter() + time_limit
+    seen: dict[tuple[int, int], int] = {}
+    nodes = 0
+    timed_out = False
+
+    # Pila de (prefijo, mascara de colocados, costo del prefijo, cota de los restantes)
+    stack = [([], 0, 0, root_bound)]
+    while stack:
+        nodes += 1
+        if nodes % 1024 == 0 and time.perf_counter() > deadline:
+            timed_out = True
+            break
+
+        prefix, mask, cost, bound = stack.pop()
+        if cost + bound >= best_cost:
+            continue
+        if len(prefix) == n:
+            best, best_cost = prefix, cost
+            continue
+
+        remaining = [i for i in range(n) if not mask >> i & 1]
+        last = prefix[-1] if prefix else None
+        children = []
+        for x in remaining:
+            if last is not None and d[x][last] > d[last][x]:
+                continue
+            child_cost = cost + sum(d[y][x] for y in remaining if y != x)
+            child_bound = bound - sum(pair_min[x][y] for y in remaining if y != x)
+            if child_cost + child_bound >= best_cost:
+                continue
+            key = (mask | 1 << x, x)
+            if seen.get(key, best_cost + 1) <= child_cost:
+                continue
+            seen[key] = child_cost
+            children.append((child_cost + child_bound, x, child_cost, child_bound))
+
+        # Explorar primero el hijo mas prometedor (la pila saca el ultimo)
+        children.sort(reverse=True)
+        for _, x, child_cost, child_bound in children:
+            stack.append((prefix + [x], mask | 1 << x, child_cost, child_bound))
+
+    # Sin tiempo, el optimo no puede ser mejor que el nodo abierto mas prometedor
+    lower_bound = min([best_cost] + [c + b for _, _, c, b in stack]) if timed_out else best_cost
+
+    return KemenyResult(
+        ranking=[items[i] for i in best],
+        cost=best_cost,
+        lower_bound=max(lower_bound, root_bound),
+        optimal=not timed_out,
+        nodes=nodes,
+    )
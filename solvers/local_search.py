@@ -0,0 +1,282 @@
+"""
+Busqueda local con limite de tiempo para mejorar una asignacion tareas -> personas.
+
+Parte de una asignacion existente (greedy o Gale-Shapley) y prueba cambios al
+azar, cada uno evaluado con la diferencia de lo que toca (sin recalcular la
+asignacion completa):
+- mover: una tarea a otra persona (o sacarla)
+- intercambiar: dos tareas de personas distintas cambian de persona
+- cadena de expulsiones: una tarea entra a una persona sin horas, que expulsa
+  una de las suyas hacia otra (o la deja sin asignar), hasta EJECTION_DEPTH
+  eslabones
+
+Lo primero son las horas cubiertas (la confianza del solver); el puntaje de
+preferencias solo desempata. Se aceptan los cambios que no bajan las horas ni,
+a iguales horas, el puntaje. Tras STALL_ITERATIONS sin mejorar la mejor
+asignacion se aplica una perturbacion al azar para salir del optimo local. Es
+un algoritmo anytime: al agotarse el tiempo retorna la mejor asignacion vista
+y como fue mejorando.
+"""
+
+import random
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+# Eslabones maximos de una cadena de expulsiones
+EJECTION_DEPTH = 3
+# Intentos sin mejorar antes de perturbar la asignacion
+STALL_ITERATIONS = 2000
+# Tareas movidas al azar en una perturbacion
+KICK_MOVES = 3
+# Puntos de la trayectoria que se muestran en una decision
+TRAJECTORY_POINTS = 20
+# Diferencias de horas menores a esto son empates
+HOURS_TOLERANCE = 1e-9
+
+
+@dataclass
+class LocalSearchResult:
+    """Mejor asignacion encontrada y la evolucion de sus horas cubiertas y su puntaje."""
+    assignments: dict[str, str]
+    hours: float  # Horas cubiertas
+    score: float
+    initial_hours: float
+    initial_score: float
+    trajectory: list[tuple[float, float, float]] = field(default_factory=list)  # (segundos, horas, puntaje)
+    iterations: int = 0
+    repaired: int = 0  # Tareas que se movieron o sacaron porque la asignacion inicial pasaba capacidades
+
+    def thinned(self, points: int = TRAJECTORY_POINTS) -> list[tuple[float, float, float]]:
+        """La trayectoria con a lo sumo `points` puntos (siempre el primero y el ultimo)."""
+        if len(self.trajectory) <= points:
+            return list(self.trajectory)
+        step = (len(self.trajectory) - 1) / (points - 1)
+        return [self.trajectory[round(i * step)] for i in range(points)]
+
+
+def assignment_score(assignments: Mapping[str, str], values: Mapping[tuple[str, str], float],
+                     load_penalty: float) -> float:
+    """Suma de valores (persona, tarea) menos load_penalty por cada par de tareas de una misma persona."""
+    counts: dict[str, int] = {}
+    total = 0.0
+    for task, person in assignments.items():
+        total += values[person, task]
+        counts[person] = counts.get(person, 0) + 1
+    return total - load_penalty * sum(k * (k - 1) / 2 for k in counts.values())
+
+
+def _better(hours: float, score: float, than_hours: float, than_score: float) -> bool:
+    """Si (horas, puntaje) supera estrictamente a (than_hours, than_score), primero por horas."""
+    if hours > than_hours + HOURS_TOLERANCE:
+        return True
+    return hours >= than_hours - HOURS_TOLERANCE and score > than_score + 1e-9
+
+
+class _Search:
+    """Asignacion actual con cargas y conteos por persona para evaluar cambios."""
+
+    def __init__(self, assignments: Mapping[str, str], hours: Mapping[str, float],
+                 capacities: Mapping[str, float], values: Mapping[tuple[str, str], float],
+                 load_penalty: float):
+        self.hours = hours
+        self.capacities = capacities
+        self.values = values
+        self.load_penalty = load_penalty
+        self.owner: dict[str, str | None] = {task: None for task in hours}
+        self.load = {person: 0.0 for person in capacities}
+        self.held: dict[str, list[str]] = {person: [] for person in capacities}
+        self.position: dict[str, int] = {}
+        self.covered = 0.0
+        self.score = 0.0
+
+        # Personas que pueden tomar cada tarea (None = dejarla sin asignar)
+        self.candidates: dict[str, list] = {task: [None] for task in hours}
+        for person, task in values:
+            if task in self.candidates:
+                self.candidates[task].append(person)
+
+        start = [(task, person) for task, person in assignments.items()
+                 if task in hours and (person, task) in values]
+        self.apply(start, self.delta(start, check=False))
+
+    def _penalty(self, count: int) -> float:
+        return self.load_penalty * count * (count - 1) / 2
+
+    def delta(self, changes: list[tuple[str, str | None]],
+              check: bool = True) -> tuple[float, float] | None:
+        """
+        Diferencia de (horas cubiertas, puntaje) de aplicar los cambios (tarea, nueva persona).
+
+        None si a alguien le suben las horas por encima de su capacidad.
+        """
+        count_change: dict[str, int] = {}
+        load_change: dict[str, float] = {}
+        covered = value = 0.0
+        for task, person in changes:
+            previous = self.owner[task]
+            if previous is not None:
+                count_change[previous] = count_change.get(previous, 0) - 1
+                load_change[previous] = load_change.get(previous, 0.0) - self.hours[task]
+                covered -= self.hours[task]
+                value -= self.values[previous, task]
+            if person is not None:
+                count_change[person] = count_change.get(person, 0) + 1
+                load_change[person] = load_change.get(person, 0.0) + self.hours[task]
+                covered += self.hours[task]
+                value += self.values[person, task]
+        if check:
+            for person, change in load_change.items():
+                if change > 0 and self.load[person] + change > self.capacities[person]:
+                    return None
+        for person, change in count_change.items():
+            k = len(self.held[person])
+            value -= self._penalty(k + change) - self._penalty(k)
+        return covered, value
+
+    def apply(self, changes: list[tuple[str, str | None]], delta: tuple[float, float]):
+        for task, person in changes:
+            previous = self.owner[task]
+            if previous is not None:
+                self.load[previous] -= self.hours[task]
+                held = self.held[previous]
+                i = self.position.pop(task)
+                last = held.pop()
+                if last != task:
+                    held[i] = last
+                    self.position[last] = i
+            if person is not None:
+                self.load[person] += self.hours[task]
+                self.position[task] = len(self.held[person])
+                self.held[person].append(task)
+            self.owner[task] = person
+        self.covered += delta[0]
+        self.score += delta[1]
+
+    def repair(self) -> int:
+        """
+        Deja a cada persona dentro de su capacidad: saca sus tareas de la mas
+        chica a la mas grande hasta que entra, y pasa cada una a la persona
+        con lugar que mas valor le da (o la deja sin asignar).
+
+        Returns:
+            Tareas movidas o sacadas
+        """
+        moved = 0
+        for person, capacity in self.capacities.items():
+            for task in sorted(self.held[person], key=lambda t: self.hours[t]):
+                if self.load[person] <= capacity:
+                    break
+                options = [q for q in self.candidates[task]
+                           if q is not None and q != person
+                           and self.load[q] + self.hours[task] <= self.capacities[q]]
+                target = max(options, key=lambda q: self.values[q, task], default=None)
+                change = [(task, target)]
+                self.apply(change, self.delta(change, check=False))
+                moved += 1
+        return moved
+
+    def assignments(self) -> dict[str, str]:
+        return {task: person for task, person in self.owner.items() if person is not None}
+
+
+def _propose(search: _Search, tasks: list[str], rng: random.Random) -> list[tuple[str, str | None]]:
+    """Un cambio al azar: mover, intercambiar o cadena de expulsiones."""
+    task = rng.choice(tasks)
+    owner = search.owner[task]
+    kind = rng.random()
+    if kind < 0.3 and owner is not None:
+        # Intercambio con una tarea de otra persona que pueda tomar esta
+        person = rng.choice(search.candidates[task])
+        if person is None or person == owner or not search.held[person]:
+            return []
+        other = rng.choice(search.held[person])
+        if (owner, other) not in search.values:
+            return []
+        return [(task, person), (other, owner)]
+
+    person = rng.choice(search.candidates[task])
+    if person == owner:
+        return []
+    changes = [(task, person)]
+    moved = {task}
+    # Cadena: mientras la persona que recibe se pase de horas, expulsa una de sus tareas
+    for _ in range(EJECTION_DEPTH - 1):
+        if person is None or search.load[person] + search.hours[changes[-1][0]] <= search.capacities[person]:
+            break
+        evicted = rng.choice(search.held[person]) if search.held[person] else None
+        if evicted is None or evicted in moved:
+            break
+        person = rng.choice(search.candidates[evicted])
+        changes.append((evicted, person))
+        moved.add(evicted)
+    return changes
+
+
+def improve_assignment(assignments: Mapping[str, str], hours: Mapping[str, float],
+                       capacities: Mapping[str, float], values: Mapping[tuple[str, str], float],
+                       time_limit: float, load_penalty: float = 0.5, seed: int = 0) -> LocalSearchResult:
+    """
+    Mejora una asignacion con busqueda local hasta agotar time_limit segundos.
+
+    Objetivo: primero las horas cubiertas; a iguales horas, la suma de
+    values[persona, tarea] menos load_penalty por cada par de tareas de una
+    misma persona (la penalizacion creciente por carga del greedy).
+
+    Args:
+        assignments: Asignacion inicial {tarea: persona}; si pasa la capacidad
+            de alguien se repara antes de buscar
+        hours: {tarea: horas} de todas las tareas del proyecto
+        capacities: {persona: horas disponibles}
+        values: {(persona, tarea): valor} de los pares permitidos (los que
+            faltan, como tareas evitadas, no se asignan)
+        time_limit: Segundos maximos de busqueda
+        load_penalty: Penalizacion por par de tareas de una persona
+        seed: Semilla de los cambios al azar
+
+    Returns:
+        LocalSearchResult con la mejor asignacion vista: dentro de las
+        capacidades y, si la inicial las respetaba, con al menos sus horas
+    """
+    search = _Search(assignments, hours, capacities, values, load_penalty)
+    repaired = search.repair()
+    tasks = list(hours)
+    rng = random.Random(seed)
+    initial_hours, initial_score = search.covered, search.score
+    best_hours, best_score, best = initial_hours, initial_score, search.assignments()
+    trajectory = [(0.0, initial_hours, initial_score)]
+    start = time.perf_counter()
+    deadline = start + time_limit
+    iterations = stalled = 0
+
+    while tasks and time.perf_counter() < deadline:
+        iterations += 1
+        changes = _propose(search, tasks, rng)
+        delta = search.delta(changes) if changes else None
+        if delta is not None and not _better(0.0, 0.0, *delta):
+            search.apply(changes, delta)
+            if _better(search.covered, search.score, best_hours, best_score):
+                best_hours, best_score, best = search.covered, search.score, search.assignments()
+                trajectory.append((time.perf_counter() - start, best_hours, best_score))
+                stalled = 0
+                continue
+        stalled += 1
+        if stalled >= STALL_ITERATIONS:
+            # Perturbacion: algunos cambios factibles aunque empeoren
+            for _ in range(KICK_MOVES):
+                changes = _propose(search, tasks, rng)
+                delta = search.delta(changes) if changes else None
+                if delta is not None:
+                    search.apply(changes, delta)
+            stalled = 0
+
+    return LocalSearchResult(
+        assignments=best,
+        hours=best_hours,
+        score=best_score,
+        initial_hours=initial_hours,
+        initial_score=initial_score,
+        trajectory=trajectory,
+        iterations=iterations,
+        repaired=repaired,
+    )
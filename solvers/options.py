@@ -0,0 +1,29 @@
+"""Validadores de argumentos de linea de comandos compartidos por decide.py y shard.py."""
+
+import argparse
+
+from .schedule import load_catalog
+from .sketches import parse_percentile
+
+
+def budget_method(value: str) -> str:
+    """Valida el metodo de presupuesto: minimum, median o percentile:P."""
+    if value in ("minimum", "median"):
+        return value
+    try:
+        if parse_percentile(value) is not None:
+            return value
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    raise argparse.ArgumentTypeError(
+        f"Metodo invalido: {value} (usa minimum, median o percentile:P)"
+    )
+
+
+def task_catalog(value: str) -> str:
+    """Valida el catalogo de tareas (JSON con nombre, horas y depende_de de cada tarea)."""
+    try:
+        load_catalog(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
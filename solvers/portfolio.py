@@ -0,0 +1,397 @@
+"""
+Asignacion de un portafolio de proyectos con un equipo compartido.
+
+Todas las tareas de todos los proyectos compiten por las mismas personas, y
+cada persona tiene una sola disponibilidad_horas para el portafolio completo.
+Es un problema de asignacion generalizada: maximizar el valor total (interes y
+habilidades, como en ProyectoSolver) con capacidad en horas por persona.
+
+Se resuelve con una subasta sobre su relajacion lineal. Cada persona tiene un
+precio por hora (el multiplicador de su restriccion de capacidad); cada tarea
+puja por la persona que mas ganancia le deja (valor - precio * horas) y sube
+su precio en lo que la separa de la segunda opcion. Cuando una persona se pasa
+de sus horas suelta las pujas mas bajas, su precio sube a la ultima soltada y
+esas tareas vuelven a pujar. Los precios finales dan una cota superior
+(dual lagrangiano) del valor optimo, asi que la distancia a la cota mide que
+tan lejos del optimo quedo la asignacion.
+
+La subasta no garantiza quedar cerca del optimo entero: una tarea chica puede
+ocupar las horas que una grande aprovecharia mejor. Por eso un pase final
+prueba meter cada tarea sin asignar sacando tareas de menos valor por hora.
+Lo unico garantizado es la distancia reportada a la cota (gap).
+
+Con un estado anterior (warm start) solo pujan las tareas de los proyectos que
+cambiaron: el resto conserva persona y puja, y los precios parten de los
+anteriores.
+"""
+
+import hashlib
+import heapq
+import json
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from schemas.records import plain, to_records
+
+from .proyecto import task_skills
+from .schedule import Task
+
+# Valor de una tarea para una persona: base + interes + habilidad relevante
+VALUE_BASE = 1
+VALUE_INTEREST = 3
+VALUE_SKILL = 2
+# Incremento minimo de una puja por hora (asegura que la subasta termina)
+EPSILON = 0.01
+# Diferencias de horas o valor menores a esto son empates
+TOLERANCE = 1e-9
+
+
+def project_digest(tasks: dict[str, Task]) -> str:
+    """Huella de lo que afecta la asignacion de un proyecto (nombres, horas y habilidades)."""
+    payload = json.dumps(sorted([t.name, t.hours, sorted(t.skills)] for t in tasks.values()),
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def person_digest(participant) -> str:
+    return hashlib.sha256(json.dumps(plain(participant), sort_keys=True, ensure_ascii=False)
+                          .encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Portfolio:
+    """Asignacion del portafolio y el estado para reanudar la subasta."""
+    assignments: dict[str, dict[str, str]] = field(default_factory=dict)  # Proyecto -> {tarea: persona}
+    unassigned: dict[str, list[str]] = field(default_factory=dict)  # Proyecto -> tareas sin persona
+    hours: dict[str, float] = field(default_factory=dict)  # Persona -> horas asignadas
+    capacity: dict[str, float] = field(default_factory=dict)  # Persona -> disponibilidad_horas
+    value: float = 0.0
+    bound: float = 0.0  # Cota superior del valor optimo
+    bids: int = 0  # Pujas de esta resolucion
+    reused: int = 0  # Tareas que conservaron su persona del estado anterior
+    # Estado de la subasta (warm start)
+    prices: dict[str, float] = field(default_factory=dict)
+    held: dict[str, dict[str, list]] = field(default_factory=dict)  # Proyecto -> {tarea: [persona, puja]}
+    digests: dict[str, str] = field(default_factory=dict)  # Proyecto -> huella de sus tareas
+    people: dict[str, str] = field(default_factory=dict)  # Persona -> huella de su registro
+
+    @property
+    def gap(self) -> float:
+        """Fraccion del optimo que podria faltar (0 = optimo)."""
+        return (self.bound - self.value) / self.bound if self.bound > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "prices": self.prices,
+            "held": self.held,
+            "digests": self.digests,
+            "people": self.people,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Portfolio":
+        """Estado guardado con to_dict (solo sirve como warm start)."""
+        return cls(prices=dict(data["prices"]), held={k: dict(v) for k, v in data["held"].items()},
+                   digests=dict(data["digests"]), people=dict(data["people"]))
+
+
+class _Auction:
+    """
+    Subasta sobre tareas (proyecto, nombre) y personas indexadas.
+
+    Las tareas con el mismo nombre, horas y habilidades valen lo mismo para
+    cada persona, asi que comparten candidatos: por cada valor posible un heap
+    de (precio, persona) con entradas viejas que se descartan al leerlas. La
+    mejor persona de un valor es la mas barata, y una puja revisa a lo sumo
+    dos por valor en lugar de todo el equipo.
+    """
+
+    def __init__(self, people: list, projects: dict[str, dict[str, Task]]):
+        self.names = [p.nombre for p in people]
+        self.capacity = [p.disponibilidad_horas for p in people]
+        self.price = [0.0] * len(people)
+        self.load = [0.0] * len(people)
+        self.held: list[list] = [[] for _ in people]  # Heap de (puja, orden, tarea)
+        self.owner: dict[tuple[str, str], tuple[int, float]] = {}  # Tarea -> (persona, puja)
+        self.bids = 0
+        self._order = 0
+
+        self.tasks = {(project, name): task for project, tasks in projects.items()
+                      for name, task in tasks.items()}
+        self.kind: dict[tuple[str, str], tuple] = {}
+        self.levels: dict[tuple, list[tuple[float, list]]] = {}  # Clase -> [(valor, heap)]
+        self.memberships: list[list[list]] = [[] for _ in people]  # Persona -> heaps donde aparece
+        for key, task in self.tasks.items():
+            kind = (task.name, task.hours, frozenset(task_skills(task)))
+            self.kind[key] = kind
+            if kind not in self.levels:
+                self.levels[kind] = self._build_levels(people, task)
+        self.value = {kind: {i: value for value, heap in levels for _, i in heap}
+                      for kind, levels in self.levels.items()}
+
+    def _build_levels(self, people: list, task: Task) -> list[tuple[float, list]]:
+        skills = task_skills(task)
+        by_value: dict[float, list] = {}
+        for i, p in enumerate(people):
+            if task.name in p.tareas_evitar or task.hours > p.disponibilidad_horas:
+                continue
+            value = (VALUE_BASE + VALUE_INTEREST * (task.name in p.tareas_interes)
+                     + VALUE_SKILL * bool(skills & set(p.habilidades)))
+            by_value.setdefault(value, []).append((self.price[i], i))
+        levels = []
+        for value, heap in sorted(by_value.items(), reverse=True):
+            heapq.heapify(heap)
+            levels.append((value, heap))
+            for _, i in heap:
+                self.memberships[i].append(heap)
+        return levels
+
+    def set_price(self, i: int, price: float):
+        if price != self.price[i]:
+            self.price[i] = price
+            for heap in self.memberships[i]:
+                heapq.heappush(heap, (price, i))
+
+    def _cheapest(self, heap: list, count: int) -> list[int]:
+        """Las `count` personas mas baratas del heap (descarta entradas viejas)."""
+        found, popped = [], []
+        while heap and len(found) < count:
+            price, i = heap[0]
+            if price != self.price[i] or i in found:
+                heapq.heappop(heap)
+                continue
+            found.append(i)
+            popped.append(heapq.heappop(heap))
+        for entry in popped:
+            heapq.heappush(heap, entry)
+        return found
+
+    def best_two(self, key: tuple[str, str]) -> tuple[int | None, float, float]:
+        """(mejor persona, su ganancia, ganancia de la segunda opcion o de no asignar)."""
+        hours = self.tasks[key].hours
+        best, first, second = None, 0.0, 0.0  # Sin asignar la ganancia es 0
+        for value, heap in self.levels[self.kind[key]]:
+            if best is not None and value <= second:
+                break  # Ni gratis mejora las dos mejores opciones
+            for i in self._cheapest(heap, 2):
+                profit = value - self.price[i] * hours
+                if best is None or profit > first:
+                    if best is not None:
+                        second = max(second, first)
+                    best, first = i, profit
+                elif profit > second:
+                    second = profit
+        if best is None or first <= 0:
+            return None, 0.0, 0.0
+        return best, first, second
+
+    def place(self, key: tuple[str, str], i: int, bid: float) -> list[tuple[str, str]]:
+        """Da la tarea a la persona; devuelve las tareas que suelta por pasarse de horas."""
+        self.owner[key] = (i, bid)
+        hours = self.tasks[key].hours
+        if hours == 0:
+            return []
+        self.load[i] += hours
+        self._order += 1
+        heapq.heappush(self.held[i], (bid, self._order, key))
+        evicted = []
+        while self.load[i] > self.capacity[i]:
+            low, _, dropped = heapq.heappop(self.held[i])
+            del self.owner[dropped]
+            self.load[i] -= self.tasks[dropped].hours
+            self.set_price(i, max(self.price[i], low))
+            evicted.append(dropped)
+        return evicted
+
+    def run(self, queue: Iterable[tuple[str, str]]):
+        pending = list(queue)
+        pending.reverse()
+        while pending:
+            key = pending.pop()
+            self.bids += 1
+            i, first, second = self.best_two(key)
+            if i is None:
+                continue
+            hours = self.tasks[key].hours
+            if hours == 0:
+                self.place(key, i, 0.0)
+                continue
+            bid = self.price[i] + (first - second) / hours + EPSILON
+            pending.extend(reversed(self.place(key, i, bid)))
+
+    def _settle(self, key: tuple[str, str], i: int):
+        """Da la tarea a la persona (con lugar) pujando lo que vale por hora, lo maximo que pagaria."""
+        hours = self.tasks[key].hours
+        value = self.value[self.kind[key]][i]
+        self.place(key, i, max(self.price[i], value / hours) if hours else 0.0)
+
+    def _drop(self, key: tuple[str, str]):
+        i, _ = self.owner.pop(key)
+        self.load[i] -= self.tasks[key].hours
+        self.held[i] = [entry for entry in self.held[i] if entry[2] != key]
+        heapq.heapify(self.held[i])
+
+    def _fill(self, key: tuple[str, str]) -> int | None:
+        """Da la tarea a la persona con horas libres que mas la valora (None si nadie tiene lugar)."""
+        hours = self.tasks[key].hours
+        room = [(value, -i) for i, value in self.value[self.kind[key]].items()
+                if self.load[i] + hours <= self.capacity[i] + TOLERANCE]
+        if not room:
+            return None
+        _, i = max(room)
+        self._settle(key, -i)
+        return -i
+
+    def improve(self) -> int:
+        """
+        Pase final sobre la asignacion de la subasta: cada tarea sin asignar
+        prueba entrar a cada persona que puede tomarla, sacando sus tareas de
+        menor valor por hora hasta que entre, y se queda con el cambio que mas
+        sube el valor total. Las tareas sacadas pasan a horas libres de otros
+        si hay. Cada cambio sube el valor, asi que termina.
+
+        Returns:
+            Cambios aplicados
+        """
+        candidates = {kind: sorted(values.items(), key=lambda e: (-e[1], e[0]))
+                      for kind, values in self.value.items()}
+        owned: dict[int, tuple[list, float]] = {}  # Persona -> (tareas por valor/hora, menor valor)
+
+        def owned_by(i: int) -> tuple[list, float]:
+            if i not in owned:
+                keys = sorted((entry[2] for entry in self.held[i]),
+                              key=lambda k: (self.value[self.kind[k]][i] / self.tasks[k].hours, k))
+                owned[i] = keys, min((self.value[self.kind[k]][i] for k in keys), default=0.0)
+            return owned[i]
+
+        def by_value(keys) -> list:
+            return sorted(keys, key=lambda k: (-candidates[self.kind[k]][0][1] if candidates[self.kind[k]] else 0, k))
+
+        changes = 0
+        stuck: dict[tuple, int] = {}  # Clase -> cambios cuando no encontro mejora
+        pending = by_value(key for key in self.tasks if key not in self.owner)
+        while pending:
+            retry = []
+            for key in pending:
+                if stuck.get(self.kind[key]) == changes:
+                    continue  # Misma clase sin cambios desde que no mejoro
+                hours = self.tasks[key].hours
+                best_gain, best = TOLERANCE, None
+                for i, value in candidates[self.kind[key]]:
+                    if value <= best_gain:
+                        break  # Ni sin sacar nada supera al mejor cambio
+                    need = self.load[i] + hours - self.capacity[i]
+                    evicted, lost = [], 0.0
+                    if need > TOLERANCE:
+                        keys, cheapest = owned_by(i)
+                        if value <= cheapest:
+                            continue  # Sacar cualquier tarea cuesta al menos lo que suma esta
+                        for other in keys:
+                            if need <= TOLERANCE or value - lost <= best_gain:
+                                break
+                            evicted.append(other)
+                            lost += self.value[self.kind[other]][i]
+                            need -= self.tasks[other].hours
+                        if need > TOLERANCE:
+                            continue
+                    if value - lost > best_gain:
+                        best_gain, best = value - lost, (i, evicted)
+                if best is None:
+                    stuck[self.kind[key]] = changes
+                    continue
+                i, evicted = best
+                for other in evicted:
+                    self._drop(other)
+                self._settle(key, i)
+                owned.pop(i, None)
+                changes += 1
+                for other in evicted:
+                    j = self._fill(other)
+                    if j is None:
+                        retry.append(other)
+                    else:
+                        owned.pop(j, None)
+            pending = by_value(retry)
+        return changes
+
+    def bound(self) -> float:
+        """Dual lagrangiano con los precios actuales: sum(p * capacidad) + sum(max(0, mejor ganancia))."""
+        total = sum(p * c for p, c in zip(self.price, self.capacity))
+        best_by_kind = {}
+        for key, kind in self.kind.items():
+            if kind not in best_by_kind:
+                best_by_kind[kind] = max((self.best_two(key)[1], 0.0))
+            total += best_by_kind[kind]
+        return total
+
+
+def solve_portfolio(participants: Iterable[dict], projects: dict[str, dict[str, Task]],
+                    warm: Portfolio | None = None) -> Portfolio:
+    """
+    Asigna las tareas de todos los proyectos con las horas de cada persona compartidas.
+
+    Args:
+        participants: Equipo del portafolio (registros o dicts del esquema proyecto)
+        projects: {proyecto: {tarea: Task}} (parse_catalog / load_catalog)
+        warm: Resultado anterior: las tareas de proyectos sin cambios conservan
+            su persona si esta sigue igual, y los precios se reutilizan
+
+    Returns:
+        La asignacion, su valor, la cota superior y el estado para el proximo warm start
+
+    Raises:
+        ValueError: Si hay nombres de participantes repetidos
+        SchemaError: Si un participante no cumple el esquema proyecto
+    """
+    people = list(to_records("proyecto", participants))
+    names = [p.nombre for p in people]
+    if len(set(names)) < len(names):
+        repeated = sorted({n for n in names if names.count(n) > 1})
+        raise ValueError(f"participantes repetidos: {', '.join(repeated)}")
+
+    auction = _Auction(people, projects)
+    digests = {project: project_digest(tasks) for project, tasks in projects.items()}
+    people_digests = {p.nombre: person_digest(p) for p in people}
+    index = {name: i for i, name in enumerate(names)}
+
+    reused = 0
+    if warm is not None:
+        same = {name for name, digest in people_digests.items() if warm.people.get(name) == digest}
+        for name in same:
+            auction.set_price(index[name], warm.prices.get(name, 0.0))
+        for project, tasks in projects.items():
+            kept = warm.held.get(project, {}) if warm.digests.get(project) == digests[project] else {}
+            for task in tasks:
+                key = (project, task)
+                holder = kept.get(task)
+                if holder and holder[0] in same and index[holder[0]] in auction.value[auction.kind[key]]:
+                    auction.place(key, index[holder[0]], holder[1])
+                    reused += 1
+        # Sin las tareas que cambiaron, el precio no puede superar la puja mas baja que se conserva
+        for i, held in enumerate(auction.held):
+            auction.set_price(i, min(auction.price[i], held[0][0]) if held else 0.0)
+        queue = [key for key in auction.tasks if key not in auction.owner]
+    else:
+        queue = list(auction.tasks)
+    auction.run(queue)
+    auction.improve()
+
+    result = Portfolio(digests=digests, people=people_digests, bids=auction.bids, reused=reused)
+    for project, tasks in projects.items():
+        result.assignments[project] = {}
+        result.held[project] = {}
+        result.unassigned[project] = []
+        for task in tasks:
+            key = (project, task)
+            if key in auction.owner:
+                i, bid = auction.owner[key]
+                result.assignments[project][task] = names[i]
+                result.held[project][task] = [names[i], bid]
+                result.value += auction.value[auction.kind[key]][i]
+            else:
+                result.unassigned[project].append(task)
+    result.hours = {name: auction.load[i] for i, name in enumerate(names)}
+    result.capacity = {name: auction.capacity[i] for i, name in enumerate(names)}
+    result.prices = {name: auction.price[i] for i, name in enumerate(names)}
+    result.bound = auction.bound()
+    return result
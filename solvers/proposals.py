@@ -0,0 +1,175 @@
+"""Seleccion de propuestas alternativas diversas (MMR) para el modo iterativo."""
+
+import json
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import SolverResult
+
+
+def _value_similarity(a, b) -> float:
+    """Similitud entre dos valores de una decision (listas y dicts por Jaccard)."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        a, b = set(a.items()), set(b.items())
+    elif isinstance(a, list) and isinstance(b, list):
+        a, b = set(map(str, a)), set(map(str, b))
+    else:
+        return 1.0 if a == b else 0.0
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def decision_similarity(a: dict, b: dict, keys: list[str]) -> float:
+    """Promedio de similitud de dos decisiones sobre los campos indicados."""
+    if not keys:
+        return 1.0
+    return sum(_value_similarity(a.get(k), b.get(k)) for k in keys) / len(keys)
+
+
+def select_diverse(candidates: list["SolverResult"], k: int, diversity: float = 0.3,
+                   max_similarity: float = 0.8) -> list["SolverResult"]:
+    """
+    Elige hasta k decisiones buenas y distintas entre si (Maximal Marginal Relevance).
+
+    La primera es la de mayor confianza; cada siguiente maximiza
+    (1 - diversity) * confianza - diversity * similitud con las ya elegidas.
+    La similitud solo considera los campos que cambian entre candidatos, y
+    los casi-duplicados (similitud > max_similarity) se descartan.
+
+    Args:
+        candidates: Decisiones candidatas (las fallidas se ignoran)
+        k: Numero maximo de propuestas
+        diversity: Peso de la diversidad frente a la confianza (0-1)
+        max_similarity: Similitud maxima permitida con una propuesta ya elegida
+
+    Returns:
+        Propuestas en orden de seleccion (puede haber menos de k)
+    """
+    pool = sorted((c for c in candidates if c.success), key=lambda c: -c.confidence)
+    if not pool:
+        return []
+
+    all_keys = list(dict.fromkeys(key for c in pool for key in c.decision))
+    keys = [key for key in all_keys
+            if any(_value_similarity(c.decision.get(key), pool[0].decision.get(key)) < 1.0 for c in pool)]
+
+    selected = [pool.pop(0)]
+    max_sim = [decision_similarity(c.decision, selected[0].decision, keys) for c in pool]
+    while pool and len(selected) < k:
+        best_i, best_score = None, None
+        for i, c in enumerate(pool):
+            if max_sim[i] > max_similarity:
+                continue
+            score = (1 - diversity) * c.confidence - diversity * max_sim[i]
+            if best_score is None or score > best_score:
+                best_i, best_score = i, score
+        if best_i is None:
+            break
+
+        chosen = pool.pop(best_i)
+        max_sim.pop(best_i)
+        selected.append(chosen)
+        max_sim = [max(s, decision_similarity(c.decision, chosen.decision, keys))
+                   for s, c in zip(max_sim, pool)]
+    return selected
+
+
+def _elements(value) -> list[str]:
+    """Elementos comparables de un valor: items de dicts/listas o el valor mismo."""
+    if isinstance(value, dict):
+        return [json.dumps([k, v], ensure_ascii=False) for k, v in value.items()]
+    if isinstance(value, list):
+        return [json.dumps(v, ensure_ascii=False) for v in value]
+    return [json.dumps(value, ensure_ascii=False)]
+
+
+def vote_support(options: list[dict], ranking: list[int]) -> dict[str, dict[str, float]]:
+    """
+    Apoyo de cada valor de las opciones votadas segun su posicion en el conteo.
+
+    La opcion ganadora vale 1.0 y la ultima 0.0; un valor (o elemento de una
+    lista) toma el mejor apoyo entre las opciones que lo contienen.
+
+    Args:
+        options: Decisiones propuestas en la ronda (OPCION 1 = options[0])
+        ranking: Numeros de opcion de mejor a peor
+
+    Returns:
+        {campo: {elemento: apoyo}}
+    """
+    positions = [o for o in ranking if 1 <= o <= len(options)]
+    last = max(len(positions) - 1, 1)
+    support: dict[str, dict[str, float]] = {}
+    for pos, option_num in enumerate(positions):
+        weight = 1.0 - pos / last if len(positions) > 1 else 1.0
+        for key, value in options[option_num - 1].items():
+            field_support = support.setdefault(key, {})
+            for element in _elements(value):
+                field_support[element] = max(field_support.get(element, 0.0), weight)
+    return support
+
+
+def rerank_by_votes(candidates: list["SolverResult"], options: list[dict], ranking: list[int],
+                    vote_weight: float = 0.5, unexplored: float = 0.5) -> list["SolverResult"]:
+    """
+    Re-pondera candidatos con los votos de la ronda anterior.
+
+    La confianza pasa a ser (1 - vote_weight) * confianza + vote_weight * apoyo,
+    donde el apoyo promedia los campos que cambiaban entre opciones; los valores
+    que no se propusieron cuentan como `unexplored`. Los candidatos con un valor
+    simple que solo aparecio en la opcion perdedora se descartan.
+    """
+    if not options:
+        return candidates
+
+    support = vote_support(options, ranking)
+    keys = [key for key in support
+            if any(_value_similarity(o.get(key), options[0].get(key)) < 1.0 for o in options)]
+    if not keys:
+        return candidates
+
+    results = []
+    for c in candidates:
+        if not c.success:
+            continue
+        field_scores = []
+        lost = False
+        for key in keys:
+            value = c.decision.get(key)
+            elements = _elements(value)
+            scores = [support[key].get(e, unexplored) for e in elements]
+            if not isinstance(value, (dict, list)) and scores == [0.0]:
+                lost = True
+                break
+            field_scores.append(sum(scores) / len(scores) if scores else unexplored)
+        if lost:
+            continue
+
+        vote_score = sum(field_scores) / len(field_scores)
+        results.append(replace(
+            c,
+            confidence=(1 - vote_weight) * c.confidence + vote_weight * vote_score,
+            explanation=f"{c.explanation}\nApoyo en la votacion anterior: {vote_score:.0%}",
+        ))
+    return results
+
+
+def format_proposals(proposals: list["SolverResult"]) -> str:
+    """Formatea las propuestas como OPCION 1, OPCION 2, ... (compatible con vote.py)."""
+    blocks = []
+    for i, result in enumerate(proposals, start=1):
+        lines = [f"## OPCION {i} (confianza {int(result.confidence * 100)}%)", ""]
+        for key, value in result.decision.items():
+            if isinstance(value, dict):
+                value = ", ".join(f"{k}: {v}" for k, v in value.items())
+            elif isinstance(value, list):
+                value = ", ".join(str(v) for v in value) if value else "ninguna"
+            lines.append(f"- **{key}:** {value}")
+        notes = [line.strip() for line in result.explanation.split("\n") if line.strip()]
+        if notes:
+            lines.append("")
+            lines.append("*" + "; ".join(notes) + "*")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
@@ -1,22 +1,37 @@
 """Solver algoritmico para asignacion de tareas en proyectos."""
 
 from collections import Counter
-from .base import BaseSolver, ComplexityScore, SolverResult
-
+from collections.abc import Iterable
+from dataclasses import dataclass, field, replace
+
+from schemas.records import plain
+
+from .base import BaseSolver, ComplexityScore, PartialState, SolverResult
+from .flow import Coverage, max_coverage
+from .local_search import improve_assignment
+from .schedule import UNASSIGNED, Task, critical_path, list_schedule, load_catalog, parse_catalog
+
+
+# Catalogo predefinido: horas estimadas de cada tarea y de cuales depende
+CATALOGO_TAREAS = [
+    {"nombre": "desarrollo de API", "horas": 12, "depende_de": ["base de datos"]},
+    {"nombre": "interfaz de usuario", "horas": 10, "depende_de": []},
+    {"nombre": "base de datos", "horas": 8, "depende_de": []},
+    {"nombre": "deployment", "horas": 4, "depende_de": ["testing automatizado", "seguridad"]},
+    {"nombre": "testing automatizado", "horas": 8, "depende_de": ["desarrollo de API", "interfaz de usuario"]},
+    {"nombre": "documentacion tecnica", "horas": 5, "depende_de": ["desarrollo de API"]},
+    {"nombre": "integracion de servicios", "horas": 8, "depende_de": ["desarrollo de API"]},
+    {"nombre": "optimizacion de rendimiento", "horas": 6, "depende_de": ["integracion de servicios"]},
+    {"nombre": "seguridad", "horas": 6, "depende_de": ["desarrollo de API"]},
+    {"nombre": "code review", "horas": 4, "depende_de": ["desarrollo de API", "interfaz de usuario"]},
+]
 
 # Tareas predefinidas que esperamos asignar
-TAREAS_PROYECTO = [
-    "desarrollo de API",
-    "interfaz de usuario",
-    "base de datos",
-    "deployment",
-    "testing automatizado",
-    "documentacion tecnica",
-    "integracion de servicios",
-    "optimizacion de rendimiento",
-    "seguridad",
-    "code review"
-]
+TAREAS_PROYECTO = [t["nombre"] for t in CATALOGO_TAREAS]
+
+# Fraccion minima de las horas que debe poder cubrirse para intentar el algoritmo
+# (igual a la confianza minima: con menos, su resultado nunca se acepta)
+MIN_COVERAGE = 0.7
 
 # Mapeo de habilidades a tareas
 SKILL_TO_TASK = {
@@ -32,20 +47,140 @@ SKILL_TO_TASK = {
 }
 
 
+def task_skills(task: Task) -> set[str]:
+    """Habilidades relevantes de una tarea: las del catalogo o, si no tiene, las de SKILL_TO_TASK."""
+    return set(task.skills) or {skill for skill, tareas in SKILL_TO_TASK.items() if task.name in tareas}
+
+
+def _assignment_lines(assignments: dict[str, str], hours_by_person: Counter) -> str:
+    """Tareas y horas de cada persona (una linea por persona)."""
+    tareas_por_persona = {}
+    for tarea, nombre in assignments.items():
+        tareas_por_persona.setdefault(nombre, []).append(tarea)
+    return "\n".join(
+        f"{nombre}: {', '.join(tareas_por_persona[nombre])} ({hours_by_person[nombre]:g}h)"
+        for nombre in sorted(hours_by_person)
+    )
+
+
+def _timeline(entries) -> str:
+    """Tareas de una persona con su hora de inicio y fin ("base de datos 0-8h, ...")."""
+    return ", ".join(f"{e.task} {e.start:g}-{e.finish:g}h" for e in entries)
+
+
+def _critical_path_line(length: float, path: list[str], makespan: float) -> str:
+    line = f"Ruta critica ({length:g}h): {' -> '.join(path)}"
+    if makespan > length:
+        line += f". Con la asignacion el proyecto dura {makespan:g}h (esperas por persona ocupada)"
+    return line
+
+
+@dataclass
+class ProyectoState(PartialState):
+    """
+    Estado parcial de un shard de participantes de un proyecto.
+
+    La asignacion de tareas no se descompone por shards (cada tarea compite
+    por todo el equipo), asi que el estado conserva los registros y el
+    merge los concatena.
+    """
+    config: dict
+    participants: list[dict] = field(default_factory=list)
+
+    def merge(self, other: "ProyectoState") -> "ProyectoState":
+        self._check_config(other)
+        self.participants.extend(other.participants)
+        return self
+
+    def to_dict(self) -> dict:
+        return {"config": self.config, "participants": [plain(p) for p in self.participants]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProyectoState":
+        return cls(config=data["config"], participants=list(data["participants"]))
+
+
 class ProyectoSolver(BaseSolver):
     """Resuelve asignacion de tareas en proyectos."""
 
-    def __init__(self, matching_method: str = "greedy"):
+    decision_type = "proyecto"
+
+    def __init__(self, matching_method: str = "greedy", tasks_file: str | None = None,
+                 local_search_time: float = 0.0):
         """
         Args:
             matching_method: "greedy" (default) o "gale-shapley"
+            tasks_file: Catalogo de tareas en JSON (default: CATALOGO_TAREAS)
+            local_search_time: Segundos de busqueda local para mejorar el
+                matching (0 = sin busqueda local)
+
+        Raises:
+            ValueError: Si el catalogo no es valido
         """
         self.matching_method = matching_method
+        self.tasks_file = tasks_file
+        self.local_search_time = local_search_time
+        if tasks_file:
+            self._tasks, self.tasks_digest = load_catalog(tasks_file)
+        else:
+            self._tasks, self.tasks_digest = parse_catalog(CATALOGO_TAREAS), None
+        self._task_skills = {name: task_skills(task) for name, task in self._tasks.items()}
+
+    def _project_tasks(self, participants: list) -> list[str]:
+        """Tareas a asignar: todo el catalogo de archivo, o las primeras n + 2 del predefinido."""
+        tasks = list(self._tasks)
+        return tasks if self.tasks_file else tasks[:len(participants) + 2]
+
+    def _coverage(self, participants: list, tasks: Iterable[str]) -> Coverage:
+        """
+        Cota de las horas asignables con flujo maximo (personas x tareas).
+
+        Una persona puede tomar una tarea si no la evita y le alcanzan sus
+        horas. Las personas que pueden tomar las mismas tareas se agrupan en
+        un solo nodo con la suma de sus horas (el flujo maximo no cambia), asi
+        que la red crece con los perfiles distintos y no con el grupo.
+        """
+        demands = {name: self._tasks[name].hours for name in tasks}
+        groups: dict[frozenset, float] = {}
+        for p in participants:
+            evitar = set(p.tareas_evitar)
+            can_take = frozenset(name for name, hours in demands.items()
+                                 if name not in evitar and hours <= p.disponibilidad_horas)
+            groups[can_take] = groups.get(can_take, 0) + p.disponibilidad_horas
+        allowed = {name: [] for name in demands}
+        for i, can_take in enumerate(groups):
+            for name in can_take:
+                allowed[name].append(i)
+        return max_coverage(demands, groups.values(), allowed)
+
+    def partial(self, participants: Iterable[dict]) -> ProyectoState:
+        return ProyectoState(config=self.config(), participants=list(self.records(participants)))
+
+    def load_state(self, data: dict) -> ProyectoState:
+        return ProyectoState.from_dict(data)
+
+    def evaluate_state(self, state: ProyectoState) -> ComplexityScore:
+        return self.evaluate_complexity(state.participants)
+
+    def solve_state(self, state: ProyectoState) -> SolverResult:
+        return self.solve(state.participants)
+
+    def reweight_state(self, state: ProyectoState, participants: list[dict]) -> ProyectoState:
+        # El matching no usa pesos: duplicar participantes duplicaria asignaciones
+        return state
 
     def evaluate_complexity(self, participants: list[dict]) -> ComplexityScore:
-        """Evalua complejidad basada en cobertura de habilidades y disponibilidad."""
+        """
+        Evalua complejidad basada en cobertura de habilidades y disponibilidad.
+
+        La disponibilidad se mide con flujo maximo: si las horas no alcanzan ni
+        repartiendo tareas para cubrir MIN_COVERAGE, el algoritmo no puede dar
+        un resultado aceptable y el problema es complejo; si alcanzan para
+        todo, poca disponibilidad o muchas tareas evitadas no lo complican.
+        """
         factors = []
         score = 0.0
+        participants = list(self.records(participants))
 
         if len(participants) < 2:
             return ComplexityScore(score=0.0, factors=["Menos de 2 participantes"])
@@ -53,7 +188,7 @@ class ProyectoSolver(BaseSolver):
         # Habilidades cubiertas
         all_skills = set()
         for p in participants:
-            all_skills.update(p.get("habilidades", []))
+            all_skills.update(p.habilidades)
 
         # Necesitamos al menos habilidades basicas
         required_skills = {"frontend", "backend", "base de datos"}
@@ -62,32 +197,24 @@ class ProyectoSolver(BaseSolver):
             score += 0.2
             factors.append(f"Faltan habilidades clave: {', '.join(missing)}")
 
-        # Disponibilidad total
-        total_hours = sum(p.get("disponibilidad_horas", 0) for p in participants)
-        if total_hours < 40:
+        # Horas asignables con las disponibilidades y tareas evitadas (flujo maximo)
+        coverage = self._coverage(participants, self._project_tasks(participants))
+        if coverage.unreachable:
+            factors.append(f"Nadie puede tomar: {', '.join(coverage.unreachable)}")
+        if coverage.fraction < MIN_COVERAGE:
+            return ComplexityScore(score=1.0, factors=factors + [
+                f"Ninguna asignacion cubre mas del {coverage.fraction:.0%} de las horas de las tareas "
+                f"({coverage.covered:g}h de {coverage.demand:g}h)"
+            ])
+        if not coverage.feasible:
             score += 0.25
-            factors.append(f"Poca disponibilidad total ({total_hours}h)")
-        elif total_hours < 80:
-            score += 0.1
-            factors.append(f"Disponibilidad moderada ({total_hours}h)")
-
-        # Conflictos de preferencias (muchos evitando las mismas tareas)
-        evitar_counter = Counter()
-        for p in participants:
-            for t in p.get("tareas_evitar", []):
-                evitar_counter[t] += 1
-
-        # Si mas del 50% evita una tarea critica
-        for tarea, count in evitar_counter.items():
-            if count > len(participants) / 2:
-                score += 0.15
-                factors.append(f"Muchos evitan '{tarea}'")
-                break
+            factors.append(f"Las horas no alcanzan para todas las tareas: a lo sumo "
+                           f"{coverage.covered:g}h de {coverage.demand:g}h")
 
         # Tareas de interes muy concentradas
         interes_counter = Counter()
         for p in participants:
-            for t in p.get("tareas_interes", []):
+            for t in p.tareas_interes:
                 interes_counter[t] += 1
 
         # Si una tarea tiene demasiado interes vs otras
@@ -103,11 +230,11 @@ class ProyectoSolver(BaseSolver):
 
         return ComplexityScore(score=min(score, 1.0), factors=factors)
 
-    def _get_participant_preferences(self, participant: dict, all_tasks: list[str]) -> list[str]:
+    def _get_participant_preferences(self, participant, all_tasks: list[str]) -> list[str]:
         """Genera lista ordenada de preferencias de tareas para un participante."""
-        tareas_evitar = set(participant.get("tareas_evitar", []))
-        tareas_interes = participant.get("tareas_interes", [])
-        habilidades = set(participant.get("habilidades", []))
+        tareas_evitar = set(participant.tareas_evitar)
+        tareas_interes = participant.tareas_interes
+        habilidades = set(participant.habilidades)
 
         # Calcular score para cada tarea
         task_scores = {}
@@ -121,10 +248,8 @@ class ProyectoSolver(BaseSolver):
                 score += 10 + (len(tareas_interes) - tareas_interes.index(task))
 
             # Bonus por habilidad relevante
-            for skill, tasks in SKILL_TO_TASK.items():
-                if task in tasks and skill in habilidades:
-                    score += 5
-                    break
+            if self._task_skills.get(task, set()) & habilidades:
+                score += 5
 
             task_scores[task] = score
 
@@ -136,24 +261,21 @@ class ProyectoSolver(BaseSolver):
         participant_scores = {}
 
         for p in participants:
-            nombre = p["nombre"]
-            if task in p.get("tareas_evitar", []):
+            nombre = p.nombre
+            if task in p.tareas_evitar:
                 continue  # Skip si evita la tarea
 
             score = 0
             # Bonus por habilidad relevante
-            habilidades = set(p.get("habilidades", []))
-            for skill, tasks in SKILL_TO_TASK.items():
-                if task in tasks and skill in habilidades:
-                    score += 10
-                    break
+            if self._task_skills.get(task, set()) & set(p.habilidades):
+                score += 10
 
             # Bonus por interes
-            if task in p.get("tareas_interes", []):
+            if task in p.tareas_interes:
                 score += 5
 
             # Bonus por disponibilidad
-            score += p.get("disponibilidad_horas", 0) / 10
+            score += p.disponibilidad_horas / 10
 
             participant_scores[nombre] = score
 
@@ -170,7 +292,7 @@ class ProyectoSolver(BaseSolver):
         """
         # Construir preferencias
         participant_prefs = {
-            p["nombre"]: self._get_participant_preferences(p, tasks)
+            p.nombre: self._get_participant_preferences(p, tasks)
             for p in participants
         }
         task_prefs = {
@@ -179,13 +301,11 @@ class ProyectoSolver(BaseSolver):
         }
 
         # Estado inicial
-        free_participants = set(p["nombre"] for p in participants)
+        free_participants = set(p.nombre for p in participants)
         task_assignments = {task: None for task in tasks}  # tarea -> participante
-        participant_next_proposal = {p["nombre"]: 0 for p in participants}  # indice de siguiente propuesta
-        participant_hours = {p["nombre"]: p.get("disponibilidad_horas", 0) for p in participants}
-        participant_assigned_hours = {p["nombre"]: 0 for p in participants}
-
-        HOURS_PER_TASK = 5
+        participant_next_proposal = {p.nombre: 0 for p in participants}  # indice de siguiente propuesta
+        participant_hours = {p.nombre: p.disponibilidad_horas for p in participants}
+        participant_assigned_hours = {p.nombre: 0 for p in participants}
 
         while free_participants:
             # Tomar un participante libre
@@ -202,9 +322,10 @@ class ProyectoSolver(BaseSolver):
             # Proponer a la siguiente tarea preferida
             task = prefs[next_idx]
             participant_next_proposal[participant] = next_idx + 1
+            task_hours = self._tasks[task].hours
 
             # Verificar si tiene horas disponibles
-            if participant_assigned_hours[participant] + HOURS_PER_TASK > participant_hours[participant]:
+            if participant_assigned_hours[participant] + task_hours > participant_hours[participant]:
                 continue
 
             current_holder = task_assignments[task]
@@ -212,7 +333,7 @@ class ProyectoSolver(BaseSolver):
             if current_holder is None:
                 # Tarea libre, aceptar
                 task_assignments[task] = participant
-                participant_assigned_hours[participant] += HOURS_PER_TASK
+                participant_assigned_hours[participant] += task_hours
                 # Verificar si puede seguir proponiendo
                 if participant_assigned_hours[participant] >= participant_hours[participant]:
                     free_participants.remove(participant)
@@ -223,8 +344,8 @@ class ProyectoSolver(BaseSolver):
                     if task_pref_list.index(participant) < task_pref_list.index(current_holder):
                         # Nuevo es mejor, reemplazar
                         task_assignments[task] = participant
-                        participant_assigned_hours[current_holder] -= HOURS_PER_TASK
-                        participant_assigned_hours[participant] += HOURS_PER_TASK
+                        participant_assigned_hours[current_holder] -= task_hours
+                        participant_assigned_hours[participant] += task_hours
 
                         # El holder anterior vuelve a ser libre
                         free_participants.add(current_holder)
@@ -239,28 +360,36 @@ class ProyectoSolver(BaseSolver):
     def _greedy_matching(self, participants: list[dict], tasks: list[str]) -> dict:
         """Matching greedy original."""
         assignments = {}
-        participant_hours = {p["nombre"]: p.get("disponibilidad_horas", 0) for p in participants}
-        participant_assigned = {p["nombre"]: 0 for p in participants}
+        participant_hours = {p.nombre: p.disponibilidad_horas for p in participants}
+        participant_assigned = {p.nombre: 0 for p in participants}
 
-        skills_map = {p["nombre"]: set(p.get("habilidades", [])) for p in participants}
-        interes_map = {p["nombre"]: set(p.get("tareas_interes", [])) for p in participants}
-        evitar_map = {p["nombre"]: set(p.get("tareas_evitar", [])) for p in participants}
+        skills_map = {p.nombre: set(p.habilidades) for p in participants}
+        interes_map = {p.nombre: set(p.tareas_interes) for p in participants}
+        evitar_map = {p.nombre: set(p.tareas_evitar) for p in participants}
 
-        # Ordenar tareas por popularidad
+        task_count = Counter()
+
+        # Ordenar tareas por popularidad (solo las del proyecto, las mismas que
+        # acota el flujo maximo de la complejidad)
+        project_tasks = set(tasks)
         interes_counter = Counter()
         for p in participants:
-            for t in p.get("tareas_interes", []):
-                interes_counter[t] += 1
+            for t in p.tareas_interes:
+                if t in project_tasks:
+                    interes_counter[t] += 1
 
         tareas_ordenadas = [t for t, _ in interes_counter.most_common()] + \
                           [t for t in tasks if t not in interes_counter]
 
-        for tarea in tareas_ordenadas[:len(participants) + 2]:
+        for tarea in tareas_ordenadas:
             best_candidate = None
-            best_score = -1
+            best_score = None
+            task_skills = self._task_skills[tarea]
+            task_hours = self._tasks[tarea].hours
 
             for nombre in participant_hours:
-                if participant_assigned[nombre] >= participant_hours[nombre]:
+                # Solo candidatos a los que les alcanzan las horas para la tarea completa
+                if participant_assigned[nombre] + task_hours > participant_hours[nombre]:
                     continue
                 if tarea in evitar_map.get(nombre, set()):
                     continue
@@ -269,46 +398,107 @@ class ProyectoSolver(BaseSolver):
                 if tarea in interes_map.get(nombre, set()):
                     score += 3
 
-                for skill, tareas in SKILL_TO_TASK.items():
-                    if tarea in tareas and skill in skills_map.get(nombre, set()):
-                        score += 2
-                        break
+                if task_skills & skills_map.get(nombre, set()):
+                    score += 2
 
-                current_tasks = sum(1 for t, n in assignments.items() if n == nombre)
-                score -= current_tasks * 0.5
+                score -= task_count[nombre] * 0.5
 
-                if score > best_score:
+                if best_score is None or score > best_score:
                     best_score = score
                     best_candidate = nombre
 
             if best_candidate:
                 assignments[tarea] = best_candidate
-                participant_assigned[best_candidate] += 5
+                participant_assigned[best_candidate] += task_hours
+                task_count[best_candidate] += 1
 
         return assignments
 
+    def candidates(self, state: ProyectoState) -> list[SolverResult]:
+        """
+        La asignacion del metodo configurado y variantes que reasignan cada tarea:
+        para cada par (tarea, persona) se vuelve a resolver sin ese par (las
+        variantes sin busqueda local, para no multiplicar su tiempo).
+        """
+        participants = list(self.records(state.participants))
+        base = self.solve(participants)
+        if not base.success:
+            return []
+
+        results = [base]
+        for tarea, nombre in base.decision["Asignaciones"].items():
+            variant = [
+                replace(p, tareas_evitar=p.tareas_evitar + (tarea,)) if p.nombre == nombre else p
+                for p in participants
+            ]
+            result = self._solve(variant, 0.0)
+            if result.success:
+                result.facts.append(("Variante: {} sin {}", tarea, nombre))
+                results.append(result)
+        return results
+
+    def _improve(self, participants: list, assignments: dict, project: dict[str, Task], time_limit: float):
+        """
+        Busqueda local sobre el matching: primero las horas cubiertas (la
+        confianza) y, a iguales horas, el criterio del greedy: interes (+3),
+        habilidad (+2) y -0.5 por tarea ya asignada a la persona.
+        """
+        values = {}
+        for p in participants:
+            evitar, interes, habilidades = set(p.tareas_evitar), set(p.tareas_interes), set(p.habilidades)
+            for name in project:
+                if name not in evitar:
+                    values[p.nombre, name] = (3 * (name in interes)
+                                              + 2 * bool(self._task_skills[name] & habilidades))
+        return improve_assignment(
+            assignments,
+            hours={name: task.hours for name, task in project.items()},
+            capacities={p.nombre: p.disponibilidad_horas for p in participants},
+            values=values,
+            time_limit=time_limit,
+        )
+
     def solve(self, participants: list[dict]) -> SolverResult:
         """Resuelve la asignacion de tareas."""
+        return self._solve(participants, self.local_search_time)
+
+    def _solve(self, participants: list[dict], local_search_time: float) -> SolverResult:
+        participants = list(self.records(participants))
         if len(participants) < 2:
             return SolverResult(
                 success=False,
                 explanation="Se necesitan al menos 2 participantes"
             )
 
-        explanations = []
+        facts = []
         method_label = "Gale-Shapley" if self.matching_method == "gale-shapley" else "Greedy"
-        explanations.append(f"Metodo de matching: {method_label}")
+        facts.append(("Metodo de matching: {}", method_label))
 
         # Limitar tareas a asignar
-        tasks_to_assign = TAREAS_PROYECTO[:len(participants) + 2]
+        tasks_to_assign = self._project_tasks(participants)
 
         # Ejecutar matching segun metodo
         if self.matching_method == "gale-shapley":
             assignments = self._gale_shapley(participants, tasks_to_assign)
-            explanations.append("Matching estable (nadie prefiere intercambiar)")
+            facts.append(("Matching estable (nadie prefiere intercambiar)",))
         else:
             assignments = self._greedy_matching(participants, tasks_to_assign)
 
+        # Tareas del proyecto: las mismas para el matching, la complejidad y la confianza
+        project = {name: self._tasks[name] for name in tasks_to_assign}
+
+        search = None
+        if local_search_time > 0:
+            search = self._improve(participants, assignments, project, local_search_time)
+            if search.assignments != assignments and self.matching_method == "gale-shapley":
+                # La asignacion mejorada ya no es el matching estable
+                facts.remove(("Matching estable (nadie prefiere intercambiar)",))
+            assignments = search.assignments
+            method_label += " + busqueda local"
+            facts.append(("Busqueda local ({:g}s, {} intentos): {:g}h y puntaje {:g} -> {:g}h y puntaje {:g}",
+                          local_search_time, search.iterations, search.initial_hours, search.initial_score,
+                          search.hours, search.score))
+
         if not assignments:
             return SolverResult(
                 success=False,
@@ -318,28 +508,48 @@ class ProyectoSolver(BaseSolver):
         # Calcular horas por persona
         hours_by_person = Counter()
         for tarea, nombre in assignments.items():
-            hours_by_person[nombre] += 5
-
-        # Generar explicaciones
-        for nombre in sorted(hours_by_person.keys()):
-            tareas_asignadas = [t for t, n in assignments.items() if n == nombre]
-            explanations.append(f"{nombre}: {', '.join(tareas_asignadas)} ({hours_by_person[nombre]}h)")
-
-        # Calcular confianza
-        assigned_count = len(assignments)
-        total_possible = len(tasks_to_assign)
-        confidence = assigned_count / total_possible
+            hours_by_person[nombre] += self._tasks[tarea].hours
+
+        facts.append((_assignment_lines, assignments, hours_by_person))
+
+        # Cronograma: dependencias entre las tareas del proyecto y una tarea a la vez por persona
+        critical = critical_path(project)
+        schedule = list_schedule(project, assignments, critical)
+        timelines = schedule.timelines()
+        facts.append((_critical_path_line, critical.length, critical.path, schedule.makespan))
+        if UNASSIGNED in timelines:
+            facts.append(("Sin asignar (se programan sin persona): {}",
+                          [e.task for e in timelines[UNASSIGNED]]))
+
+        # Confianza: fraccion de las horas del proyecto asignadas; el flujo maximo
+        # acota cuanto se podia lograr
+        coverage = self._coverage(participants, project)
+        assigned_hours = sum(hours_by_person.values())
+        if not coverage.feasible:
+            facts.append(("Maximo asignable (flujo maximo): {:g}h de {:g}h", coverage.covered, coverage.demand))
+        confidence = assigned_hours / coverage.demand if coverage.demand > 0 else len(assignments) / len(project)
 
         decision = {
             "Asignaciones": {tarea: persona for tarea, persona in sorted(assignments.items())},
             "Horas por persona": dict(hours_by_person),
             "Total horas": sum(hours_by_person.values()),
+            "Duracion (horas)": schedule.makespan,
+            "Ruta critica": critical.path,
+            "Cronograma": {persona: _timeline(entries) for persona, entries in sorted(timelines.items())},
             "Metodo": method_label
         }
+        if search is not None:
+            decision["Busqueda local"] = {
+                "Horas iniciales": search.initial_hours,
+                "Horas": search.hours,
+                "Puntaje inicial": search.initial_score,
+                "Puntaje": search.score,
+                "Trayectoria": [[round(seconds, 4), hours, score] for seconds, hours, score in search.thinned()],
+            }
 
         return SolverResult(
             success=True,
             decision=decision,
             confidence=confidence,
-            explanation="\n".join(explanations)
+            facts=facts
         )
@@ -1,69 +1,203 @@
 """Solver algoritmico para reuniones sociales."""
 
 from collections import Counter
-from .base import BaseSolver, ComplexityScore, SolverResult
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from itertools import product
+from .base import BaseSolver, ComplexityScore, PartialState, SolverResult
+from .kemeny import KemenyResult, PairwiseCounts, kemeny_ranking
+from .sketches import (
+    HeavyHitters, counter_from_dict, counter_to_dict, counting_note, intersect,
+    make_counter, merge_counter,
+)
+
+
+@dataclass
+class ReunionState(PartialState):
+    """Estado parcial de un shard de participantes de una reunion."""
+    config: dict
+    n: int = 0
+    date_scores: Counter | HeavyHitters = field(default_factory=Counter)
+    hour_scores: Counter | HeavyHitters = field(default_factory=Counter)
+    lugar_scores: Counter | HeavyHitters = field(default_factory=Counter)
+    zona_counter: Counter | HeavyHitters = field(default_factory=Counter)
+    date_mentions: int = 0
+    hour_mentions: int = 0
+    common_dates: set | None = None  # None = ningun participante aun
+    common_hours: set | None = None
+    zonas: set = field(default_factory=set)
+    restrictions: set = field(default_factory=set)
+    pairwise: dict[str, PairwiseCounts] = field(default_factory=dict)  # Solo con Kemeny
+
+    def merge(self, other: "ReunionState") -> "ReunionState":
+        self._check_config(other)
+        self.n += other.n
+        merge_counter(self.date_scores, other.date_scores)
+        merge_counter(self.hour_scores, other.hour_scores)
+        merge_counter(self.lugar_scores, other.lugar_scores)
+        merge_counter(self.zona_counter, other.zona_counter)
+        self.date_mentions += other.date_mentions
+        self.hour_mentions += other.hour_mentions
+        self.common_dates = intersect(self.common_dates, other.common_dates)
+        self.common_hours = intersect(self.common_hours, other.common_hours)
+        self.zonas |= other.zonas
+        self.restrictions |= other.restrictions
+        for category, counts in other.pairwise.items():
+            self.pairwise.setdefault(category, PairwiseCounts()).merge(counts)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "config": self.config,
+            "n": self.n,
+            "date_scores": counter_to_dict(self.date_scores),
+            "hour_scores": counter_to_dict(self.hour_scores),
+            "lugar_scores": counter_to_dict(self.lugar_scores),
+            "zona_counter": counter_to_dict(self.zona_counter),
+            "date_mentions": self.date_mentions,
+            "hour_mentions": self.hour_mentions,
+            "common_dates": None if self.common_dates is None else sorted(self.common_dates),
+            "common_hours": None if self.common_hours is None else sorted(self.common_hours),
+            "zonas": sorted(self.zonas),
+            "restrictions": sorted(self.restrictions),
+            "pairwise": {category: counts.to_dict() for category, counts in self.pairwise.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReunionState":
+        return cls(
+            config=data["config"],
+            n=data["n"],
+            date_scores=counter_from_dict(data["date_scores"]),
+            hour_scores=counter_from_dict(data["hour_scores"]),
+            lugar_scores=counter_from_dict(data["lugar_scores"]),
+            zona_counter=counter_from_dict(data["zona_counter"]),
+            date_mentions=data["date_mentions"],
+            hour_mentions=data["hour_mentions"],
+            common_dates=intersect(None, data["common_dates"]),
+            common_hours=intersect(None, data["common_hours"]),
+            zonas=set(data["zonas"]),
+            restrictions=set(data["restrictions"]),
+            pairwise={category: PairwiseCounts.from_dict(counts)
+                      for category, counts in data.get("pairwise", {}).items()},
+        )
 
 
 class ReunionSolver(BaseSolver):
     """Resuelve consenso para reuniones sociales."""
 
-    def __init__(self, voting_method: str = "plurality"):
+    decision_type = "reunion"
+    monotone_complexity = True
+
+    def __init__(self, voting_method: str = "plurality", counting_method: str = "exact",
+                 counting_error: float = 0.01, kemeny_time_limit: float = 1.0):
         """
         Args:
-            voting_method: "plurality" (default) o "borda"
+            voting_method: "plurality" (default), "borda" o "kemeny"
+            counting_method: "exact" (default) o "approx" (top-k en memoria fija)
+            counting_error: Error relativo maximo del conteo aproximado
+            kemeny_time_limit: Segundos maximos de busqueda Kemeny por categoria
         """
         self.voting_method = voting_method
+        self.counting_method = counting_method
+        self.counting_error = counting_error
+        self.kemeny_time_limit = kemeny_time_limit
 
-    def _borda_count(self, participants: list[dict], field: str, subfield: str = None) -> Counter:
-        """Calcula Borda Count para un campo.
+    def _new_counter(self) -> Counter | HeavyHitters:
+        return make_counter(self.counting_method, self.counting_error)
+
+    def _add_votes(self, counter: Counter | HeavyHitters, items: list):
+        """Suma los votos de un participante segun el metodo configurado.
 
         Borda asigna puntos segun posicion en la lista de preferencias:
         - 1ra preferencia = n puntos
         - 2da preferencia = n-1 puntos
         - etc.
+        Pluralidad cuenta cada mencion como 1 voto. Kemeny tambien suma puntos
+        Borda (sirven para la confianza y para comparar con el ranking Kemeny).
         """
-        scores = Counter()
-        for p in participants:
-            if subfield:
-                items = p.get(field, {}).get(subfield, [])
-            else:
-                items = p.get(field, [])
-
+        if self.voting_method in ("borda", "kemeny"):
             n = len(items)
-            for rank, item in enumerate(items):
-                # Primer item = n puntos, segundo = n-1, etc.
-                scores[item] += n - rank
-        return scores
-
-    def _plurality_count(self, participants: list[dict], field: str, subfield: str = None) -> Counter:
-        """Conteo simple de votos (cada mencion = 1 voto)."""
-        counter = Counter()
-        for p in participants:
-            if subfield:
-                items = p.get(field, {}).get(subfield, [])
-            else:
-                items = p.get(field, [])
-            for item in items:
-                counter[item] += 1
-        return counter
-
-    def _count_votes(self, participants: list[dict], field: str, subfield: str = None) -> Counter:
-        """Cuenta votos segun el metodo configurado."""
-        if self.voting_method == "borda":
-            return self._borda_count(participants, field, subfield)
-        return self._plurality_count(participants, field, subfield)
+            counter.update({item: n - rank for rank, item in enumerate(items)})
+        else:
+            counter.update(items)
+
+    def _add_ranking(self, state: ReunionState, category: str, items: list):
+        """Con Kemeny, acumula los conteos por pares de la lista de preferencias."""
+        if self.voting_method == "kemeny" and items:
+            state.pairwise.setdefault(category, PairwiseCounts()).add(items)
+
+    def _best(self, state: ReunionState, category: str,
+              scores: Counter | HeavyHitters) -> tuple[str, int, KemenyResult | None]:
+        """Opcion ganadora de una categoria: la de mas puntos o la primera del ranking Kemeny."""
+        best, score = scores.most_common(1)[0]
+        if self.voting_method != "kemeny" or category not in state.pairwise:
+            return best, score, None
+        result = kemeny_ranking(state.pairwise[category], self.kemeny_time_limit)
+        best = result.ranking[0]
+        return best, scores.get(best, 0), result
+
+    def _top(self, state: ReunionState, category: str, scores: Counter | HeavyHitters,
+             m: int) -> list[tuple[str, int]]:
+        """Las m mejores opciones de una categoria con sus puntos (en orden Kemeny si aplica)."""
+        if self.voting_method != "kemeny" or category not in state.pairwise:
+            return scores.most_common(m)
+        ranking = kemeny_ranking(state.pairwise[category], self.kemeny_time_limit).ranking
+        return [(item, scores.get(item, 0)) for item in ranking[:m]]
+
+    def _ratio(self, score: int, mentions: int, n: int) -> float:
+        """Apoyo relativo de una opcion (Borda/Kemeny contra el maximo teorico)."""
+        if self.voting_method in ("borda", "kemeny"):
+            return score / mentions if mentions else 0
+        return score / n
+
+    def partial(self, participants: Iterable[dict]) -> ReunionState:
+        """Acumula votos, intersecciones y restricciones en una sola pasada."""
+        state = ReunionState(
+            config=self.config(),
+            date_scores=self._new_counter(),
+            hour_scores=self._new_counter(),
+            lugar_scores=self._new_counter(),
+            zona_counter=self._new_counter(),
+        )
+        for p in self.records(participants):
+            fechas = p.disponibilidad.fechas
+            horas = p.disponibilidad.horas
+            zona = p.zona
+
+            state.n += 1
+            self._add_votes(state.date_scores, fechas)
+            self._add_votes(state.hour_scores, horas)
+            self._add_votes(state.lugar_scores, p.preferencias_lugar)
+            self._add_ranking(state, "fechas", fechas)
+            self._add_ranking(state, "horas", horas)
+            self._add_ranking(state, "lugares", p.preferencias_lugar)
+            if zona:
+                state.zona_counter.update([zona])
+            state.date_mentions += len(fechas)
+            state.hour_mentions += len(horas)
+            state.common_dates = intersect(state.common_dates, fechas)
+            state.common_hours = intersect(state.common_hours, horas)
+            state.zonas.add(zona)
+            state.restrictions.update(p.restricciones_alimentarias)
+        return state
+
+    def load_state(self, data: dict) -> ReunionState:
+        return ReunionState.from_dict(data)
 
     def evaluate_complexity(self, participants: list[dict]) -> ComplexityScore:
         """Evalua complejidad basada en overlap de disponibilidad y diversidad."""
+        return self.evaluate_state(self.partial(participants))
+
+    def evaluate_state(self, state: ReunionState) -> ComplexityScore:
         factors = []
         score = 0.0
 
-        if len(participants) < 2:
+        if state.n < 2:
             return ComplexityScore(score=0.0, factors=["Menos de 2 participantes"])
 
         # Fechas comunes
-        all_dates = [set(p.get("disponibilidad", {}).get("fechas", [])) for p in participants]
-        common_dates = set.intersection(*all_dates) if all_dates else set()
+        common_dates = state.common_dates or set()
 
         if len(common_dates) == 0:
             score += 0.35
@@ -73,8 +207,7 @@ class ReunionSolver(BaseSolver):
             factors.append("Solo 1 fecha en comun")
 
         # Horas comunes
-        all_hours = [set(p.get("disponibilidad", {}).get("horas", [])) for p in participants]
-        common_hours = set.intersection(*all_hours) if all_hours else set()
+        common_hours = state.common_hours or set()
 
         if len(common_hours) == 0:
             score += 0.25
@@ -84,8 +217,7 @@ class ReunionSolver(BaseSolver):
             factors.append("Solo 1 hora en comun")
 
         # Diversidad de zonas
-        zonas = [p.get("zona", "") for p in participants]
-        unique_zonas = len(set(zonas))
+        unique_zonas = len(state.zonas)
         if unique_zonas > 4:
             score += 0.15
             factors.append(f"{unique_zonas} zonas distintas")
@@ -93,9 +225,7 @@ class ReunionSolver(BaseSolver):
             score += 0.05
 
         # Restricciones alimentarias
-        all_restrictions = set()
-        for p in participants:
-            all_restrictions.update(p.get("restricciones_alimentarias", []))
+        all_restrictions = state.restrictions
         if len(all_restrictions) > 3:
             score += 0.15
             factors.append(f"{len(all_restrictions)} restricciones alimentarias")
@@ -103,87 +233,127 @@ class ReunionSolver(BaseSolver):
             score += 0.05
 
         # Ajustar por numero de participantes
-        if len(participants) > 15:
+        if state.n > 15:
             score += 0.1
-            factors.append(f"{len(participants)} participantes (grupo grande)")
+            factors.append(f"{state.n} participantes (grupo grande)")
 
         if not factors:
             factors.append("Problema simple con buen overlap")
 
         return ComplexityScore(score=min(score, 1.0), factors=factors)
 
+    def candidates(self, state: ReunionState) -> list[SolverResult]:
+        """Combinaciones de las mejores fechas, horas, zonas y tipos de lugar."""
+        if state.n < 2 or not state.date_scores or not state.hour_scores:
+            return []
+
+        dates = self._top(state, "fechas", state.date_scores, 4)
+        hours = self._top(state, "horas", state.hour_scores, 4)
+        zonas = state.zona_counter.most_common(3) or [("Sin zona definida", 0)]
+        lugares = self._top(state, "lugares", state.lugar_scores, 2) or [("restaurante", 0)]
+        restrictions = list(state.restrictions) if state.restrictions else ["ninguna"]
+
+        results = []
+        for (date, date_score), (hour, hour_score), (zona, zona_count), (lugar, _) in product(
+                dates, hours, zonas, lugares):
+            date_ratio = self._ratio(date_score, state.date_mentions, state.n)
+            hour_ratio = self._ratio(hour_score, state.hour_mentions, state.n)
+            zona_ratio = zona_count / state.n
+            results.append(SolverResult(
+                success=True,
+                decision={
+                    "Fecha": date,
+                    "Hora": hour,
+                    "Zona": zona,
+                    "Restricciones alimentarias": restrictions,
+                    "Tipo de lugar": lugar,
+                },
+                confidence=(date_ratio + hour_ratio + zona_ratio) / 3,
+                facts=[("Apoyo: fecha {:.0%}, hora {:.0%}, zona {}/{} personas",
+                        date_ratio, hour_ratio, zona_count, state.n)],
+            ))
+        return results
+
     def solve(self, participants: list[dict]) -> SolverResult:
         """Resuelve el consenso para una reunion."""
-        if len(participants) < 2:
+        return self.solve_state(self.partial(participants))
+
+    def solve_state(self, state: ReunionState) -> SolverResult:
+        if state.n < 2:
             return SolverResult(
                 success=False,
                 explanation="Se necesitan al menos 2 participantes"
             )
 
-        explanations = []
-        method_label = "Borda" if self.voting_method == "borda" else "Pluralidad"
-        explanations.append(f"Metodo de votacion: {method_label}")
+        facts = []
+        method_label = {"borda": "Borda", "kemeny": "Kemeny-Young"}.get(self.voting_method, "Pluralidad")
+        facts.append(("Metodo de votacion: {}", method_label))
 
         # Mejor fecha
-        date_scores = self._count_votes(participants, "disponibilidad", "fechas")
+        date_scores = state.date_scores
         if not date_scores:
             return SolverResult(success=False, explanation="No hay fechas disponibles")
 
-        best_date, date_score = date_scores.most_common(1)[0]
-        max_possible = len(participants) if self.voting_method == "plurality" else None
-        if self.voting_method == "borda":
-            explanations.append(f"Fecha: {best_date} ({date_score} pts Borda)")
+        best_date, date_score, date_kemeny = self._best(state, "fechas", date_scores)
+        if date_kemeny:
+            facts.append(("Fecha: {} ({})", best_date, date_kemeny))
+        elif self.voting_method == "borda":
+            facts.append(("Fecha: {} ({} pts Borda)", best_date, date_score))
         else:
-            explanations.append(f"{date_score}/{len(participants)} participantes disponibles en {best_date}")
+            facts.append(("{}/{} participantes disponibles en {}", date_score, state.n, best_date))
 
         # Mejor hora
-        hour_scores = self._count_votes(participants, "disponibilidad", "horas")
+        hour_scores = state.hour_scores
         if not hour_scores:
             return SolverResult(success=False, explanation="No hay horas disponibles")
 
-        best_hour, hour_score = hour_scores.most_common(1)[0]
-        if self.voting_method == "borda":
-            explanations.append(f"Hora: {best_hour} ({hour_score} pts Borda)")
+        best_hour, hour_score, hour_kemeny = self._best(state, "horas", hour_scores)
+        if hour_kemeny:
+            facts.append(("Hora: {} ({})", best_hour, hour_kemeny))
+        elif self.voting_method == "borda":
+            facts.append(("Hora: {} ({} pts Borda)", best_hour, hour_score))
         else:
-            explanations.append(f"{hour_score}/{len(participants)} participantes disponibles en {best_hour}")
+            facts.append(("{}/{} participantes disponibles en {}", hour_score, state.n, best_hour))
 
         # Zona mas comun (moda - no aplica Borda porque es single-choice)
-        zonas = [p.get("zona", "") for p in participants if p.get("zona")]
-        zona_counter = Counter(zonas)
+        zona_counter = state.zona_counter
         best_zona = zona_counter.most_common(1)[0][0] if zona_counter else "Sin zona definida"
         zona_count = zona_counter.get(best_zona, 0)
-        explanations.append(f"Zona mas conveniente: {best_zona} ({zona_count} personas)")
+        facts.append(("Zona mas conveniente: {} ({} personas)", best_zona, zona_count))
 
         # Restricciones alimentarias (union de todas)
-        all_restrictions = set()
-        for p in participants:
-            all_restrictions.update(p.get("restricciones_alimentarias", []))
+        all_restrictions = state.restrictions
         if all_restrictions:
-            explanations.append(f"Menu debe considerar: {', '.join(all_restrictions)}")
+            facts.append(("Menu debe considerar: {}", all_restrictions))
 
         # Tipo de lugar
-        lugar_scores = self._count_votes(participants, "preferencias_lugar")
+        lugar_scores = state.lugar_scores
         if lugar_scores:
-            best_lugar, lugar_score = lugar_scores.most_common(1)[0]
-            if self.voting_method == "borda":
-                explanations.append(f"Tipo de lugar: {best_lugar} ({lugar_score} pts Borda)")
+            best_lugar, lugar_score, lugar_kemeny = self._best(state, "lugares", lugar_scores)
+            if lugar_kemeny:
+                facts.append(("Tipo de lugar: {} ({})", best_lugar, lugar_kemeny))
+            elif self.voting_method == "borda":
+                facts.append(("Tipo de lugar: {} ({} pts Borda)", best_lugar, lugar_score))
             else:
-                explanations.append(f"Tipo mas votado: {best_lugar}")
+                facts.append(("Tipo mas votado: {}", best_lugar))
         else:
             best_lugar = "restaurante"
 
+        facts.append((counting_note, {"fechas": date_scores, "horas": hour_scores,
+                                      "zonas": zona_counter, "lugares": lugar_scores}))
+
         # Calcular confianza
-        if self.voting_method == "borda":
+        if self.voting_method in ("borda", "kemeny"):
             # Para Borda, normalizar contra el maximo teorico
-            max_dates = sum(len(p.get("disponibilidad", {}).get("fechas", [])) for p in participants)
-            max_hours = sum(len(p.get("disponibilidad", {}).get("horas", [])) for p in participants)
+            max_dates = state.date_mentions
+            max_hours = state.hour_mentions
             date_ratio = date_score / max_dates if max_dates else 0
             hour_ratio = hour_score / max_hours if max_hours else 0
         else:
-            date_ratio = date_score / len(participants)
-            hour_ratio = hour_score / len(participants)
+            date_ratio = date_score / state.n
+            hour_ratio = hour_score / state.n
 
-        zona_ratio = zona_count / len(participants)
+        zona_ratio = zona_count / state.n
         confidence = (date_ratio + hour_ratio + zona_ratio) / 3
 
         decision = {
@@ -198,5 +368,5 @@ class ReunionSolver(BaseSolver):
             success=True,
             decision=decision,
             confidence=confidence,
-            explanation="\n".join(explanations)
+            facts=facts
         )
@@ -0,0 +1,109 @@
+"""
+Estimacion de complejidad con una muestra, para enrutar grupos muy grandes.
+
+En reunion, viaje y compra ningun factor de complejidad baja al agregar
+participantes: las fechas y productos comunes se achican, las zonas y
+restricciones se acumulan y el rango de presupuestos se abre. Por eso la
+complejidad de una muestra es una cota inferior exacta de la del grupo: si ya
+llega al umbral, el grupo va al LLM sin mirar al resto.
+
+Hacia arriba no hay cota exacta sin recorrer a todos (basta una persona sin
+la fecha comun), pero si una estadistica: si ninguno de los m participantes
+de la muestra activa un factor, con 95% de confianza lo activan menos de
+1 - 0.05^(1/m) del grupo (~3/m). Cuando esa fraccion baja de DISSENT_FRACTION
+el grupo es simple para el enrutamiento: un desacuerdo de menos del 1% no
+justifica el LLM. Si la complejidad de la muestra queda cerca del umbral, ese
+desacuerdo si podria cruzarlo y se recorre el grupo completo.
+"""
+
+import random
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from .base import BaseSolver, ComplexityScore
+
+# Con menos participantes se recorre el grupo completo (ya es rapido)
+SAMPLING_MIN_PARTICIPANTS = 10_000
+# Tamanos de muestra: se pasa al siguiente mientras la decision siga abierta
+SAMPLE_SIZES = (128, 256, 512, 1024)
+# Confianza de la cota de lo que la muestra no vio
+SAMPLE_CONFIDENCE = 0.95
+# Desacuerdos de menos de esta fraccion del grupo no cambian la ruta
+DISSENT_FRACTION = 0.01
+# Mas cerca del umbral que esto se recorre el grupo completo
+THRESHOLD_MARGIN = 0.1
+
+
+@dataclass
+class SampledComplexity(ComplexityScore):
+    """Complejidad de una muestra, cota inferior exacta de la del grupo completo."""
+    sample_size: int = 0
+    population: int = 0
+    unseen: float = 1.0  # Fraccion maxima del grupo que activa un factor no visto (con la confianza)
+
+    def to_dict(self) -> dict:
+        return {
+            **super().to_dict(),
+            "sample_size": self.sample_size,
+            "population": self.population,
+            "unseen_fraction": self.unseen,
+        }
+
+
+def unseen_fraction(sample_size: int, confidence: float = SAMPLE_CONFIDENCE) -> float:
+    """
+    Cota superior de la fraccion del grupo con una caracteristica que no
+    aparecio en ninguno de sample_size participantes al azar (Clopper-Pearson
+    con 0 casos).
+    """
+    return 1 - (1 - confidence) ** (1 / sample_size)
+
+
+def estimate_complexity(solver: BaseSolver, participants: Sequence[dict], threshold: float,
+                        confidence: float = SAMPLE_CONFIDENCE, seed: int = 0) -> ComplexityScore:
+    """
+    Complejidad para decidir la ruta (algoritmo o LLM) con costo acotado.
+
+    Con grupos de SAMPLING_MIN_PARTICIPANTS o mas y un solver de factores
+    monotonos se evalua una muestra uniforme (indices al azar: el costo no
+    depende del tamano del grupo) y se agranda hasta que la ruta queda decidida.
+
+    Args:
+        solver: Solver del tipo (puede estar envuelto en CachedSolver)
+        participants: Participantes del grupo
+        threshold: Umbral de complejidad para usar LLM
+        confidence: Confianza de la cota de lo no visto
+        seed: Semilla de la muestra (la misma ruta para los mismos datos)
+
+    Returns:
+        SampledComplexity si la muestra alcanzo para decidir; si no, la
+        complejidad exacta del grupo completo
+    """
+    population = len(participants)
+    if not solver.monotone_complexity or population < SAMPLING_MIN_PARTICIPANTS:
+        return solver.evaluate_complexity(participants)
+
+    rng = random.Random(seed)
+    sample = [participants[i] for i in rng.sample(range(population), SAMPLE_SIZES[-1])]
+    for size in SAMPLE_SIZES:
+        state = solver.partial(sample[:size])
+        # El tamano del grupo se conoce exacto: los factores que dependen de el
+        # (ej. "grupo grande") no se estiman
+        state.n = population
+        complexity = solver.evaluate_state(state)
+        unseen = unseen_fraction(size, confidence)
+        settled = complexity.score >= threshold or (
+            unseen <= DISSENT_FRACTION and threshold - complexity.score > THRESHOLD_MARGIN
+        )
+        if settled:
+            return SampledComplexity(
+                score=complexity.score,
+                factors=complexity.factors + [
+                    f"Estimada con una muestra de {size} de {population} participantes "
+                    f"(factores no vistos: menos del {unseen:.1%} del grupo)"
+                ],
+                sample_size=size,
+                population=population,
+                unseen=unseen,
+            )
+    return solver.evaluate_complexity(participants)
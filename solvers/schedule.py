@@ -0,0 +1,243 @@
+"""
+Cronograma de un proyecto: catalogo de tareas con dependencias (DAG), ruta
+critica y list scheduling de las personas asignadas.
+
+Cada tarea tiene horas estimadas y las tareas de las que depende. La ruta
+critica (pasadas hacia adelante y hacia atras en orden topologico) da el
+minimo que puede durar el proyecto y la holgura de cada tarea. El list
+scheduling simula el proyecto con una cola de eventos: cuando una persona
+queda libre toma, de sus tareas listas, la de menor inicio mas tardio (la de
+menos holgura). Todo es O((tareas + dependencias) log tareas).
+"""
+
+import hashlib
+import heapq
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Persona de las tareas que quedaron sin asignar (se programan sin esperar a nadie)
+UNASSIGNED = "Sin asignar"
+
+
+@dataclass(frozen=True)
+class Task:
+    """Tarea del catalogo."""
+    name: str
+    hours: float
+    depends_on: tuple[str, ...] = ()
+    skills: tuple[str, ...] = ()  # Habilidades relevantes para la tarea
+
+
+def parse_catalog(items: list[dict]) -> dict[str, Task]:
+    """
+    Catalogo a partir de su JSON: [{"nombre", "horas", "depende_de", "habilidades"}].
+
+    Raises:
+        ValueError: Si falta un campo, hay nombres repetidos, una dependencia
+            desconocida o un ciclo
+    """
+    tasks = {}
+    for i, item in enumerate(items, start=1):
+        try:
+            name, hours = item["nombre"], item["horas"]
+        except (KeyError, TypeError):
+            raise ValueError(f"tarea {i}: se necesitan 'nombre' y 'horas'") from None
+        if isinstance(hours, bool) or not isinstance(hours, (int, float)) or hours < 0:
+            raise ValueError(f"tarea '{name}': 'horas' debe ser un numero >= 0")
+        if name in tasks:
+            raise ValueError(f"tarea '{name}' repetida")
+        tasks[name] = Task(name, hours, tuple(item.get("depende_de", ())),
+                           tuple(item.get("habilidades", ())))
+    for task in tasks.values():
+        unknown = [d for d in task.depends_on if d not in tasks]
+        if unknown:
+            raise ValueError(f"tarea '{task.name}' depende de tareas que no existen: {', '.join(unknown)}")
+    topological_order(tasks)
+    return tasks
+
+
+def load_catalog(path: str | Path) -> tuple[dict[str, Task], str]:
+    """
+    Lee un catalogo de tareas en JSON.
+
+    Returns:
+        (tareas, huella del contenido del archivo)
+
+    Raises:
+        ValueError: Si el archivo no es un catalogo valido
+    """
+    path = Path(path)
+    try:
+        content = path.read_bytes()
+        items = json.loads(content)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path}: {e}") from None
+    if not isinstance(items, list):
+        raise ValueError(f"{path}: se esperaba una lista de tareas")
+    try:
+        tasks = parse_catalog(items)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    return tasks, hashlib.sha256(content).hexdigest()[:16]
+
+
+def topological_order(tasks: dict[str, Task]) -> list[str]:
+    """
+    Tareas en un orden que respeta las dependencias (Kahn, estable con el catalogo).
+
+    Las dependencias a tareas fuera de `tasks` se ignoran.
+
+    Raises:
+        ValueError: Si las dependencias forman un ciclo
+    """
+    pending = {name: sum(1 for d in task.depends_on if d in tasks) for name, task in tasks.items()}
+    successors = _successors(tasks)
+    queue = deque(name for name, count in pending.items() if count == 0)
+    order = []
+    while queue:
+        name = queue.popleft()
+        order.append(name)
+        for succ in successors[name]:
+            pending[succ] -= 1
+            if pending[succ] == 0:
+                queue.append(succ)
+    if len(order) < len(tasks):
+        cycle = sorted(name for name, count in pending.items() if count > 0)
+        raise ValueError(f"dependencias ciclicas entre: {', '.join(cycle[:5])}"
+                         + (" ..." if len(cycle) > 5 else ""))
+    return order
+
+
+def _successors(tasks: dict[str, Task]) -> dict[str, list[str]]:
+    successors = {name: [] for name in tasks}
+    for name, task in tasks.items():
+        for dep in task.depends_on:
+            if dep in tasks:
+                successors[dep].append(name)
+    return successors
+
+
+@dataclass
+class CriticalPath:
+    """Ruta critica: duracion minima del proyecto y holgura de cada tarea."""
+    length: float
+    path: list[str]
+    earliest_start: dict[str, float]
+    latest_start: dict[str, float]
+
+    def slack(self, name: str) -> float:
+        return self.latest_start[name] - self.earliest_start[name]
+
+
+def critical_path(tasks: dict[str, Task]) -> CriticalPath:
+    """Ruta critica del DAG (personas ilimitadas)."""
+    order = topological_order(tasks)
+    successors = _successors(tasks)
+
+    earliest = {}
+    for name in order:
+        earliest[name] = max((earliest[d] + tasks[d].hours for d in tasks[name].depends_on if d in tasks),
+                             default=0)
+    length = max((earliest[n] + tasks[n].hours for n in order), default=0)
+
+    latest = {}
+    for name in reversed(order):
+        finish = min((latest[s] for s in successors[name]), default=length)
+        latest[name] = finish - tasks[name].hours
+
+    # De la tarea que termina ultima hacia atras, por predecesores sin holgura
+    path = []
+    current = max(order, key=lambda n: earliest[n] + tasks[n].hours, default=None)
+    while current is not None:
+        path.append(current)
+        current = next((d for d in tasks[current].depends_on
+                        if d in tasks and earliest[d] + tasks[d].hours == earliest[current]), None)
+    path.reverse()
+    return CriticalPath(length, path, earliest, latest)
+
+
+@dataclass
+class ScheduledTask:
+    task: str
+    person: str
+    start: float
+    finish: float
+
+
+@dataclass
+class Schedule:
+    """Cronograma: cuando hace cada persona cada tarea."""
+    entries: list[ScheduledTask] = field(default_factory=list)
+    makespan: float = 0.0
+
+    def timelines(self) -> dict[str, list[ScheduledTask]]:
+        """Tareas de cada persona en orden de inicio."""
+        timelines = {}
+        for entry in sorted(self.entries, key=lambda e: (e.start, e.task)):
+            timelines.setdefault(entry.person, []).append(entry)
+        return timelines
+
+
+def list_schedule(tasks: dict[str, Task], assignments: dict[str, str],
+                  critical: CriticalPath | None = None) -> Schedule:
+    """
+    Programa las tareas respetando dependencias y que cada persona hace una a la vez.
+
+    Args:
+        tasks: Tareas del proyecto (dependencias fuera de este dict se ignoran)
+        assignments: {tarea: persona}; las tareas sin persona se programan en
+            paralelo apenas estan listas, como UNASSIGNED
+        critical: Ruta critica de `tasks` (se calcula si no se pasa)
+
+    Returns:
+        El cronograma; su makespan es >= critical.length
+    """
+    critical = critical or critical_path(tasks)
+    successors = _successors(tasks)
+    pending = {name: sum(1 for d in task.depends_on if d in tasks) for name, task in tasks.items()}
+
+    ready: dict[str, list] = {}  # Persona -> heap de (inicio mas tardio, tarea)
+    busy = set()
+    events = []  # Heap de (fin, tarea)
+    schedule = Schedule()
+
+    def release(name: str):
+        person = assignments.get(name, UNASSIGNED)
+        heapq.heappush(ready.setdefault(person, []), (critical.latest_start[name], name))
+        return person
+
+    def dispatch(person: str, now: float):
+        queue = ready.get(person)
+        while queue and person not in busy:
+            _, name = heapq.heappop(queue)
+            finish = now + tasks[name].hours
+            schedule.entries.append(ScheduledTask(name, person, now, finish))
+            heapq.heappush(events, (finish, name))
+            if person != UNASSIGNED:
+                busy.add(person)
+
+    for name, count in pending.items():
+        if count == 0:
+            release(name)
+    for person in list(ready):
+        dispatch(person, 0)
+
+    while events:
+        now = events[0][0]
+        touched = set()
+        # Todas las tareas que terminan ahora, antes de asignar las siguientes
+        while events and events[0][0] == now:
+            _, name = heapq.heappop(events)
+            person = assignments.get(name, UNASSIGNED)
+            busy.discard(person)
+            touched.add(person)
+            for succ in successors[name]:
+                pending[succ] -= 1
+                if pending[succ] == 0:
+                    touched.add(release(succ))
+        for person in sorted(touched):
+            dispatch(person, now)
+        schedule.makespan = now
+    return schedule
@@ -0,0 +1,441 @@
+"""Estructuras compactas (sketches) para agregar preferencias sin guardar todos los valores."""
+
+import hashlib
+import heapq
+import math
+from collections import Counter
+
+
+def parse_percentile(method: str) -> float | None:
+    """
+    Extrae P de un metodo "percentile:P".
+
+    Returns:
+        El percentil (0-100) o None si el metodo no es de percentil
+
+    Raises:
+        ValueError: Si P no es un numero entre 0 y 100
+    """
+    if not method.startswith("percentile:"):
+        return None
+    raw = method.split(":", 1)[1]
+    try:
+        percentile = float(raw)
+    except ValueError:
+        raise ValueError(f"Percentil invalido: {raw}") from None
+    if not 0 <= percentile <= 100:
+        raise ValueError(f"El percentil debe estar entre 0 y 100: {raw}")
+    return percentile
+
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles estilo KLL, combinable entre shards.
+
+    Mantiene una pila de compactores: el nivel h guarda valores con peso 2^h.
+    Cuando el sketch excede su capacidad, el nivel mas bajo lleno se ordena y
+    se promueve uno de cada dos valores al nivel siguiente. Mientras no haya
+    compactado nada (grupos de hasta k valores) las respuestas son exactas.
+    """
+
+    def __init__(self, k: int = 200):
+        """
+        Args:
+            k: Capacidad del nivel superior. Error de rango ~ 2.3/k^0.97
+        """
+        if k < 8:
+            raise ValueError("k debe ser al menos 8")
+        self.k = k
+        self.levels: list[list[float]] = [[]]
+        self.parity: list[int] = [0]  # Alterna el offset de compactacion por nivel
+        self.count = 0
+        self.min_value: float | None = None
+        self.max_value: float | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def is_exact(self) -> bool:
+        """True si el sketch aun conserva todos los valores."""
+        return len(self.levels) == 1
+
+    def rank_error(self) -> float:
+        """Error normalizado de rango esperado (0 si es exacto)."""
+        if self.is_exact:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _size(self) -> int:
+        return sum(len(level) for level in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def add(self, value: float):
+        """Agrega un valor al sketch."""
+        self.count += 1
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+        self.levels[0].append(value)
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        """Compacta niveles hasta respetar la capacidad total."""
+        while self._size() > self._max_size() or len(self.levels[0]) >= self._capacity(0):
+            for h, level in enumerate(self.levels):
+                if len(level) >= self._capacity(h):
+                    break
+            else:
+                return
+
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+                self.parity.append(0)
+
+            level.sort()
+            # Si hay un numero impar de valores, el ultimo se queda en su nivel
+            keep = [level.pop()] if len(level) % 2 else []
+            offset = self.parity[h]
+            self.parity[h] ^= 1
+            self.levels[h + 1].extend(level[offset::2])
+            self.levels[h] = keep
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Combina otro sketch en este (in-place). La operacion es asociativa."""
+        if other.k != self.k:
+            raise ValueError(f"No se pueden combinar sketches con k distinto ({self.k} vs {other.k})")
+        if other.count == 0:
+            return self
+
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+            self.parity.append(0)
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+
+        self.count += other.count
+        if self.min_value is None or other.min_value < self.min_value:
+            self.min_value = other.min_value
+        if self.max_value is None or other.max_value > self.max_value:
+            self.max_value = other.max_value
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """
+        Estima el cuantil q (0.0 - 1.0).
+
+        Si el sketch es exacto interpola linealmente entre los valores vecinos,
+        de modo que quantile(0.5) coincide con statistics.median.
+        """
+        if self.count == 0:
+            raise ValueError("Sketch vacio")
+        if q <= 0:
+            return self.min_value
+        if q >= 1:
+            return self.max_value
+
+        if self.is_exact:
+            values = sorted(self.levels[0])
+            pos = q * (len(values) - 1)
+            lo = math.floor(pos)
+            hi = min(lo + 1, len(values) - 1)
+            return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+        weighted = sorted(
+            (value, 1 << h)
+            for h, level in enumerate(self.levels)
+            for value in level
+        )
+        total = sum(w for _, w in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max_value
+
+    def to_dict(self) -> dict:
+        """Serializa el sketch a un dict compatible con JSON."""
+        return {
+            "k": self.k,
+            "count": self.count,
+            "min": self.min_value,
+            "max": self.max_value,
+            "levels": self.levels,
+            "parity": self.parity,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        """Reconstruye un sketch serializado con to_dict."""
+        sketch = cls(k=data["k"])
+        sketch.count = data["count"]
+        sketch.min_value = data["min"]
+        sketch.max_value = data["max"]
+        sketch.levels = [list(level) for level in data["levels"]]
+        sketch.parity = list(data["parity"])
+        return sketch
+
+
+def _hash64(item) -> int:
+    """Hash estable entre procesos (hash() de str cambia con PYTHONHASHSEED)."""
+    digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class CountMinSketch:
+    """
+    Sketch Count-Min: estima frecuencias con memoria fija.
+
+    Nunca subestima; con probabilidad 1 - delta sobreestima a lo mas
+    epsilon * total.
+    """
+
+    def __init__(self, epsilon: float = 0.01, delta: float = 0.01):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon y delta deben estar entre 0 y 1")
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = [[0] * self.width for _ in range(self.depth)]
+        self.total = 0
+
+    def _columns(self, item) -> list[int]:
+        # Doble hashing: h1 + i*h2 simula depth funciones independientes
+        h = _hash64(item)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item, weight: int = 1):
+        self.total += weight
+        for row, col in zip(self.table, self._columns(item)):
+            row[col] += weight
+
+    def estimate(self, item) -> int:
+        return min(row[col] for row, col in zip(self.table, self._columns(item)))
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("No se pueden combinar sketches Count-Min de distinto tamano")
+        for row, other_row in zip(self.table, other.table):
+            for col, value in enumerate(other_row):
+                row[col] += value
+        self.total += other.total
+        return self
+
+    def to_dict(self) -> dict:
+        return {"epsilon": self.epsilon, "delta": self.delta, "total": self.total, "table": self.table}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CountMinSketch":
+        sketch = cls(epsilon=data["epsilon"], delta=data["delta"])
+        sketch.total = data["total"]
+        sketch.table = [list(row) for row in data["table"]]
+        return sketch
+
+
+class HeavyHitters:
+    """
+    Conteo aproximado de las opciones mas frecuentes en memoria fija.
+
+    Space-Saving mantiene ceil(1/epsilon) candidatos y garantiza que cualquier
+    opcion con mas de epsilon * total votos esta entre ellos. Cada conteo es
+    una sobreestimacion; se acota ademas con un Count-Min y se reporta el
+    minimo de ambas estimaciones.
+
+    Imita la interfaz de Counter que usan los solvers (update, most_common,
+    get), asi que puede reemplazarlo directamente.
+    """
+
+    def __init__(self, epsilon: float = 0.01, delta: float = 0.01):
+        """
+        Args:
+            epsilon: Error maximo relativo al total de votos
+            delta: Probabilidad de exceder el error en Count-Min
+        """
+        self.epsilon = epsilon
+        self.delta = delta
+        self.capacity = math.ceil(1 / epsilon)
+        self.counts: dict = {}
+        self.errors: dict = {}
+        self.total = 0
+        self.cms = CountMinSketch(epsilon, delta)
+        self._heap: list = []  # (conteo, seq, item) con entradas obsoletas perezosas
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _push(self, item):
+        self._seq += 1
+        heapq.heappush(self._heap, (self.counts[item], self._seq, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i, item) for i, (item, c) in enumerate(self.counts.items())]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """Saca el candidato con menor conteo, descartando entradas obsoletas."""
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def add(self, item, weight: int = 1):
+        """Agrega weight votos a item."""
+        self.total += weight
+        self.cms.add(item, weight)
+
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+        else:
+            evicted, min_count = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = min_count + weight
+            self.errors[item] = min_count
+        self._push(item)
+
+    def update(self, items):
+        """Como Counter.update: acepta un iterable de opciones o un mapping opcion -> peso."""
+        if hasattr(items, "items"):
+            for item, weight in items.items():
+                self.add(item, weight)
+        else:
+            for item in items:
+                self.add(item)
+
+    def get(self, item, default: int = 0) -> int:
+        if item not in self.counts:
+            return default
+        return min(self.counts[item], self.cms.estimate(item))
+
+    def most_common(self, n: int | None = None) -> list[tuple]:
+        """Candidatos ordenados por conteo estimado (sobreestimado a lo mas error_bound())."""
+        estimates = [(item, self.get(item)) for item in self.counts]
+        estimates.sort(key=lambda pair: (-pair[1], str(pair[0])))
+        return estimates if n is None else estimates[:n]
+
+    def error_bound(self) -> int:
+        """Error absoluto maximo de cualquier conteo reportado."""
+        return math.ceil(self.total / self.capacity)
+
+    def _min_count(self) -> int:
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        """
+        Combina otro resumen (in-place).
+
+        Una opcion ausente en un resumen lleno pudo tener hasta su conteo
+        minimo, que se suma como cota superior y como error.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("No se pueden combinar resumenes con distinto epsilon")
+        min_self, min_other = self._min_count(), other._min_count()
+        merged = {}
+        for item in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(item, min_self) + other.counts.get(item, min_other)
+            error = self.errors.get(item, min_self) + other.errors.get(item, min_other)
+            merged[item] = (count, error)
+
+        top = sorted(merged.items(), key=lambda kv: (-kv[1][0], str(kv[0])))[:self.capacity]
+        self.counts = {item: count for item, (count, _) in top}
+        self.errors = {item: error for item, (_, error) in top}
+        self.total += other.total
+        self.cms.merge(other.cms)
+        self._heap = [(c, i, item) for i, (item, c) in enumerate(self.counts.items())]
+        heapq.heapify(self._heap)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "epsilon": self.epsilon,
+            "delta": self.delta,
+            "total": self.total,
+            "counts": [[item, count, self.errors[item]] for item, count in self.counts.items()],
+            "cms": self.cms.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HeavyHitters":
+        hh = cls(epsilon=data["epsilon"], delta=data["delta"])
+        hh.total = data["total"]
+        for item, count, error in data["counts"]:
+            hh.counts[item] = count
+            hh.errors[item] = error
+        hh.cms = CountMinSketch.from_dict(data["cms"])
+        hh._heap = [(c, i, item) for i, (item, c) in enumerate(hh.counts.items())]
+        heapq.heapify(hh._heap)
+        return hh
+
+
+def make_counter(method: str = "exact", epsilon: float = 0.01) -> Counter | HeavyHitters:
+    """
+    Crea el contador de votos segun el metodo de conteo.
+
+    Args:
+        method: "exact" (Counter) o "approx" (HeavyHitters en memoria fija)
+        epsilon: Error relativo maximo para el modo aproximado
+    """
+    if method == "approx":
+        return HeavyHitters(epsilon=epsilon)
+    return Counter()
+
+
+def counting_note(counters: dict) -> str | None:
+    """Describe las garantias de error de los contadores aproximados, si los hay."""
+    bounds = [
+        f"{name} +/-{counter.error_bound()}"
+        for name, counter in counters.items()
+        if isinstance(counter, HeavyHitters)
+    ]
+    if not bounds:
+        return None
+    first = next(c for c in counters.values() if isinstance(c, HeavyHitters))
+    return (f"Conteo aproximado (Space-Saving + Count-Min, eps={first.epsilon:g}, "
+            f"confianza {1 - first.delta:.0%}): {', '.join(bounds)}")
+
+
+def merge_counter(counter: Counter | HeavyHitters, other: Counter | HeavyHitters):
+    """Suma los votos de other en counter (in-place)."""
+    if isinstance(counter, HeavyHitters):
+        counter.merge(other)
+    else:
+        counter.update(other)
+
+
+def counter_to_dict(counter: Counter | HeavyHitters) -> dict:
+    """Serializa un contador exacto o aproximado."""
+    if isinstance(counter, HeavyHitters):
+        return {"approx": counter.to_dict()}
+    return {"exact": [[item, count] for item, count in counter.items()]}
+
+
+def counter_from_dict(data: dict) -> Counter | HeavyHitters:
+    """Reconstruye un contador serializado con counter_to_dict."""
+    if "approx" in data:
+        return HeavyHitters.from_dict(data["approx"])
+    return Counter({item: count for item, count in data["exact"]})
+
+
+def intersect(common: set | None, items) -> set | None:
+    """Interseccion acumulada; None representa el neutro (ningun participante aun)."""
+    if items is None:
+        return common
+    if common is None:
+        return set(items)
+    return common.intersection(items)
@@ -1,72 +1,215 @@
 """Solver algoritmico para viajes grupales."""
 
 from collections import Counter
-from statistics import median
-from .base import BaseSolver, ComplexityScore, SolverResult
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from itertools import product
+from .base import BaseSolver, ComplexityScore, PartialState, SolverResult
+from .kemeny import KemenyResult, PairwiseCounts, kemeny_ranking
+from .sketches import (
+    HeavyHitters, QuantileSketch, counter_from_dict, counter_to_dict, counting_note,
+    intersect, make_counter, merge_counter, parse_percentile,
+)
+
+
+@dataclass
+class ViajeState(PartialState):
+    """Estado parcial de un shard de participantes de un viaje."""
+    config: dict
+    n: int = 0
+    date_scores: Counter | HeavyHitters = field(default_factory=Counter)
+    destino_scores: Counter | HeavyHitters = field(default_factory=Counter)
+    actividad_scores: Counter | HeavyHitters = field(default_factory=Counter)
+    duracion_counter: Counter = field(default_factory=Counter)
+    date_mentions: int = 0
+    destino_mentions: int = 0
+    budgets: QuantileSketch = field(default_factory=QuantileSketch)
+    common_dates: set | None = None  # None = ningun participante aun
+    common_destinos: set | None = None
+    restrictions: set = field(default_factory=set)
+    pairwise: dict[str, PairwiseCounts] = field(default_factory=dict)  # Solo con Kemeny
+
+    def merge(self, other: "ViajeState") -> "ViajeState":
+        self._check_config(other)
+        self.n += other.n
+        merge_counter(self.date_scores, other.date_scores)
+        merge_counter(self.destino_scores, other.destino_scores)
+        merge_counter(self.actividad_scores, other.actividad_scores)
+        self.duracion_counter.update(other.duracion_counter)
+        self.date_mentions += other.date_mentions
+        self.destino_mentions += other.destino_mentions
+        self.budgets.merge(other.budgets)
+        self.common_dates = intersect(self.common_dates, other.common_dates)
+        self.common_destinos = intersect(self.common_destinos, other.common_destinos)
+        self.restrictions |= other.restrictions
+        for category, counts in other.pairwise.items():
+            self.pairwise.setdefault(category, PairwiseCounts()).merge(counts)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "config": self.config,
+            "n": self.n,
+            "date_scores": counter_to_dict(self.date_scores),
+            "destino_scores": counter_to_dict(self.destino_scores),
+            "actividad_scores": counter_to_dict(self.actividad_scores),
+            "duracion_counter": counter_to_dict(self.duracion_counter),
+            "date_mentions": self.date_mentions,
+            "destino_mentions": self.destino_mentions,
+            "budgets": self.budgets.to_dict(),
+            "common_dates": None if self.common_dates is None else sorted(self.common_dates),
+            "common_destinos": None if self.common_destinos is None else sorted(self.common_destinos),
+            "restrictions": sorted(self.restrictions),
+            "pairwise": {category: counts.to_dict() for category, counts in self.pairwise.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ViajeState":
+        return cls(
+            config=data["config"],
+            n=data["n"],
+            date_scores=counter_from_dict(data["date_scores"]),
+            destino_scores=counter_from_dict(data["destino_scores"]),
+            actividad_scores=counter_from_dict(data["actividad_scores"]),
+            duracion_counter=counter_from_dict(data["duracion_counter"]),
+            date_mentions=data["date_mentions"],
+            destino_mentions=data["destino_mentions"],
+            budgets=QuantileSketch.from_dict(data["budgets"]),
+            common_dates=intersect(None, data["common_dates"]),
+            common_destinos=intersect(None, data["common_destinos"]),
+            restrictions=set(data["restrictions"]),
+            pairwise={category: PairwiseCounts.from_dict(counts)
+                      for category, counts in data.get("pairwise", {}).items()},
+        )
 
 
 class ViajeSolver(BaseSolver):
     """Resuelve consenso para viajes grupales."""
 
-    def __init__(self, voting_method: str = "plurality", budget_method: str = "minimum"):
+    decision_type = "viaje"
+    monotone_complexity = True
+
+    def __init__(self, voting_method: str = "plurality", budget_method: str = "minimum",
+                 counting_method: str = "exact", counting_error: float = 0.01,
+                 kemeny_time_limit: float = 1.0):
         """
         Args:
-            voting_method: "plurality" (default) o "borda"
-            budget_method: "minimum" (default) o "median"
+            voting_method: "plurality" (default), "borda" o "kemeny"
+            budget_method: "minimum" (default), "median" o "percentile:P"
+            counting_method: "exact" (default) o "approx" (top-k en memoria fija)
+            counting_error: Error relativo maximo del conteo aproximado
+            kemeny_time_limit: Segundos maximos de busqueda Kemeny por categoria
         """
         self.voting_method = voting_method
         self.budget_method = budget_method
+        self.counting_method = counting_method
+        self.counting_error = counting_error
+        self.kemeny_time_limit = kemeny_time_limit
 
-    def _borda_count(self, participants: list[dict], field: str) -> Counter:
-        """Calcula Borda Count para un campo de lista."""
-        scores = Counter()
-        for p in participants:
-            items = p.get(field, [])
+    def _new_counter(self) -> Counter | HeavyHitters:
+        return make_counter(self.counting_method, self.counting_error)
+
+    def _add_votes(self, counter: Counter | HeavyHitters, items: list):
+        """Suma los votos de un participante: Borda (n, n-1, ...; tambien con Kemeny) o 1 por mencion."""
+        if self.voting_method in ("borda", "kemeny"):
             n = len(items)
-            for rank, item in enumerate(items):
-                scores[item] += n - rank
-        return scores
-
-    def _plurality_count(self, participants: list[dict], field: str) -> Counter:
-        """Conteo simple de votos."""
-        counter = Counter()
-        for p in participants:
-            for item in p.get(field, []):
-                counter[item] += 1
-        return counter
-
-    def _count_votes(self, participants: list[dict], field: str) -> Counter:
-        """Cuenta votos segun el metodo configurado."""
-        if self.voting_method == "borda":
-            return self._borda_count(participants, field)
-        return self._plurality_count(participants, field)
-
-    def _calculate_budget(self, participants: list[dict]) -> tuple[int, str]:
+            counter.update({item: n - rank for rank, item in enumerate(items)})
+        else:
+            counter.update(items)
+
+    def _add_ranking(self, state: ViajeState, category: str, items: list):
+        """Con Kemeny, acumula los conteos por pares de la lista de preferencias."""
+        if self.voting_method == "kemeny" and items:
+            state.pairwise.setdefault(category, PairwiseCounts()).add(items)
+
+    def _best(self, state: ViajeState, category: str,
+              scores: Counter | HeavyHitters) -> tuple[str, int, KemenyResult | None]:
+        """Opcion ganadora de una categoria: la de mas puntos o la primera del ranking Kemeny."""
+        best, score = scores.most_common(1)[0]
+        if self.voting_method != "kemeny" or category not in state.pairwise:
+            return best, score, None
+        result = kemeny_ranking(state.pairwise[category], self.kemeny_time_limit)
+        best = result.ranking[0]
+        return best, scores.get(best, 0), result
+
+    def _top(self, state: ViajeState, category: str, scores: Counter | HeavyHitters,
+             m: int) -> list[tuple[str, int]]:
+        """Las m mejores opciones de una categoria con sus puntos (en orden Kemeny si aplica)."""
+        if self.voting_method != "kemeny" or category not in state.pairwise:
+            return scores.most_common(m)
+        ranking = kemeny_ranking(state.pairwise[category], self.kemeny_time_limit).ranking
+        return [(item, scores.get(item, 0)) for item in ranking[:m]]
+
+    def _ratio(self, score: int, mentions: int, n: int) -> float:
+        """Apoyo relativo de una opcion (Borda/Kemeny contra el maximo teorico)."""
+        if self.voting_method in ("borda", "kemeny"):
+            return score / mentions if mentions else 0
+        return score / n
+
+    def _calculate_budget(self, budgets: QuantileSketch) -> tuple[int, tuple]:
         """Calcula el presupuesto segun el metodo configurado."""
-        presupuestos = [p.get("presupuesto_max", 0) for p in participants if p.get("presupuesto_max")]
-        if not presupuestos:
-            return 0, "No hay presupuestos"
-
-        if self.budget_method == "median":
-            budget = int(median(presupuestos))
-            explanation = f"Presupuesto (mediana): Q{budget}"
+        if not budgets:
+            return 0, ("No hay presupuestos",)
+
+        percentile = parse_percentile(self.budget_method)
+        if percentile is not None:
+            budget = int(budgets.quantile(percentile / 100))
+            label = f"percentil {percentile:g}"
+        elif self.budget_method == "median":
+            budget = int(budgets.quantile(0.5))
+            label = "mediana"
         else:
-            budget = min(presupuestos)
-            explanation = f"Presupuesto (minimo): Q{budget}"
-
-        return budget, explanation
+            return budgets.min_value, ("Presupuesto (minimo): Q{}", budgets.min_value)
+
+        # El sketch es exacto en grupos pequenos; en grupos grandes reporta el error
+        if budgets.is_exact:
+            return budget, ("Presupuesto ({}): Q{}", label, budget)
+        return budget, ("Presupuesto ({}, aprox. +/-{:.1%} de rango): Q{}", label, budgets.rank_error(), budget)
+
+    def partial(self, participants: Iterable[dict]) -> ViajeState:
+        """Acumula votos, presupuestos e intersecciones en una sola pasada."""
+        state = ViajeState(
+            config=self.config(),
+            date_scores=self._new_counter(),
+            destino_scores=self._new_counter(),
+            actividad_scores=self._new_counter(),
+        )
+        for p in self.records(participants):
+            fechas = p.fechas_disponibles
+            destinos = p.destinos_interes
+
+            state.n += 1
+            self._add_votes(state.date_scores, fechas)
+            self._add_votes(state.destino_scores, destinos)
+            self._add_votes(state.actividad_scores, p.actividades)
+            self._add_ranking(state, "fechas", fechas)
+            self._add_ranking(state, "destinos", destinos)
+            state.duracion_counter[p.duracion_preferida] += 1
+            state.date_mentions += len(fechas)
+            state.destino_mentions += len(destinos)
+            if p.presupuesto_max:
+                state.budgets.add(p.presupuesto_max)
+            state.common_dates = intersect(state.common_dates, fechas)
+            state.common_destinos = intersect(state.common_destinos, destinos)
+            state.restrictions.update(p.restricciones)
+        return state
+
+    def load_state(self, data: dict) -> ViajeState:
+        return ViajeState.from_dict(data)
 
     def evaluate_complexity(self, participants: list[dict]) -> ComplexityScore:
         """Evalua complejidad basada en overlap de fechas, presupuestos y destinos."""
+        return self.evaluate_state(self.partial(participants))
+
+    def evaluate_state(self, state: ViajeState) -> ComplexityScore:
         factors = []
         score = 0.0
 
-        if len(participants) < 2:
+        if state.n < 2:
             return ComplexityScore(score=0.0, factors=["Menos de 2 participantes"])
 
         # Fechas comunes
-        all_dates = [set(p.get("fechas_disponibles", [])) for p in participants]
-        common_dates = set.intersection(*all_dates) if all_dates else set()
+        common_dates = state.common_dates or set()
 
         if len(common_dates) == 0:
             score += 0.3
@@ -76,16 +219,14 @@ class ViajeSolver(BaseSolver):
             factors.append("Solo 1 fecha en comun")
 
         # Disparidad de presupuestos
-        presupuestos = [p.get("presupuesto_max", 0) for p in participants if p.get("presupuesto_max")]
-        if presupuestos:
-            min_p, max_p = min(presupuestos), max(presupuestos)
+        if state.budgets:
+            min_p, max_p = state.budgets.min_value, state.budgets.max_value
             if min_p > 0 and max_p / min_p > 3:
                 score += 0.25
                 factors.append(f"Presupuestos muy dispares (Q{min_p} - Q{max_p})")
 
         # Destinos en comun
-        all_destinos = [set(p.get("destinos_interes", [])) for p in participants]
-        common_destinos = set.intersection(*all_destinos) if all_destinos else set()
+        common_destinos = state.common_destinos or set()
 
         if len(common_destinos) == 0:
             score += 0.25
@@ -94,9 +235,7 @@ class ViajeSolver(BaseSolver):
             score += 0.05
 
         # Restricciones
-        all_restrictions = set()
-        for p in participants:
-            all_restrictions.update(p.get("restricciones", []))
+        all_restrictions = state.restrictions
         if len(all_restrictions) > 3:
             score += 0.15
             factors.append(f"{len(all_restrictions)} restricciones a considerar")
@@ -106,69 +245,112 @@ class ViajeSolver(BaseSolver):
 
         return ComplexityScore(score=min(score, 1.0), factors=factors)
 
+    def candidates(self, state: ViajeState) -> list[SolverResult]:
+        """Pares destino/fecha entre los mejores; duracion, presupuesto y actividades comunes."""
+        if state.n < 2 or not state.date_scores or not state.destino_scores:
+            return []
+
+        destinos = self._top(state, "destinos", state.destino_scores, 4)
+        dates = self._top(state, "fechas", state.date_scores, 4)
+        presupuesto, _ = self._calculate_budget(state.budgets)
+        best_duracion = state.duracion_counter.most_common(1)[0][0] if state.duracion_counter else "3-4 dias"
+        top_actividades = [a for a, _ in state.actividad_scores.most_common(3)]
+        restrictions = list(state.restrictions) if state.restrictions else ["ninguna"]
+
+        results = []
+        for (destino, destino_score), (date, date_score) in product(destinos, dates):
+            date_ratio = self._ratio(date_score, state.date_mentions, state.n)
+            destino_ratio = self._ratio(destino_score, state.destino_mentions, state.n)
+            results.append(SolverResult(
+                success=True,
+                decision={
+                    "Destino": destino,
+                    "Fecha de inicio": date,
+                    "Duracion": best_duracion,
+                    "Presupuesto maximo": f"Q{presupuesto}",
+                    "Actividades": top_actividades,
+                    "Restricciones a considerar": restrictions,
+                },
+                confidence=(date_ratio + destino_ratio) / 2,
+                facts=[("Apoyo: destino {:.0%}, fecha {:.0%}", destino_ratio, date_ratio)],
+            ))
+        return results
+
     def solve(self, participants: list[dict]) -> SolverResult:
         """Resuelve el consenso para un viaje."""
-        if len(participants) < 2:
+        return self.solve_state(self.partial(participants))
+
+    def solve_state(self, state: ViajeState) -> SolverResult:
+        if state.n < 2:
             return SolverResult(
                 success=False,
                 explanation="Se necesitan al menos 2 participantes"
             )
 
-        explanations = []
-        method_label = "Borda" if self.voting_method == "borda" else "Pluralidad"
-        budget_label = "Mediana" if self.budget_method == "median" else "Minimo"
-        explanations.append(f"Metodo: votacion={method_label}, presupuesto={budget_label}")
+        facts = []
+        method_label = {"borda": "Borda", "kemeny": "Kemeny-Young"}.get(self.voting_method, "Pluralidad")
+        percentile = parse_percentile(self.budget_method)
+        if percentile is not None:
+            budget_label = f"Percentil {percentile:g}"
+        else:
+            budget_label = "Mediana" if self.budget_method == "median" else "Minimo"
+        facts.append(("Metodo: votacion={}, presupuesto={}", method_label, budget_label))
 
         # Mejor fecha
-        date_scores = self._count_votes(participants, "fechas_disponibles")
+        date_scores = state.date_scores
         if not date_scores:
             return SolverResult(success=False, explanation="No hay fechas disponibles")
 
-        best_date, date_score = date_scores.most_common(1)[0]
-        if self.voting_method == "borda":
-            explanations.append(f"Fecha: {best_date} ({date_score} pts Borda)")
+        best_date, date_score, date_kemeny = self._best(state, "fechas", date_scores)
+        if date_kemeny:
+            facts.append(("Fecha: {} ({})", best_date, date_kemeny))
+        elif self.voting_method == "borda":
+            facts.append(("Fecha: {} ({} pts Borda)", best_date, date_score))
         else:
-            explanations.append(f"{date_score}/{len(participants)} disponibles para {best_date}")
+            facts.append(("{}/{} disponibles para {}", date_score, state.n, best_date))
 
         # Presupuesto
-        presupuesto, budget_explanation = self._calculate_budget(participants)
-        explanations.append(budget_explanation)
+        presupuesto, budget_fact = self._calculate_budget(state.budgets)
+        facts.append(budget_fact)
 
         # Destino mas votado
-        destino_scores = self._count_votes(participants, "destinos_interes")
+        destino_scores = state.destino_scores
         if not destino_scores:
             return SolverResult(success=False, explanation="No hay destinos de interes")
 
-        best_destino, destino_score = destino_scores.most_common(1)[0]
-        if self.voting_method == "borda":
-            explanations.append(f"Destino: {best_destino} ({destino_score} pts Borda)")
+        best_destino, destino_score, destino_kemeny = self._best(state, "destinos", destino_scores)
+        if destino_kemeny:
+            facts.append(("Destino: {} ({})", best_destino, destino_kemeny))
+        elif self.voting_method == "borda":
+            facts.append(("Destino: {} ({} pts Borda)", best_destino, destino_score))
         else:
-            explanations.append(f"Destino mas popular: {best_destino} ({destino_score} votos)")
+            facts.append(("Destino mas popular: {} ({} votos)", best_destino, destino_score))
 
         # Duracion mas comun
-        duracion_counter = Counter(p.get("duracion_preferida", "") for p in participants)
+        duracion_counter = state.duracion_counter
         best_duracion = duracion_counter.most_common(1)[0][0] if duracion_counter else "3-4 dias"
-        explanations.append(f"Duracion preferida: {best_duracion}")
+        facts.append(("Duracion preferida: {}", best_duracion))
 
         # Actividades mas populares (top 3)
-        actividad_scores = self._count_votes(participants, "actividades")
+        actividad_scores = state.actividad_scores
         top_actividades = [a for a, _ in actividad_scores.most_common(3)]
-        explanations.append(f"Actividades sugeridas: {', '.join(top_actividades)}")
+        facts.append(("Actividades sugeridas: {}", top_actividades))
+
+        facts.append((counting_note, {"fechas": date_scores, "destinos": destino_scores,
+                                      "actividades": actividad_scores}))
 
         # Restricciones
-        all_restrictions = set()
-        for p in participants:
-            all_restrictions.update(p.get("restricciones", []))
+        all_restrictions = state.restrictions
 
         # Calcular confianza
-        if self.voting_method == "borda":
-            max_dates = sum(len(p.get("fechas_disponibles", [])) for p in participants)
-            max_destinos = sum(len(p.get("destinos_interes", [])) for p in participants)
+        if self.voting_method in ("borda", "kemeny"):
+            max_dates = state.date_mentions
+            max_destinos = state.destino_mentions
             date_ratio = date_score / max_dates if max_dates else 0
             destino_ratio = destino_score / max_destinos if max_destinos else 0
         else:
-            date_ratio = date_score / len(participants)
-            destino_ratio = destino_score / len(participants)
+            date_ratio = date_score / state.n
+            destino_ratio = destino_score / state.n
 
         confidence = (date_ratio + destino_ratio) / 2
 
@@ -185,5 +367,5 @@ class ViajeSolver(BaseSolver):
             success=True,
             decision=decision,
             confidence=confidence,
-            explanation="\n".join(explanations)
+            facts=facts
         )
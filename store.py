@@ -0,0 +1,345 @@
+"""Almacenamiento de rondas: propuestas y votos (archivos JSON o SQLite)."""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos para el almacenamiento JSON
+    fcntl = None
+
+DEFAULT_GROUP = "default"
+DEFAULT_DB = Path("consensus.db")
+
+
+def merge_ballots(existing: list[dict], new: list[dict]) -> list[dict]:
+    """Combina votos; si un participante vota de nuevo, su ultimo voto reemplaza al anterior."""
+    by_participant = {v["participant"]: v for v in existing}
+    for vote in new:
+        by_participant.pop(vote["participant"], None)
+        by_participant[vote["participant"]] = vote
+    return list(by_participant.values())
+
+
+class JsonRoundStore:
+    """Un archivo JSON por ronda en proposals/ y votes/ (formato original)."""
+
+    def __init__(self, base_dir: Path = Path(".")):
+        self.proposals_dir = base_dir / "proposals"
+        self.votes_dir = base_dir / "votes"
+        # Estado local fuera de los directorios versionados (incluye los datos de participantes)
+        self.cache_dir = base_dir / ".cache"
+
+    def latest_round(self) -> int:
+        """Ultima ronda con propuesta (0 si no hay ninguna)."""
+        if not self.proposals_dir.exists():
+            return 0
+        rounds = [int(f.stem.split("_")[1]) for f in self.proposals_dir.glob("round_*.json")]
+        return max(rounds, default=0)
+
+    def proposal_location(self, round_num: int) -> str:
+        return str(self.proposals_dir / f"round_{round_num}.json")
+
+    def votes_location(self, round_num: int) -> str:
+        return str(self.votes_dir / f"round_{round_num}.json")
+
+    @contextmanager
+    def _proposals_lock(self):
+        """Lock exclusivo entre procesos para tomar el numero de la siguiente ronda."""
+        self.proposals_dir.mkdir(exist_ok=True)
+        with open(self.proposals_dir / "round.lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def save_proposal(self, content: str, decision_type: str, data: dict | None = None) -> int:
+        """Guarda una propuesta en la siguiente ronda libre y retorna su numero."""
+        with self._proposals_lock():
+            round_num = self.latest_round() + 1
+            proposal = {"round": round_num, "type": decision_type, "content": content, **(data or {})}
+            # Escribe a un temporal y lo renombra: los lectores nunca ven un archivo a medias
+            path = Path(self.proposal_location(round_num))
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(proposal, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        return round_num
+
+    def load_proposal(self, round_num: int) -> dict | None:
+        filepath = Path(self.proposal_location(round_num))
+        if not filepath.exists():
+            return None
+        with open(filepath, encoding="utf-8") as f:
+            return json.load(f)
+
+    @contextmanager
+    def _votes_lock(self, round_num: int):
+        """Lock exclusivo entre procesos sobre los votos de una ronda."""
+        self.votes_dir.mkdir(exist_ok=True)
+        with open(self.votes_dir / f"round_{round_num}.lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _write_votes(self, round_num: int, votes: dict):
+        """Escribe a un temporal y lo renombra: los lectores nunca ven un archivo a medias."""
+        path = Path(self.votes_location(round_num))
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(votes, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def save_votes(self, round_num: int, votes: dict):
+        """Guarda (reemplaza) los votos de una ronda."""
+        with self._votes_lock(round_num):
+            self._write_votes(round_num, votes)
+
+    def append_votes(self, round_num: int, new_votes: list[dict], comments: list[str]) -> dict:
+        """Agrega votos a una ronda de forma segura ante escritores concurrentes."""
+        with self._votes_lock(round_num):
+            votes = self.load_votes(round_num) or {"round": round_num, "votes": [], "comments": []}
+            votes["votes"] = merge_ballots(votes["votes"], new_votes)
+            votes["comments"].extend(comments)
+            self._write_votes(round_num, votes)
+        return votes
+
+    def load_votes(self, round_num: int) -> dict | None:
+        filepath = Path(self.votes_location(round_num))
+        if not filepath.exists():
+            return None
+        with open(filepath, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _conversation_path(self) -> Path:
+        return self.cache_dir / "conversation.json"
+
+    def save_conversation(self, data: dict):
+        """Guarda (reemplaza) la conversacion con el LLM del grupo."""
+        self.cache_dir.mkdir(exist_ok=True)
+        path = self._conversation_path()
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def load_conversation(self) -> dict | None:
+        path = self._conversation_path()
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    last_round INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    group_id INTEGER NOT NULL REFERENCES groups(id),
+    round INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (group_id, round)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS proposals (
+    group_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    data TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (group_id, round),
+    FOREIGN KEY (group_id, round) REFERENCES rounds(group_id, round)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS votes (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    participant TEXT NOT NULL,
+    choice INTEGER NOT NULL,
+    ranking TEXT,
+    UNIQUE (group_id, round, participant),
+    FOREIGN KEY (group_id, round) REFERENCES rounds(group_id, round)
+);
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    comment TEXT NOT NULL,
+    FOREIGN KEY (group_id, round) REFERENCES rounds(group_id, round)
+);
+CREATE INDEX IF NOT EXISTS comments_by_round ON comments (group_id, round);
+CREATE TABLE IF NOT EXISTS conversations (
+    group_id INTEGER PRIMARY KEY REFERENCES groups(id),
+    data TEXT NOT NULL
+);
+"""
+
+
+class SqliteRoundStore:
+    """
+    Rondas en SQLite (modo WAL), con varios grupos por base de datos.
+
+    El numero de ronda se asigna incrementando groups.last_round dentro de una
+    transaccion IMMEDIATE, asi que escritores concurrentes nunca comparten
+    ronda, y consultar la ultima ronda es una lectura por clave primaria.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DB, group: str = DEFAULT_GROUP):
+        self.path = path
+        self.group = group
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self._transaction():
+            for statement in SCHEMA_SQL.split(";"):
+                if statement.strip():
+                    self.conn.execute(statement)
+            # Bases creadas antes de los votos con ranking
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(votes)")}
+            if "ranking" not in columns:
+                self.conn.execute("ALTER TABLE votes ADD COLUMN ranking TEXT")
+            self.conn.execute("INSERT OR IGNORE INTO groups (name) VALUES (?)", (group,))
+        self.group_id = self.conn.execute(
+            "SELECT id FROM groups WHERE name = ?", (group,)
+        ).fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        """Transaccion con lock de escritura desde el inicio (evita carreras de lectura-escritura)."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+    def latest_round(self) -> int:
+        """Ultima ronda del grupo (0 si no hay ninguna)."""
+        return self.conn.execute(
+            "SELECT last_round FROM groups WHERE id = ?", (self.group_id,)
+        ).fetchone()[0]
+
+    def proposal_location(self, round_num: int) -> str:
+        return f"{self.path} (grupo {self.group}, ronda {round_num})"
+
+    def votes_location(self, round_num: int) -> str:
+        return self.proposal_location(round_num)
+
+    def save_proposal(self, content: str, decision_type: str, data: dict | None = None) -> int:
+        """Asigna atomicamente la siguiente ronda, guarda la propuesta y retorna su numero."""
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE groups SET last_round = last_round + 1 WHERE id = ?", (self.group_id,)
+            )
+            round_num = self.latest_round()
+            self.conn.execute(
+                "INSERT INTO rounds (group_id, round, type) VALUES (?, ?, ?)",
+                (self.group_id, round_num, decision_type)
+            )
+            self.conn.execute(
+                "INSERT INTO proposals (group_id, round, content, data) VALUES (?, ?, ?, ?)",
+                (self.group_id, round_num, content, json.dumps(data or {}, ensure_ascii=False))
+            )
+        return round_num
+
+    def load_proposal(self, round_num: int) -> dict | None:
+        row = self.conn.execute(
+            """SELECT r.type, p.content, p.data FROM rounds r
+               JOIN proposals p ON p.group_id = r.group_id AND p.round = r.round
+               WHERE r.group_id = ? AND r.round = ?""",
+            (self.group_id, round_num)
+        ).fetchone()
+        if row is None:
+            return None
+        decision_type, content, data = row
+        return {"round": round_num, "type": decision_type, "content": content, **json.loads(data)}
+
+    def save_votes(self, round_num: int, votes: dict):
+        """Guarda (reemplaza) los votos de una ronda."""
+        with self._transaction():
+            self.conn.execute(
+                "DELETE FROM votes WHERE group_id = ? AND round = ?", (self.group_id, round_num)
+            )
+            self.conn.execute(
+                "DELETE FROM comments WHERE group_id = ? AND round = ?", (self.group_id, round_num)
+            )
+            self._insert_votes(round_num, votes["votes"], votes.get("comments", []))
+
+    def append_votes(self, round_num: int, new_votes: list[dict], comments: list[str]) -> dict:
+        """Agrega votos a una ronda; el ultimo voto de cada participante reemplaza al anterior."""
+        with self._transaction():
+            self._insert_votes(round_num, new_votes, comments)
+        return self.load_votes(round_num)
+
+    def _insert_votes(self, round_num: int, votes: list[dict], comments: list[str]):
+        self.conn.executemany(
+            """INSERT OR REPLACE INTO votes (group_id, round, participant, choice, ranking)
+               VALUES (?, ?, ?, ?, ?)""",
+            [
+                (self.group_id, round_num, v["participant"], v["choice"],
+                 json.dumps(v["ranking"]) if "ranking" in v else None)
+                for v in votes
+            ]
+        )
+        self.conn.executemany(
+            "INSERT INTO comments (group_id, round, comment) VALUES (?, ?, ?)",
+            [(self.group_id, round_num, c) for c in comments]
+        )
+
+    def load_votes(self, round_num: int) -> dict | None:
+        rows = self.conn.execute(
+            "SELECT participant, choice, ranking FROM votes WHERE group_id = ? AND round = ? ORDER BY id",
+            (self.group_id, round_num)
+        ).fetchall()
+        if not rows:
+            return None
+        comments = self.conn.execute(
+            "SELECT comment FROM comments WHERE group_id = ? AND round = ? ORDER BY id",
+            (self.group_id, round_num)
+        ).fetchall()
+        return {
+            "round": round_num,
+            "votes": [
+                {"participant": p, "choice": c, **({"ranking": json.loads(r)} if r else {})}
+                for p, c, r in rows
+            ],
+            "comments": [c for (c,) in comments],
+        }
+
+    def save_conversation(self, data: dict):
+        """Guarda (reemplaza) la conversacion con el LLM del grupo."""
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO conversations (group_id, data) VALUES (?, ?)",
+                (self.group_id, json.dumps(data, ensure_ascii=False))
+            )
+
+    def load_conversation(self) -> dict | None:
+        row = self.conn.execute(
+            "SELECT data FROM conversations WHERE group_id = ?", (self.group_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def open_store(kind: str = "json", group: str = DEFAULT_GROUP) -> JsonRoundStore | SqliteRoundStore:
+    """
+    Abre el almacenamiento de rondas.
+
+    Args:
+        kind: "json" (default, un archivo por ronda) o "sqlite" (consensus.db)
+        group: Grupo dentro de la base SQLite (el almacenamiento JSON tiene uno solo)
+    """
+    if kind == "sqlite":
+        return SqliteRoundStore(DEFAULT_DB, group)
+    if group != DEFAULT_GROUP:
+        raise ValueError("El almacenamiento JSON no soporta grupos; usa --store sqlite")
+    return JsonRoundStore()
@@ -0,0 +1,184 @@
+"""Conteo de votos por ranking sobre las opciones de una ronda (IRV, Schulze, Copeland)."""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+TALLY_METHODS = ["plurality", "irv", "schulze", "copeland"]
+
+METHOD_LABELS = {
+    "plurality": "Pluralidad",
+    "irv": "Segunda vuelta instantanea (IRV)",
+    "schulze": "Schulze",
+    "copeland": "Copeland",
+}
+
+
+@dataclass
+class TallyResult:
+    """Resultado de contar una ronda."""
+    method: str
+    ranking: list[int]  # Opciones de mejor a peor
+    scores: dict[int, float] = field(default_factory=dict)
+    details: list[str] = field(default_factory=list)
+
+    @property
+    def winner(self) -> int | None:
+        return self.ranking[0] if self.ranking else None
+
+    def format_output(self) -> str:
+        lines = [f"Metodo: {METHOD_LABELS[self.method]}"]
+        lines.append("Ranking: " + " > ".join(f"Opcion {o}" for o in self.ranking))
+        lines.extend(self.details)
+        return "\n".join(lines)
+
+
+def count_options(proposal: dict) -> int:
+    """Numero de opciones de una propuesta (OPCION 1, OPCION 2, ...; 1 si no estan numeradas)."""
+    if "options" in proposal:
+        return len(proposal["options"])
+    numbers = [int(n) for n in re.findall(r"OPCI[OÓ]N\s+(\d+)", proposal["content"], re.IGNORECASE)]
+    return max(numbers, default=1)
+
+
+def group_ballots(votes: list[dict]) -> Counter:
+    """Agrupa boletas identicas: ranking (tupla) -> numero de votantes."""
+    return Counter(tuple(v.get("ranking", [v["choice"]])) for v in votes)
+
+
+def pairwise_matrix(ballots: Counter, options: list[int]) -> dict[int, dict[int, int]]:
+    """
+    d[a][b] = votantes que prefieren a sobre b.
+
+    Las opciones no listadas en una boleta quedan empatadas debajo de las listadas.
+    Se recorre cada boleta distinta una vez, ponderada por cuantos la emitieron.
+    """
+    d = {a: {b: 0 for b in options} for a in options}
+    for ranking, weight in ballots.items():
+        unranked = [o for o in options if o not in ranking]
+        for pos, a in enumerate(ranking):
+            row = d[a]
+            for b in ranking[pos + 1:]:
+                row[b] += weight
+            for b in unranked:
+                row[b] += weight
+    return d
+
+
+def plurality(ballots: Counter, options: list[int]) -> TallyResult:
+    """Primeras preferencias."""
+    counts = Counter({o: 0 for o in options})
+    for ranking, weight in ballots.items():
+        counts[ranking[0]] += weight
+    ranking = sorted(options, key=lambda o: (-counts[o], o))
+    details = [f"Opcion {o}: {counts[o]} voto(s)" for o in ranking]
+    return TallyResult("plurality", ranking, dict(counts), details)
+
+
+def instant_runoff(ballots: Counter, options: list[int]) -> TallyResult:
+    """
+    Segunda vuelta instantanea: se elimina la opcion con menos primeras
+    preferencias y sus boletas pasan a la siguiente opcion aun en juego.
+    """
+    remaining = set(options)
+    counts = Counter({o: 0 for o in remaining})
+    eliminated = []
+    details = []
+    round_num = 1
+    while len(remaining) > 1:
+        counts = Counter({o: 0 for o in remaining})
+        for ranking, weight in ballots.items():
+            top = next((o for o in ranking if o in remaining), None)
+            if top is not None:
+                counts[top] += weight
+        active = sum(counts.values())
+
+        leader, leader_votes = max(counts.items(), key=lambda kv: (kv[1], -kv[0]))
+        if active and leader_votes * 2 > active:
+            details.append(f"Ronda {round_num}: Opcion {leader} obtiene mayoria ({leader_votes}/{active})")
+            break
+
+        # Empate en el ultimo lugar: se elimina la opcion de numero mayor
+        loser = min(remaining, key=lambda o: (counts[o], -o))
+        details.append(f"Ronda {round_num}: se elimina Opcion {loser} ({counts[loser]} voto(s))")
+        remaining.remove(loser)
+        eliminated.append(loser)
+        round_num += 1
+
+    # Las opciones que siguen en juego se ordenan por sus votos en la ultima ronda
+    ranking = sorted(remaining, key=lambda o: (-counts[o], o)) + eliminated[::-1]
+    scores = {o: len(options) - i for i, o in enumerate(ranking)}
+    return TallyResult("irv", ranking, scores, details)
+
+
+def schulze(ballots: Counter, options: list[int]) -> TallyResult:
+    """
+    Metodo de Schulze: caminos mas anchos en el grafo de mayorias (O(c^3)).
+
+    p[a][b] es la fuerza del camino mas fuerte de a hacia b; a queda por encima
+    de b si p[a][b] > p[b][a].
+    """
+    d = pairwise_matrix(ballots, options)
+    p = {a: {b: (d[a][b] if d[a][b] > d[b][a] else 0) for b in options if b != a} for a in options}
+
+    for k in options:
+        pk = p[k]
+        for a in options:
+            if a == k:
+                continue
+            pak = p[a][k]
+            if not pak:
+                continue
+            pa = p[a]
+            for b in options:
+                if b != a and b != k:
+                    through = pak if pak < pk[b] else pk[b]
+                    if through > pa[b]:
+                        pa[b] = through
+
+    wins = {a: sum(1 for b in options if b != a and p[a][b] > p[b][a]) for a in options}
+    ranking = sorted(options, key=lambda o: (-wins[o], o))
+    details = [f"Opcion {o}: supera a {wins[o]} opcion(es) por camino mas fuerte" for o in ranking]
+    return TallyResult("schulze", ranking, dict(wins), details)
+
+
+def copeland(ballots: Counter, options: list[int]) -> TallyResult:
+    """Copeland: 1 punto por cada duelo ganado, 0.5 por empate."""
+    d = pairwise_matrix(ballots, options)
+    scores = {}
+    for a in options:
+        score = 0.0
+        for b in options:
+            if b == a:
+                continue
+            if d[a][b] > d[b][a]:
+                score += 1
+            elif d[a][b] == d[b][a]:
+                score += 0.5
+        scores[a] = score
+    ranking = sorted(options, key=lambda o: (-scores[o], o))
+    details = [f"Opcion {o}: {scores[o]:g} punto(s) Copeland" for o in ranking]
+    return TallyResult("copeland", ranking, scores, details)
+
+
+def tally(votes: list[dict], num_options: int, method: str = "schulze") -> TallyResult:
+    """
+    Cuenta los votos de una ronda.
+
+    Args:
+        votes: Votos con "choice" y opcionalmente "ranking"
+        num_options: Numero de opciones de la propuesta
+        method: "plurality", "irv", "schulze" o "copeland"
+    """
+    ballots = group_ballots(votes)
+    # Incluir opciones votadas fuera de rango para no perder votos de propuestas sin numerar
+    options = sorted(set(range(1, num_options + 1)).union(*ballots))
+    if method == "irv":
+        return instant_runoff(ballots, options)
+    if method == "schulze":
+        return schulze(ballots, options)
+    if method == "copeland":
+        return copeland(ballots, options)
+    if method == "plurality":
+        return plurality(ballots, options)
+    raise ValueError(f"Metodo de conteo desconocido: {method}")
@@ -3,48 +3,164 @@
 
 import argparse
 import json
+import re
+import sys
+from collections import Counter
 from pathlib import Path
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
 from rich.prompt import Prompt, IntPrompt
 
+from store import DEFAULT_GROUP, open_store
+from tally import METHOD_LABELS, TALLY_METHODS, count_options, tally
+
 console = Console()
 
 
-def load_proposal(round_num: int) -> dict | None:
-    """Carga propuesta de una ronda."""
-    filepath = Path(f"proposals/round_{round_num}.json")
-    if not filepath.exists():
-        return None
-    with open(filepath, encoding="utf-8") as f:
-        return json.load(f)
+def parse_ballot(data: dict, num_options: int) -> dict:
+    """
+    Valida una boleta contra la propuesta y la normaliza a un voto.
+
+    Acepta {"participant", "choice"} o {"participant", "ranking": [2, 1, 3]};
+    con ranking, choice es la primera preferencia.
+
+    Raises:
+        ValueError: Si la boleta no es valida
+    """
+    participant = data.get("participant")
+    if not isinstance(participant, str) or not participant.strip():
+        raise ValueError("falta 'participant'")
+
+    ranking = data.get("ranking")
+    if ranking is not None:
+        if not isinstance(ranking, list) or not ranking:
+            raise ValueError("'ranking' debe ser una lista no vacia de opciones")
+        if len(set(ranking)) != len(ranking):
+            raise ValueError("'ranking' repite opciones")
+        choice = data.get("choice", ranking[0])
+        if choice != ranking[0]:
+            raise ValueError("'choice' no coincide con la primera opcion de 'ranking'")
+    else:
+        choice = data.get("choice")
+        ranking = [choice]
+
+    for option in ranking:
+        if not isinstance(option, int) or isinstance(option, bool) or not 1 <= option <= num_options:
+            raise ValueError(f"opcion invalida: {option!r} (hay {num_options} opciones)")
+
+    vote = {"participant": participant.strip(), "choice": choice}
+    if len(ranking) > 1:
+        vote["ranking"] = ranking
+    return vote
+
+
+def read_ballots(stream, num_options: int) -> tuple[list[dict], list[str], list[str]]:
+    """
+    Lee boletas JSONL en una sola pasada.
+
+    Returns:
+        (votos validos, comentarios, errores por linea). Si un participante
+        aparece varias veces, cuenta su ultima boleta.
+    """
+    votes = {}
+    comments = []
+    errors = []
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            vote = parse_ballot(data, num_options)
+        except ValueError as e:  # json.JSONDecodeError es subclase de ValueError
+            errors.append(f"linea {line_num}: {e}")
+            continue
+        votes.pop(vote["participant"], None)
+        votes[vote["participant"]] = vote
+        if data.get("comment"):
+            comments.append(str(data["comment"]))
+    return list(votes.values()), comments, errors
+
+
+def parse_ranking(text: str) -> list[int]:
+    """Convierte "2,1,3" (o "2 1 3") en [2, 1, 3]."""
+    return [int(part) for part in re.split(r"[,\s]+", text.strip()) if part]
+
+
+def print_summary(votes: list[dict], num_options: int, method: str = "schulze"):
+    """Muestra las primeras preferencias por opcion y el resultado del metodo de conteo."""
+    console.print("\n[cyan]Resumen de votos:[/cyan]")
 
+    vote_counts = Counter(v["choice"] for v in votes)
+    if not vote_counts:
+        console.print("  [dim]No se registraron votos[/dim]")
+        return
+
+    for choice, count in sorted(vote_counts.items()):
+        console.print(f"  Opcion {choice}: {count} voto(s)")
+
+    if method != "plurality":
+        result = tally(votes, num_options, method)
+        console.print(f"\n[cyan]Ganador ({METHOD_LABELS[method]}):[/cyan] Opcion {result.winner}")
+        console.print("  Ranking: " + " > ".join(f"Opcion {o}" for o in result.ranking))
+
+
+def ingest(args, store, proposal: dict):
+    """Ingesta no interactiva de boletas JSONL (archivo o '-' para stdin)."""
+    num_options = count_options(proposal)
+    if args.ingest == "-":
+        new_votes, comments, errors = read_ballots(sys.stdin, num_options)
+    else:
+        with open(args.ingest, encoding="utf-8") as f:
+            new_votes, comments, errors = read_ballots(f, num_options)
 
-def save_votes(round_num: int, votes: dict):
-    """Guarda votos de una ronda."""
-    votes_dir = Path("votes")
-    votes_dir.mkdir(exist_ok=True)
+    for error in errors[:20]:
+        console.print(f"[yellow]Boleta ignorada, {error}[/yellow]")
+    if len(errors) > 20:
+        console.print(f"[yellow]... y {len(errors) - 20} boletas invalidas mas[/yellow]")
 
-    filepath = votes_dir / f"round_{round_num}.json"
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(votes, f, ensure_ascii=False, indent=2)
+    if not new_votes:
+        console.print("\n[yellow]No se guardaron votos (ninguna boleta valida)[/yellow]")
+        return
 
-    console.print(f"\n[green]Votos guardados en {filepath}[/green]")
+    votes = store.append_votes(args.round, new_votes, comments)
+    console.print(f"[cyan]{len(new_votes)} voto(s) validos, {len(errors)} boleta(s) invalidas[/cyan]")
+    print_summary(votes["votes"], num_options, args.tally)
+    console.print(f"\n[green]Votos guardados en {store.votes_location(args.round)}[/green]")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Votar sobre propuestas")
     parser.add_argument("--round", "-r", type=int, required=True, help="Numero de ronda a votar")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json",
+                        help="Almacenamiento de rondas: json (default) o sqlite (consensus.db)")
+    parser.add_argument("--group", default=DEFAULT_GROUP,
+                        help="Grupo de rondas (solo con --store sqlite)")
+    parser.add_argument("--ingest", metavar="ARCHIVO",
+                        help="Ingesta no interactiva de boletas JSONL ('-' para stdin)")
+    parser.add_argument("--tally", choices=TALLY_METHODS, default="schulze",
+                        help="Metodo de conteo del resumen (default: schulze)")
     args = parser.parse_args()
 
+    try:
+        store = open_store(args.store, args.group)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return
+
     # Cargar propuesta
-    proposal = load_proposal(args.round)
+    proposal = store.load_proposal(args.round)
     if not proposal:
         console.print(f"[red]Error: No existe propuesta para ronda {args.round}[/red]")
         console.print("[dim]Primero ejecuta: uv run python decide.py --rounds N[/dim]")
         return
 
+    if args.ingest:
+        ingest(args, store, proposal)
+        return
+
     # Mostrar propuesta
     console.print(f"\n[cyan]Propuestas de Ronda {args.round}[/cyan]")
     console.print(f"[dim]Tipo: {proposal['type']}[/dim]\n")
@@ -72,22 +188,30 @@ def main():
     if not participants:
         participants = [f"Participante {i+1}" for i in range(5)]
 
-    console.print("Para cada participante, indica su opcion preferida (numero)")
-    console.print("Ingresa 0 para saltar, o 'q' cuando termines\n")
+    num_options = count_options(proposal)
+    console.print("Para cada participante, indica sus opciones en orden de preferencia")
+    console.print("(ej. '2,1,3', o un solo numero). Ingresa 0 para saltar, o 'q' cuando termines\n")
 
     for nombre in participants:
         try:
-            choice = Prompt.ask(f"  {nombre}", default="0")
-            if choice.lower() == 'q':
+            answer = Prompt.ask(f"  {nombre}", default="0")
+            if answer.lower() == 'q':
                 break
-
-            choice_num = int(choice)
-            if choice_num > 0:
-                votes["votes"].append({
-                    "participant": nombre,
-                    "choice": choice_num
-                })
-        except (ValueError, KeyboardInterrupt):
+            if answer.strip() == "0":
+                continue
+
+            while True:
+                try:
+                    votes["votes"].append(
+                        parse_ballot({"participant": nombre, "ranking": parse_ranking(answer)}, num_options)
+                    )
+                    break
+                except ValueError as e:
+                    console.print(f"  [yellow]Voto invalido: {e}[/yellow]")
+                    answer = Prompt.ask(f"  {nombre}", default="0")
+                    if answer.strip() == "0":
+                        break
+        except KeyboardInterrupt:
             break
 
     # Comentarios adicionales
@@ -97,23 +221,14 @@ def main():
         votes["comments"].append(comment)
 
     # Mostrar resumen
-    console.print("\n[cyan]Resumen de votos:[/cyan]")
-
-    vote_counts = {}
-    for v in votes["votes"]:
-        choice = v["choice"]
-        vote_counts[choice] = vote_counts.get(choice, 0) + 1
-
-    if vote_counts:
-        for choice, count in sorted(vote_counts.items()):
-            console.print(f"  Opcion {choice}: {count} voto(s)")
-    else:
-        console.print("  [dim]No se registraron votos[/dim]")
+    print_summary(votes["votes"], num_options, args.tally)
 
     # Guardar
     if votes["votes"]:
-        save_votes(args.round, votes)
-        console.print(f"\n[dim]Para continuar: uv run python decide.py --continue[/dim]")
+        store.save_votes(args.round, votes)
+        console.print(f"\n[green]Votos guardados en {store.votes_location(args.round)}[/green]")
+        flags = "" if args.store == "json" else f" --store {args.store} --group {args.group}"
+        console.print(f"\n[dim]Para continuar: uv run python decide.py --continue{flags}[/dim]")
     else:
         console.print("\n[yellow]No se guardaron votos (lista vacia)[/yellow]")
 